@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Revision Analysis Memo
+Persistent, size-bounded cache of analyze_revision_content results keyed by
+the revision's content sha1, shared across articles and runs
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+class AnalysisMemo:
+    """
+    SQLite-backed LRU memo with an in-memory LRU in front of it.
+    Byte-identical revisions (reverts, restores, null edits) share one sha1,
+    so each distinct content is analyzed only once.
+    """
+
+    def __init__(self, path: str = 'analysis_memo.sqlite', max_entries: int = 500000,
+                 memory_entries: int = 20000):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._touched = {}
+        self._lock = threading.Lock()
+
+        # Process-pool workers share the file, so wait out their write locks
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS analyses (
+                sha1 TEXT PRIMARY KEY,
+                analysis TEXT NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.db.execute('CREATE INDEX IF NOT EXISTS idx_analyses_accessed ON analyses (accessed_at)')
+        self.db.commit()
+        self._entries = self.db.execute('SELECT COUNT(*) FROM analyses').fetchone()[0]
+
+    def __contains__(self, sha1: str) -> bool:
+        with self._lock:
+            if sha1 in self._memory:
+                return True
+            return self.db.execute('SELECT 1 FROM analyses WHERE sha1 = ?', (sha1,)).fetchone() is not None
+
+    def get(self, sha1: str) -> Optional[Dict[str, Any]]:
+        """Return a fresh copy of the memoized analysis, or None"""
+        with self._lock:
+            encoded = self._memory.get(sha1)
+            if encoded is None:
+                row = self.db.execute('SELECT analysis FROM analyses WHERE sha1 = ?', (sha1,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                encoded = row[0]
+                self._remember(sha1, encoded)
+            else:
+                self._memory.move_to_end(sha1)
+
+            self.hits += 1
+            # Access times are written back in batches, not on every hit
+            self._touched[sha1] = time.time()
+            if len(self._touched) >= 1000:
+                self._write_access_times()
+
+        return json.loads(encoded)
+
+    def put(self, sha1: str, analysis: Dict[str, Any]):
+        encoded = json.dumps(analysis, ensure_ascii=False)
+        with self._lock:
+            self._remember(sha1, encoded)
+            inserted = self.db.execute('INSERT OR IGNORE INTO analyses VALUES (?, ?, ?)',
+                                       (sha1, encoded, time.time())).rowcount
+            self._entries += inserted
+            if self._entries > self.max_entries:
+                self._evict()
+            self.db.commit()
+
+    def _remember(self, sha1: str, encoded: str):
+        self._memory[sha1] = encoded
+        self._memory.move_to_end(sha1)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        """Drop least recently used rows beyond max_entries"""
+        if self._touched:
+            self._write_access_times()
+        excess = self._entries - self.max_entries
+        self.db.execute(
+            'DELETE FROM analyses WHERE sha1 IN (SELECT sha1 FROM analyses ORDER BY accessed_at LIMIT ?)',
+            (excess,)
+        )
+        self._entries -= excess
+        # Evicted rows may still be held by the in-memory layer; that is harmless
+
+    def _write_access_times(self):
+        self.db.executemany('UPDATE analyses SET accessed_at = ? WHERE sha1 = ?',
+                            [(accessed, sha1) for sha1, accessed in self._touched.items()])
+        self.db.commit()
+        self._touched.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {'entries': self._entries, 'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        with self._lock:
+            if self._touched:
+                self._write_access_times()
+            self.db.close()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Compute-Once Analysis Pipeline
+A small DAG of named stages. Each stage runs at most once per run, its
+result is memoized in memory and, with a cache directory, persisted to disk
+under a fingerprint of everything it was computed from, so a later run over
+unchanged inputs loads results instead of recomputing them
+"""
+
+import glob
+import hashlib
+import json
+import os
+import pickle
+
+
+class AnalysisPipeline:
+    """
+    Sources are the inputs (an export file, a warehouse query) and carry a
+    fingerprint supplied by the caller - file signatures, query parameters -
+    that changes whenever their content may have. A stage's fingerprint
+    hashes its name, its version and the fingerprints of its inputs, so it
+    is known without loading anything: a stage found on disk never causes
+    its inputs to be read.
+
+    Bump a stage's version when its computation changes. Whatever renders
+    stage results (reports) is not part of any fingerprint, so changing how
+    results are presented never invalidates them.
+
+    A stage whose input is None (a source that failed to load) is None too.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self.nodes = {}
+        self._fingerprints = {}
+        self._results = {}
+        # How each node's value was obtained this run: 'loaded', 'computed', 'disk' or 'memory'
+        self.events = []
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def source(self, name, fingerprint, load):
+        """An input: load() is called at most once, and only when a stage needs the data"""
+        self.nodes[name] = {'kind': 'source', 'fingerprint': fingerprint, 'load': load}
+
+    def stage(self, name, inputs, compute, version=1, persist=True, params=None):
+        """
+        compute(*input values) -> result; persisted results must be picklable.
+        params are the settings compute() was built with (error bounds, ...),
+        part of the fingerprint like the version.
+        """
+        self.nodes[name] = {'kind': 'stage', 'inputs': list(inputs), 'compute': compute,
+                            'version': version, 'persist': persist, 'params': params}
+
+    def __contains__(self, name):
+        return name in self.nodes
+
+    def fingerprint(self, name):
+        if name not in self._fingerprints:
+            node = self.nodes[name]
+            if node['kind'] == 'source':
+                key = ['source', name, node['fingerprint']]
+            else:
+                key = ['stage', name, node['version'], [self.fingerprint(upstream) for upstream in node['inputs']]]
+                if node['params'] is not None:
+                    key.append(node['params'])
+            digest = hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode('utf-8'))
+            self._fingerprints[name] = digest.hexdigest()
+        return self._fingerprints[name]
+
+    def get(self, name):
+        if name in self._results:
+            self.events.append((name, 'memory'))
+            return self._results[name]
+
+        node = self.nodes[name]
+        if node['kind'] == 'source':
+            value = node['load']()
+            self.events.append((name, 'loaded'))
+        else:
+            value = self._load(name) if node['persist'] else None
+            if value is not None:
+                self.events.append((name, 'disk'))
+            else:
+                inputs = [self.get(upstream) for upstream in node['inputs']]
+                value = None if any(item is None for item in inputs) else node['compute'](*inputs)
+                self.events.append((name, 'computed'))
+                if value is not None and node['persist']:
+                    self._save(name, value)
+
+        self._results[name] = value
+        return value
+
+    # --- persistence -------------------------------------------------------------
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, f"{name}-{self.fingerprint(name)[:16]}.pkl")
+
+    def _load(self, name):
+        if not self.cache_dir or not os.path.exists(self._path(name)):
+            return None
+        try:
+            with open(self._path(name), 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable stage result {self._path(name)}: {e}")
+            return None
+
+    def _save(self, name, value):
+        if not self.cache_dir:
+            return
+        path = self._path(name)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        # Results for inputs that no longer exist would only pile up
+        for stale in glob.glob(os.path.join(self.cache_dir, f"{name}-*.pkl")):
+            if stale != path:
+                os.remove(stale)
+
+    def describe(self):
+        """One line per node that was used this run, e.g. 'progression: disk'"""
+        first = {}
+        for name, how in self.events:
+            first.setdefault(name, how)
+        return [f"{name}: {how}" for name, how in first.items()]
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Streaming Analysis Records
+Writes one compact JSON record per analyzed article to a JSONL file as soon
+as it is done, and streams the records back, so neither side ever holds the
+whole crawl in memory
+"""
+
+import json
+import os
+from typing import Dict, Any, Iterator, Optional
+
+
+class AnalysisWriter:
+    """
+    Appends article records to a JSONL file, flushing after every record so
+    a crash loses at most the article being written
+    """
+
+    def __init__(self, path: str = 'mobile_ve_detailed_analysis.jsonl', append: bool = False):
+        self.path = path
+        self.count = 0
+        self._file = open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def write(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self._file.flush()
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def iter_analyses(path: str = 'mobile_ve_detailed_analysis.jsonl') -> Iterator[Dict[str, Any]]:
+    """Stream the records of a JSONL analysis file; a missing file yields nothing"""
+    if not os.path.exists(path):
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # A crash mid-write can leave a truncated last line
+                continue
+
+
+class AnalysisIndex:
+    """
+    Looks records of a JSONL analysis file up by page_id. Only the byte
+    offset of each record is kept in memory; a record is read from disk
+    when asked for. A page_id written more than once resolves to its
+    latest record.
+    """
+
+    def __init__(self, path: str = 'mobile_ve_detailed_analysis.jsonl'):
+        self.path = path
+        self._offsets = {}
+        self._file = open(path, 'rb') if os.path.exists(path) else None
+        if self._file is None:
+            return
+
+        offset = 0
+        for line in self._file:
+            try:
+                self._offsets[json.loads(line)['page_id']] = offset
+            except (ValueError, KeyError):
+                # Blank, or a truncated last line left by a crash mid-write
+                pass
+            offset += len(line)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __contains__(self, page_id: int) -> bool:
+        return page_id in self._offsets
+
+    def __iter__(self) -> Iterator[int]:
+        """The page_ids, in the order of their records in the file"""
+        return iter(sorted(self._offsets, key=self._offsets.get))
+
+    def get(self, page_id: int) -> Optional[Dict[str, Any]]:
+        offset = self._offsets.get(page_id)
+        if offset is None:
+            return None
+        self._file.seek(offset)
+        return json.loads(self._file.readline())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def export_json(jsonl_path: str, json_path: str) -> int:
+    """
+    Write the records as the indented JSON array earlier versions produced,
+    one record at a time
+    """
+    count = 0
+    with open(json_path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for record in iter_analyses(jsonl_path):
+            encoded = json.dumps(record, indent=2, ensure_ascii=False)
+            f.write((',\n  ' if count else '\n  ') + encoded.replace('\n', '\n  '))
+            count += 1
+        f.write('\n]' if count else ']')
+    return count
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Convert a JSONL analysis file to an indented JSON array')
+    parser.add_argument('jsonl', nargs='?', default='mobile_ve_detailed_analysis.jsonl')
+    parser.add_argument('--json', default='mobile_ve_detailed_analysis.json', help='Output path')
+    args = parser.parse_args()
+
+    count = export_json(args.jsonl, args.json)
+    print(f"Exported {count} records to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Indexed Analysis Store
+Append-only binary store of article analyses: fixed-width numeric columns
+in a memory-mapped file for zero-copy scans, the full records in a side
+heap, and a page_id index for O(1) lookups
+"""
+
+import calendar
+import json
+import mmap
+import os
+import struct
+import time
+from typing import List, Dict, Any, Iterator, Optional
+
+import numpy as np
+
+from analysis_records import iter_analyses
+
+# Per-revision metrics stored for the first and the latest revision
+REVISION_METRICS = [
+    'total_chars', 'total_lines', 'lead_length', 'section_count', 'reference_count',
+    'category_count', 'image_count', 'template_count', 'wikilinks_count', 'external_links'
+]
+
+MILESTONE_COLUMNS = ['when_infobox_added', 'when_references_added', 'when_categories_added', 'when_images_added']
+
+# Little-endian and unaligned, so the file layout is the same everywhere.
+# Missing values are -1 (milestones never reached, latest revision not analyzed).
+ROW_DTYPE = np.dtype(
+    [('page_id', '<i8'), ('created', '<i8'), ('total_revisions', '<i4')]
+    + [(f'first_{name}', '<i4') for name in REVISION_METRICS]
+    + [('first_has_infobox', '<i1')]
+    + [(f'latest_{name}', '<i4') for name in REVISION_METRICS]
+    + [('latest_has_infobox', '<i1')]
+    + [(name, '<i4') for name in MILESTONE_COLUMNS]
+    + [('heap_offset', '<i8'), ('heap_length', '<i4')]
+)
+
+# The same layout as a struct, for packing rows one at a time without numpy overhead
+ROW_STRUCT = struct.Struct('<' + ''.join({'i8': 'q', 'i4': 'i', 'i1': 'b'}[ROW_DTYPE[name].str[1:]]
+                                         for name in ROW_DTYPE.names))
+
+STORE_VERSION = 1
+
+
+class AnalysisStore:
+    """
+    A directory holding three files:
+        columns.bin  one ROW_DTYPE row per appended record
+        heap.bin     the compact JSON of every record, referenced by
+                     heap_offset / heap_length
+        meta.json    format version and column layout
+
+    Appending a page_id again supersedes the earlier row; the index and the
+    column scans only see the latest row of each page.
+    """
+
+    def __init__(self, path: str = 'mobile_ve_analysis_store'):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.columns_path = os.path.join(path, 'columns.bin')
+        self.heap_path = os.path.join(path, 'heap.bin')
+
+        meta_path = os.path.join(path, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('version') != STORE_VERSION or meta.get('columns') != list(ROW_DTYPE.names):
+                raise ValueError(f"{path} was written with a different store layout")
+        else:
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': STORE_VERSION, 'columns': list(ROW_DTYPE.names)}, f, indent=2)
+
+        # A crash mid-append can leave a partial row (and an unreferenced heap
+        # tail); the partial row is cut off and the heap tail is simply unused
+        size = os.path.getsize(self.columns_path) if os.path.exists(self.columns_path) else 0
+        if size % ROW_DTYPE.itemsize:
+            with open(self.columns_path, 'r+b') as f:
+                f.truncate(size - size % ROW_DTYPE.itemsize)
+
+        self._columns_file = open(self.columns_path, 'ab')
+        self._heap_file = open(self.heap_path, 'ab')
+        self._heap_size = self._heap_file.tell()
+        self._rows_written = self._columns_file.tell() // ROW_DTYPE.itemsize
+
+        self._rows = None
+        self._heap = None
+        self._mapped = -1
+        self.index = {}
+        self._live = None
+        self._refresh()
+
+    # --- writing -------------------------------------------------------------
+
+    def append(self, record: Dict[str, Any]):
+        """Append one article record (title, page_id, created, ..., editing_pattern)"""
+        encoded = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        row = ROW_STRUCT.pack(*_row_values(record), self._heap_size, len(encoded))
+
+        # Heap first, flushed before the row is written: both files are
+        # buffered, so without the flush the row could reach the file while
+        # the heap bytes it points to are still in memory
+        self._heap_file.write(encoded)
+        self._heap_file.flush()
+        self._heap_size += len(encoded)
+        self._columns_file.write(row)
+        self.index[record['page_id']] = self._rows_written
+        self._rows_written += 1
+        self._live = None
+
+    def flush(self):
+        self._heap_file.flush()
+        self._columns_file.flush()
+
+    # --- reading -------------------------------------------------------------
+
+    def _refresh(self):
+        """Re-map the files after appends so reads see every row"""
+        if self._mapped == self._rows_written:
+            return
+        self.flush()
+        if self._rows_written:
+            self._rows = np.memmap(self.columns_path, dtype=ROW_DTYPE, mode='r', shape=(self._rows_written,))
+        if self._heap_size:
+            with open(self.heap_path, 'rb') as f:
+                self._heap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mapped < 0 and self._rows is not None:
+            # Later rows win, so a page appended twice resolves to its latest record
+            self.index = dict(zip(self._rows['page_id'].tolist(), range(self._rows_written)))
+        self._mapped = self._rows_written
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, page_id: int) -> bool:
+        return page_id in self.index
+
+    def page_ids(self) -> List[int]:
+        return list(self.index)
+
+    def row(self, page_id: int) -> Optional[np.void]:
+        """The fixed-width columns of one article, without touching the heap"""
+        position = self.index.get(page_id)
+        if position is None:
+            return None
+        self._refresh()
+        return self._rows[position]
+
+    def get(self, page_id: int) -> Optional[Dict[str, Any]]:
+        """The full record of one article"""
+        row = self.row(page_id)
+        if row is None:
+            return None
+        offset, length = int(row['heap_offset']), int(row['heap_length'])
+        return json.loads(self._heap[offset:offset + length])
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        One column over every article. Without superseded rows this is a
+        read-only view of the mapped file; otherwise the live rows are copied.
+        """
+        self._refresh()
+        if self._rows is None:
+            return np.empty(0, dtype=ROW_DTYPE[name])
+        if len(self.index) == self._rows_written:
+            return self._rows[name]
+        if self._live is None:
+            self._live = np.fromiter(sorted(self.index.values()), dtype=np.int64, count=len(self.index))
+        return self._rows[name][self._live]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for page_id in self.index:
+            yield self.get(page_id)
+
+    def close(self):
+        self.flush()
+        self._columns_file.close()
+        self._heap_file.close()
+        # Views handed out by column() may still reference the maps; let them go with the store
+        self._rows = None
+        self._heap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _timestamp_seconds(timestamp: Optional[str]) -> int:
+    if not timestamp:
+        return -1
+    return calendar.timegm(time.strptime(timestamp, '%Y-%m-%dT%H:%M:%SZ'))
+
+
+def _revision_values(analysis: Optional[Dict[str, Any]]) -> tuple:
+    if analysis is None:
+        return (-1,) * (len(REVISION_METRICS) + 1)
+    values = [len(analysis.get('sections', [])) if name == 'section_count' else analysis.get(name, 0)
+              for name in REVISION_METRICS]
+    return tuple(values) + (int(bool(analysis.get('has_infobox'))),)
+
+
+def _row_values(record: Dict[str, Any]) -> tuple:
+    """The fixed-width columns of a record, in ROW_DTYPE order up to the heap reference"""
+    pattern = record.get('editing_pattern') or {}
+    analyses = pattern.get('revision_analyses') or []
+    progression = pattern.get('progression') or {}
+    total = pattern.get('total_revisions', 0)
+
+    # Lazy-content analyses only hold the probed revisions, which may not include the latest
+    latest = analyses[-1] if analyses and analyses[-1].get('revision_number') == total else None
+    milestones = tuple(-1 if progression.get(name) is None else progression[name] for name in MILESTONE_COLUMNS)
+
+    return ((record['page_id'], _timestamp_seconds(record.get('created')), total)
+            + _revision_values(pattern.get('first_revision'))
+            + _revision_values(latest)
+            + milestones)
+
+
+def export_from_json(source: str, store_path: str) -> int:
+    """
+    Append the records of a JSONL analysis file, or of the indented JSON
+    array written by earlier versions, to the store at store_path
+    """
+    if source.endswith('.jsonl'):
+        records = iter_analyses(source)
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+
+    count = 0
+    with AnalysisStore(store_path) as store:
+        for record in records:
+            store.append(record)
+            count += 1
+    return count
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build or query the indexed analysis store')
+    parser.add_argument('--store', default='mobile_ve_analysis_store', help='Store directory')
+    parser.add_argument('--import', dest='source', metavar='PATH',
+                        help='Append records from a .jsonl or legacy .json analysis file')
+    parser.add_argument('--page-id', type=int, action='append', help='Print the record of this page')
+    parser.add_argument('--summary', action='store_true', help='Print column summaries')
+    args = parser.parse_args()
+
+    if args.source:
+        count = export_from_json(args.source, args.store)
+        print(f"Imported {count} records into {args.store}")
+
+    with AnalysisStore(args.store) as store:
+        for page_id in args.page_id or []:
+            print(json.dumps(store.get(page_id), indent=2, ensure_ascii=False))
+
+        if args.summary:
+            print(f"{len(store)} articles in {args.store}")
+            for name in ['total_revisions'] + [f'first_{metric}' for metric in REVISION_METRICS]:
+                values = store.column(name)
+                if len(values):
+                    print(f"  {name:<28s} mean {values.mean():10.1f}  median {np.median(values):8.0f}  "
+                          f"max {values.max():8d}")
+
+
+if __name__ == "__main__":
+    main()
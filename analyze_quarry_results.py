@@ -4,126 +4,511 @@ Analyze Quarry Query Results for Mobile Visual Editor Article Creation Patterns
 This script processes CSV exports from Quarry queries to identify editing patterns
 """
 
+import numpy as np
 import pandas as pd
+import bisect
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 from collections import defaultdict, Counter
 import glob
 import os
 
+from analysis_pipeline import AnalysisPipeline
+from quarry_ingest import CACHE_PATH, discover_revision_files, file_signature, ingest_revision_histories
+from quarry_loader import iter_quarry_csv, parse_timestamps, read_quarry_csv
+from run_metrics import RunMetrics, profiled, sampled, timed
+from streaming_sketches import HyperLogLog, KLLSketch, SpaceSaving
+
+# Initial length buckets: [0, 500), [500, 2000), [2000, 5000), [5000, inf)
+LENGTH_BINS = [float('-inf'), 500, 2000, 5000, float('inf')]
+LENGTH_LABELS = ['very_short', 'short', 'medium', 'long']
+
+
+PROGRESSION_PATH = 'revision_progression.csv'
+REPORT_PATH = 'analysis_report.md'
+REPORT_JSON_PATH = 'analysis_report.json'
+REPORT_FORMATS = ('md', 'csv', 'json')
+
+# CSVs this script writes itself; never mistaken for a Quarry export
+OUTPUT_CSV_PATHS = (PROGRESSION_PATH,)
+
+# Bump a stage's version whenever its computation changes, so results
+# persisted with --stage-cache are recomputed instead of reused
+STAGE_VERSIONS = {
+    'first_revision_stats': 1,
+    'first_revision_sketches': 2,
+    'first_revision_summary': 1,
+    'progression': 1,
+}
+
+# Default error bounds of the --sketch statistics: rank error of the median,
+# relative standard error of unique creators, and top creator count error as
+# a fraction of all articles
+SKETCH_ERRORS = {'quantile': 0.01, 'distinct': 0.01, 'top': 0.001}
+
+# Stage timings are written to <base>.json and <base>.prom (Prometheus textfile)
+METRICS_PATH = 'quarry_run_metrics'
+
+# Columns of the table returned by analyze_revision_progressions
+PROGRESSION_COLUMNS = [
+    'total_revisions', 'mobile_edits', 'desktop_edits', 've_edits', 'source_edits', 'unique_contributors',
+    'first_revision', 'latest_revision', 'initial_length', 'final_length', 'net_growth',
+    'largest_addition', 'largest_removal'
+]
+
+def tag_flag(tags, word):
+    """
+    Boolean Series: does the tag string contain `word` (case-insensitive)?
+    Same test as 'word in str(tags).lower()', evaluated once per distinct tag
+    string when the column is categorical.
+    """
+    if isinstance(tags.dtype, pd.CategoricalDtype):
+        matches = tags.cat.categories.astype(str).str.lower().str.contains(word, regex=False)
+        codes = tags.cat.codes.to_numpy()
+        # Code -1 is a missing value: str(nan) never contains a tag name
+        return pd.Series(np.append(np.asarray(matches, dtype=bool), False)[codes], index=tags.index)
+    return tags.astype(str).str.lower().str.contains(word, regex=False)
+
+
+def chunk_lengths(chunk):
+    """The chunk's known initial lengths as a plain numpy array"""
+    lengths = chunk['initial_length'].dropna()
+    if isinstance(lengths.dtype, pd.api.extensions.ExtensionDtype):
+        # Nullable Int64 from the typed loader; without NAs it fits a plain numpy array
+        lengths = lengths.astype(lengths.dtype.numpy_dtype)
+    return lengths.to_numpy()
+
+
+def chunk_creator_counts(chunk):
+    """{creator: articles} of one chunk"""
+    # Counts in first-appearance order, so most_common() breaks ties like a row-by-row count
+    creators = chunk['creator']
+    counts = creators.groupby(creators, sort=False, observed=True, dropna=False).size()
+    return dict(zip(counts.index.tolist(), counts.tolist()))
+
+
+def count_creation_times(chunk, by_hour_of_day, by_day_of_week):
+    """Add the chunk's creations per hour of day and per day of week to the two counters"""
+    if 'creation_timestamp' not in chunk.columns:
+        return
+    timestamps = parse_timestamps(chunk['creation_timestamp']).dropna()
+    for counter, values in ((by_hour_of_day, timestamps.dt.hour), (by_day_of_week, timestamps.dt.day_name())):
+        counts = values.value_counts(sort=False)
+        for key, count in zip(counts.index.tolist(), counts.tolist()):
+            counter[key] += count
+
+
+def merge_counts(counter, other):
+    for key, count in other.items():
+        counter[key] += count
+
+
+class FirstRevisionAggregator:
+    """
+    Accumulates first-revision statistics over one or more DataFrame chunks,
+    so an articles export never has to be in memory all at once
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.length_chunks = []
+        self.articles_per_creator = Counter()
+        self.by_hour_of_day = defaultdict(int)
+        self.by_day_of_week = defaultdict(int)
+
+    def add(self, chunk):
+        self.rows += len(chunk)
+
+        if 'initial_length' in chunk.columns:
+            self.length_chunks.append(chunk_lengths(chunk))
+
+        if 'creator' in chunk.columns:
+            self.articles_per_creator.update(chunk_creator_counts(chunk))
+
+        count_creation_times(chunk, self.by_hour_of_day, self.by_day_of_week)
+
+    def merge(self, other):
+        """Fold in the aggregates of another part of the same stream (a chunk, a worker, a day)"""
+        self.rows += other.rows
+        self.length_chunks.extend(other.length_chunks)
+        self.articles_per_creator.update(other.articles_per_creator)
+        merge_counts(self.by_hour_of_day, other.by_hour_of_day)
+        merge_counts(self.by_day_of_week, other.by_day_of_week)
+        return self
+
+    def lengths(self):
+        if not self.length_chunks:
+            return pd.Series([], dtype='int64')
+        return pd.Series(np.concatenate(self.length_chunks))
+
+    def patterns(self):
+        return {
+            'length_distribution': self.lengths().tolist(),
+            'by_hour_of_day': self.by_hour_of_day,
+            'by_day_of_week': self.by_day_of_week,
+            'unique_creators': set(self.articles_per_creator),
+            'articles_per_creator': self.articles_per_creator
+        }
+
+
+class SketchedFirstRevisionAggregator:
+    """
+    The statistics of FirstRevisionAggregator in memory that does not grow
+    with the stream: a KLL sketch of the initial lengths (exact count, sum,
+    min and max kept alongside), HyperLogLog for unique creators and
+    Space-Saving for the top creators. The length categories and creation
+    times are a handful of counters and stay exact. Aggregators built with
+    the same errors merge, whichever chunks, processes or days they saw.
+    """
+
+    FLUSH_EVENTS = 1024
+
+    def __init__(self, quantile_error=SKETCH_ERRORS['quantile'], distinct_error=SKETCH_ERRORS['distinct'],
+                 top_error=SKETCH_ERRORS['top']):
+        self.rows = 0
+        self.lengths = KLLSketch(quantile_error)
+        self.length_sum = 0
+        self.length_categories = np.zeros(len(LENGTH_LABELS), dtype=np.int64)
+        self.creators = HyperLogLog(distinct_error)
+        self.top_creators = SpaceSaving(top_error)
+        self.by_hour_of_day = defaultdict(int)
+        self.by_day_of_week = defaultdict(int)
+        # add_creation() batches the sketch updates
+        self._pending_lengths = []
+        self._pending_creators = Counter()
+
+    def add(self, chunk):
+        self.rows += len(chunk)
+
+        if 'initial_length' in chunk.columns:
+            lengths = chunk_lengths(chunk)
+            self.lengths.update(lengths)
+            self.length_sum += int(lengths.sum())
+            # Same [low, high) buckets as pd.cut(..., right=False) over LENGTH_BINS
+            buckets = np.searchsorted(LENGTH_BINS[1:-1], lengths, side='right')
+            self.length_categories += np.bincount(buckets, minlength=len(LENGTH_LABELS))
+
+        if 'creator' in chunk.columns:
+            counts = chunk_creator_counts(chunk)
+            self.creators.update(list(counts))
+            self.top_creators.update_counts(counts)
+
+        count_creation_times(chunk, self.by_hour_of_day, self.by_day_of_week)
+
+    def add_creation(self, length, creator, created):
+        """
+        One creation at a time (an event stream): constant time per call, as
+        the sketches are only updated once every FLUSH_EVENTS creations.
+        created is a UTC datetime; length and created may be None.
+        """
+        self.rows += 1
+        if length is not None:
+            self._pending_lengths.append(length)
+            self.length_sum += length
+            self.length_categories[bisect.bisect_right(LENGTH_BINS, length) - 1] += 1
+        self._pending_creators[creator] += 1
+        if created is not None:
+            self.by_hour_of_day[created.hour] += 1
+            self.by_day_of_week[DAY_ORDER[created.weekday()]] += 1
+        if len(self._pending_lengths) >= self.FLUSH_EVENTS or len(self._pending_creators) >= self.FLUSH_EVENTS:
+            self.flush()
+
+    def flush(self):
+        """Move the creations buffered by add_creation into the sketches"""
+        if self._pending_lengths:
+            self.lengths.update(self._pending_lengths)
+            self._pending_lengths = []
+        if self._pending_creators:
+            self.creators.update(list(self._pending_creators))
+            self.top_creators.update_counts(self._pending_creators)
+            self._pending_creators = Counter()
+
+    def merge(self, other):
+        """Fold in the aggregates of another part of the same stream (a chunk, a worker, a day)"""
+        self.flush()
+        other.flush()
+        self.rows += other.rows
+        self.lengths.merge(other.lengths)
+        self.length_sum += other.length_sum
+        self.length_categories += other.length_categories
+        self.creators.merge(other.creators)
+        self.top_creators.merge(other.top_creators)
+        merge_counts(self.by_hour_of_day, other.by_hour_of_day)
+        merge_counts(self.by_day_of_week, other.by_day_of_week)
+        return self
+
+    def summary(self):
+        """A summarize_first_revisions summary, with the error bound of each estimate under 'approximate'"""
+        self.flush()
+        unique_creators = self.creators.count()
+        summary = {
+            'total_articles': self.rows,
+            'articles_with_length': self.lengths.count,
+            'length': None,
+            'length_categories': None,
+            'unique_creators': unique_creators,
+            'articles_per_creator': self.rows / unique_creators if unique_creators else 0.0,
+            'top_creators': [[creator, count] for creator, count in self.top_creators.top(10)],
+            'by_hour_of_day': {hour: self.by_hour_of_day[hour] for hour in sorted(self.by_hour_of_day)},
+            'by_day_of_week': {day: self.by_day_of_week[day] for day in DAY_ORDER if day in self.by_day_of_week},
+            'approximate': {
+                'median_rank_error': self.lengths.error,
+                'unique_creators_relative_error': self.creators.error,
+                # Top creator counts are upper bounds, over by at most this many articles
+                'top_creators_count_error': self.top_creators.floor,
+            },
+        }
+        if self.lengths.count:
+            summary['length'] = {
+                'mean': self.length_sum / self.lengths.count,
+                # Lengths are whole bytes; the sketch holds them as floats
+                'median': int(self.lengths.quantile(0.5)),
+                'min': int(self.lengths.min),
+                'max': int(self.lengths.max),
+            }
+            summary['length_categories'] = dict(zip(LENGTH_LABELS, self.length_categories.tolist()))
+        return summary
+
+
+DAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def summarize_first_revisions(patterns, total_articles):
+    """
+    The statistics every first-revision report shows, as plain numbers,
+    lists and dicts: printed, rendered to markdown and written to JSON alike
+    """
+    length_series = pd.Series(patterns['length_distribution'])
+    unique_creators = len(patterns['unique_creators'])
+
+    summary = {
+        'total_articles': total_articles,
+        'articles_with_length': len(length_series),
+        'length': None,
+        'length_categories': None,
+        'unique_creators': unique_creators,
+        'articles_per_creator': total_articles / unique_creators if unique_creators else 0.0,
+        'top_creators': [[creator, count] for creator, count in patterns['articles_per_creator'].most_common(10)],
+        'by_hour_of_day': {hour: patterns['by_hour_of_day'][hour] for hour in sorted(patterns['by_hour_of_day'])},
+        'by_day_of_week': {day: patterns['by_day_of_week'][day] for day in DAY_ORDER
+                           if day in patterns['by_day_of_week']},
+    }
+    if len(length_series):
+        summary['length'] = {
+            'mean': (length_series.sum() / len(length_series)).item(),
+            # The upper median, as sorted(lengths)[len(lengths)//2] gave
+            'median': length_series.quantile(0.5, interpolation='higher').item(),
+            'min': length_series.min().item(),
+            'max': length_series.max().item(),
+        }
+        categories = pd.cut(length_series, bins=LENGTH_BINS, labels=LENGTH_LABELS, right=False)
+        counts = categories.value_counts(sort=False).reindex(LENGTH_LABELS)
+        summary['length_categories'] = dict(zip(LENGTH_LABELS, counts.tolist()))
+    return summary
+
+
+def summarize_progressions(progression_df):
+    """Totals over all articles of a revision progression table"""
+    total = int(progression_df['total_revisions'].sum())
+    return {
+        'articles': len(progression_df),
+        'total_revisions': total,
+        'edits': {column: int(progression_df[column].sum())
+                  for column in ('mobile_edits', 'desktop_edits', 've_edits', 'source_edits')},
+        'articles_with_multiple_editors': int((progression_df['unique_contributors'] > 1).sum()),
+        'median_net_growth': float(progression_df['net_growth'].median()) if len(progression_df) else None,
+    }
+
+
+def render_markdown_report(summary):
+    """The analysis_report.md text for a summarize_first_revisions summary"""
+    report = []
+    report.append("# Mobile Visual Editor Article Creation Analysis Report")
+    report.append(f"\nGenerated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+    report.append("="*80 + "\n")
+
+    report.append("## Executive Summary\n")
+    report.append(f"- Total articles analyzed: {summary['total_articles']}")
+    report.append(f"- Date range: Last 30 days")
+    report.append(f"- Platform: Mobile Web Visual Editor\n")
+    if summary.get('approximate'):
+        report.append(f"- Median, unique creators and top creators estimated with streaming sketches\n")
+
+    report.append("\n## Key Findings\n")
+
+    if summary['length']:
+        avg_length = summary['length']['mean']
+        report.append(f"### Initial Article Length")
+        report.append(f"- Average: {avg_length:.0f} bytes")
+        report.append(f"- This indicates that mobile VE articles typically start ")
+
+        if avg_length < 500:
+            report.append(f"as **stubs** - very short articles that need expansion.\n")
+        elif avg_length < 2000:
+            report.append(f"as **short articles** - basic but incomplete coverage.\n")
+        else:
+            report.append(f"as **substantial articles** - relatively complete from the start.\n")
+
+    report.append(f"\n### Creator Behavior")
+    report.append(f"- {summary['unique_creators']} unique creators")
+
+    # Check if there are power users
+    top_creator_count = summary['top_creators'][0][1] if summary['top_creators'] else 0
+    if top_creator_count > 5:
+        report.append(f"- Power users detected: Some creators made {top_creator_count}+ articles")
+        report.append(f"- This suggests experienced mobile editors are comfortable creating articles\n")
+    else:
+        report.append(f"- Most creators made only 1-2 articles")
+        report.append(f"- This suggests mobile article creation may be used by newcomers\n")
+
+    return '\n'.join(report)
+
+
+def render_json_report(summary=None, progression_df=None):
+    """Both summaries, and the per-article progression rows, as one JSON document"""
+    report = {'generated': datetime.now().isoformat(timespec='seconds'), 'first_revisions': summary}
+    if progression_df is not None:
+        report['progression'] = summarize_progressions(progression_df)
+        # to_json handles timestamps and nullable integers; parse it back to nest it
+        report['progression']['articles_detail'] = json.loads(
+            progression_df.to_json(orient='records', date_format='iso'))
+    return json.dumps(report, indent=2, ensure_ascii=False, default=str)
+
+
 class MobileArticlePatternAnalyzer:
     """Analyzes patterns in mobile visual editor article creation"""
 
-    def __init__(self):
-        self.articles = []
+    def __init__(self, engine=None):
+        self.articles = None
+        self.article_count = 0
         self.patterns = defaultdict(list)
+        # 'pyarrow' to use the multithreaded pyarrow CSV parser when installed
+        self.engine = engine
+        # Wall and CPU time of each pandas stage
+        self.metrics = RunMetrics(prefix='quarry_analysis')
 
+    @timed()
     def load_article_list(self, csv_path):
         """Load the list of mobile VE created articles from Quarry export"""
         try:
-            df = pd.read_csv(csv_path)
+            df = read_quarry_csv(csv_path, engine=self.engine)
             print(f"Loaded {len(df)} articles from {csv_path}")
             print(f"Columns: {df.columns.tolist()}")
 
-            self.articles = df.to_dict('records')
+            self.articles = df
             return df
         except Exception as e:
             print(f"Error loading {csv_path}: {e}")
             return None
 
+    def iter_article_chunks(self, csv_path, chunksize=200000):
+        """Stream the articles list in typed chunks, for exports too large to load at once"""
+        return iter_quarry_csv(csv_path, chunksize=chunksize, engine=self.engine)
+
+    @timed()
     def load_revision_history(self, csv_path):
         """Load revision history for an article from Quarry export"""
         try:
-            df = pd.read_csv(csv_path)
+            df = read_quarry_csv(csv_path, engine=self.engine)
             return df
         except Exception as e:
             print(f"Error loading {csv_path}: {e}")
             return None
 
+    @timed()
+    def first_revision_stats(self, articles_df):
+        """
+        The aggregates behind analyze_first_revision_patterns, computed
+        without printing anything. Accepts a DataFrame or an iterable of
+        DataFrame chunks (see iter_article_chunks). Returns (patterns,
+        number of articles).
+        """
+        # Whole-column operations per chunk instead of a Python loop over records
+        chunks = [articles_df] if isinstance(articles_df, pd.DataFrame) else articles_df
+        aggregator = FirstRevisionAggregator()
+        for chunk in chunks:
+            aggregator.add(chunk)
+        self.article_count = aggregator.rows
+        return aggregator.patterns(), aggregator.rows
+
+    @timed()
+    def first_revision_sketches(self, articles_df, errors=None):
+        """
+        first_revision_stats in bounded memory: returns a
+        SketchedFirstRevisionAggregator, whose summary() stands in for
+        summarize_first_revisions. errors overrides SKETCH_ERRORS.
+        """
+        errors = dict(SKETCH_ERRORS, **(errors or {}))
+        chunks = [articles_df] if isinstance(articles_df, pd.DataFrame) else articles_df
+        aggregator = SketchedFirstRevisionAggregator(errors['quantile'], errors['distinct'], errors['top'])
+        for chunk in chunks:
+            aggregator.add(chunk)
+        self.article_count = aggregator.rows
+        return aggregator
+
     def analyze_first_revision_patterns(self, articles_df):
-        """Analyze patterns in how articles are initially created"""
+        """
+        Analyze patterns in how articles are initially created.
+        Accepts a DataFrame or an iterable of DataFrame chunks (see iter_article_chunks).
+        """
+        patterns, total_articles = self.first_revision_stats(articles_df)
+        self.print_first_revision_summary(summarize_first_revisions(patterns, total_articles))
+        return patterns
+
+    def print_first_revision_summary(self, summary):
+        """Print the statistics of summarize_first_revisions"""
 
         print("\n" + "="*80)
         print("FIRST REVISION PATTERNS ANALYSIS")
         print("="*80)
 
-        patterns = {
-            'length_distribution': [],
-            'by_hour_of_day': defaultdict(int),
-            'by_day_of_week': defaultdict(int),
-            'unique_creators': set(),
-            'articles_per_creator': Counter()
-        }
-
-        for article in articles_df.to_dict('records'):
-            # Length distribution
-            if 'initial_length' in article:
-                patterns['length_distribution'].append(article['initial_length'])
-
-            # Creator statistics
-            if 'creator' in article:
-                creator = article['creator']
-                patterns['unique_creators'].add(creator)
-                patterns['articles_per_creator'][creator] += 1
-
-            # Time patterns
-            if 'creation_timestamp' in article:
-                try:
-                    timestamp = pd.to_datetime(article['creation_timestamp'])
-                    patterns['by_hour_of_day'][timestamp.hour] += 1
-                    patterns['by_day_of_week'][timestamp.day_name()] += 1
-                except:
-                    pass
-
-        # Calculate statistics
-        lengths = patterns['length_distribution']
+        approximate = summary.get('approximate')
+        if approximate:
+            print(f"\n🧮 Streaming sketches: median within ±{approximate['median_rank_error']:.1%} in rank, "
+                  f"unique creators within ±{approximate['unique_creators_relative_error']:.1%}, "
+                  f"top creator counts at most {approximate['top_creators_count_error']} over")
 
         print(f"\n📊 INITIAL ARTICLE LENGTH STATISTICS")
-        print(f"   Total articles analyzed: {len(lengths)}")
-        if lengths:
-            print(f"   Average length: {sum(lengths)/len(lengths):.0f} bytes")
-            print(f"   Median length: {sorted(lengths)[len(lengths)//2]:.0f} bytes")
-            print(f"   Min length: {min(lengths)} bytes")
-            print(f"   Max length: {max(lengths)} bytes")
+        print(f"   Total articles analyzed: {summary['articles_with_length']}")
+        if summary['length']:
+            length = summary['length']
+            print(f"   Average length: {length['mean']:.0f} bytes")
+            print(f"   Median length: {length['median']:.0f} bytes")
+            print(f"   Min length: {length['min']} bytes")
+            print(f"   Max length: {length['max']} bytes")
 
             # Categorize by length
-            very_short = len([l for l in lengths if l < 500])
-            short = len([l for l in lengths if 500 <= l < 2000])
-            medium = len([l for l in lengths if 2000 <= l < 5000])
-            long = len([l for l in lengths if l >= 5000])
+            total = summary['articles_with_length']
+            very_short, short, medium, long = (summary['length_categories'][label] for label in LENGTH_LABELS)
 
             print(f"\n   Length Categories:")
-            print(f"   - Very short (<500 bytes): {very_short} ({very_short/len(lengths)*100:.1f}%)")
-            print(f"   - Short (500-2000 bytes): {short} ({short/len(lengths)*100:.1f}%)")
-            print(f"   - Medium (2000-5000 bytes): {medium} ({medium/len(lengths)*100:.1f}%)")
-            print(f"   - Long (>5000 bytes): {long} ({long/len(lengths)*100:.1f}%)")
+            print(f"   - Very short (<500 bytes): {very_short} ({very_short/total*100:.1f}%)")
+            print(f"   - Short (500-2000 bytes): {short} ({short/total*100:.1f}%)")
+            print(f"   - Medium (2000-5000 bytes): {medium} ({medium/total*100:.1f}%)")
+            print(f"   - Long (>5000 bytes): {long} ({long/total*100:.1f}%)")
 
         print(f"\n👥 CREATOR STATISTICS")
-        print(f"   Unique creators: {len(patterns['unique_creators'])}")
-        print(f"   Articles per creator (avg): {len(articles_df)/len(patterns['unique_creators']):.2f}")
+        print(f"   Unique creators: {summary['unique_creators']}")
+        print(f"   Articles per creator (avg): {summary['articles_per_creator']:.2f}")
 
         # Top creators
         print(f"\n   Top 10 Most Active Creators:")
-        for idx, (creator, count) in enumerate(patterns['articles_per_creator'].most_common(10), 1):
+        for idx, (creator, count) in enumerate(summary['top_creators'], 1):
             print(f"   {idx}. {creator}: {count} articles")
 
         # Time patterns
         print(f"\n⏰ CREATION TIME PATTERNS")
         print(f"\n   By Hour of Day:")
-        for hour in sorted(patterns['by_hour_of_day'].keys()):
-            count = patterns['by_hour_of_day'][hour]
-            bar = '█' * (count // max(1, max(patterns['by_hour_of_day'].values()) // 20))
+        by_hour = summary['by_hour_of_day']
+        for hour, count in by_hour.items():
+            bar = '█' * (count // max(1, max(by_hour.values()) // 20))
             print(f"   {hour:02d}:00 - {count:3d} {bar}")
 
         print(f"\n   By Day of Week:")
-        day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        for day in day_order:
-            if day in patterns['by_day_of_week']:
-                count = patterns['by_day_of_week'][day]
-                bar = '█' * (count // max(1, max(patterns['by_day_of_week'].values()) // 20))
-                print(f"   {day:10s}: {count:3d} {bar}")
-
-        return patterns
+        by_day = summary['by_day_of_week']
+        for day, count in by_day.items():
+            bar = '█' * (count // max(1, max(by_day.values()) // 20))
+            print(f"   {day:10s}: {count:3d} {bar}")
 
     def analyze_revision_progression(self, revision_df, article_title):
         """Analyze how an article evolved through revisions"""
@@ -161,7 +546,7 @@ class MobileArticlePatternAnalyzer:
             mobile_indicator = "📱" if 'mobile' in str(tags).lower() else "🖥️"
             ve_indicator = "✏️" if 'visual' in str(tags).lower() else "📝"
 
-            print(f"   Rev {idx}: {length:5d} bytes ({growth_str:+6s}) {mobile_indicator}{ve_indicator} by {user}")
+            print(f"   Rev {idx}: {length:5d} bytes ({growth_str:>6s}) {mobile_indicator}{ve_indicator} by {user}")
 
         if len(revisions) > 10:
             print(f"   ... ({len(revisions) - 10} more revisions)")
@@ -205,67 +590,236 @@ class MobileArticlePatternAnalyzer:
             'unique_contributors': len(contributors)
         }
 
-    def generate_report(self, articles_df, output_path='analysis_report.md'):
-        """Generate a comprehensive markdown report"""
-
-        report = []
-        report.append("# Mobile Visual Editor Article Creation Analysis Report")
-        report.append(f"\nGenerated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        report.append("="*80 + "\n")
-
-        report.append("## Executive Summary\n")
-        report.append(f"- Total articles analyzed: {len(articles_df)}")
-        report.append(f"- Date range: Last 30 days")
-        report.append(f"- Platform: Mobile Web Visual Editor\n")
+    @timed()
+    def load_revision_histories(self, csv_paths, cache_path=None, workers=None):
+        """
+        Load many per-article revision exports (QUERY 3) into one frame with
+        an 'article' column naming the source of each row. Files are parsed
+        on a thread pool; with a cache_path, unchanged files are not parsed
+        again on later runs (see quarry_ingest.py).
+        """
+        return ingest_revision_histories(csv_paths, cache_path=cache_path, workers=workers, engine=self.engine)
+
+    @timed()
+    def analyze_revision_progressions(self, revisions_df):
+        """
+        Compute the analyze_revision_progression metrics for every article in
+        a combined revisions frame at once, with vectorized tag matching and
+        groupby instead of a loop per article. Returns one row per article,
+        in the order the articles first appear.
+        """
+        if revisions_df is None or len(revisions_df) == 0:
+            return pd.DataFrame(columns=['article'] + PROGRESSION_COLUMNS)
+
+        df = revisions_df
+        articles = df['article']
+        lengths = df['rev_len']
+        by_article = lengths.groupby(articles, sort=False, observed=True)
+
+        work = pd.DataFrame({
+            'article': articles,
+            'rev_timestamp': df['rev_timestamp'],
+            'rev_len': lengths,
+            # The first revision's growth is its whole length
+            'growth': lengths - by_article.shift(fill_value=0),
+            'mobile': tag_flag(df['tags'], 'mobile'),
+            've': tag_flag(df['tags'], 'visual'),
+        })
+        groups = work.groupby('article', sort=False, observed=True)
+
+        summary = groups.agg(
+            total_revisions=('mobile', 'size'),
+            mobile_edits=('mobile', 'sum'),
+            ve_edits=('ve', 'sum'),
+            largest_addition=('growth', 'max'),
+            largest_removal=('growth', 'min'),
+        )
+        # An article that only ever grew has removed nothing, and vice versa
+        summary['largest_addition'] = summary['largest_addition'].clip(lower=0)
+        summary['largest_removal'] = summary['largest_removal'].clip(upper=0)
+        summary['desktop_edits'] = summary['total_revisions'] - summary['mobile_edits']
+        summary['source_edits'] = summary['total_revisions'] - summary['ve_edits']
+        summary['unique_contributors'] = (df['rev_user_text'].groupby(articles, sort=False, observed=True)
+                                          .nunique(dropna=False))
+
+        # First and last rows by position, like revisions[0] and revisions[-1], even where values are missing
+        first = work.loc[~articles.duplicated(), ['article', 'rev_timestamp', 'rev_len']].set_index('article')
+        last = work.loc[~articles.duplicated(keep='last'), ['article', 'rev_timestamp', 'rev_len']].set_index('article')
+        summary['first_revision'] = first['rev_timestamp']
+        summary['latest_revision'] = last['rev_timestamp']
+        summary['initial_length'] = first['rev_len']
+        summary['final_length'] = last['rev_len']
+        summary['net_growth'] = summary['final_length'] - summary['initial_length']
+
+        return summary[PROGRESSION_COLUMNS].reset_index()
+
+    def print_progression_summary(self, progression_df, top=10):
+        """Print aggregate platform usage and growth over all analyzed articles"""
 
-        # Add patterns
-        patterns = self.analyze_first_revision_patterns(articles_df)
+        print(f"\n" + "="*80)
+        print(f"REVISION PROGRESSION: {len(progression_df)} articles")
+        print("="*80)
 
-        report.append("\n## Key Findings\n")
+        if len(progression_df) == 0:
+            print("No revision data available")
+            return
 
-        if patterns['length_distribution']:
-            avg_length = sum(patterns['length_distribution']) / len(patterns['length_distribution'])
-            report.append(f"### Initial Article Length")
-            report.append(f"- Average: {avg_length:.0f} bytes")
-            report.append(f"- This indicates that mobile VE articles typically start ")
+        total = progression_df['total_revisions'].sum()
+        print(f"\nTotal revisions: {total}")
+        print(f"Revisions per article (avg): {total/len(progression_df):.1f}")
 
-            if avg_length < 500:
-                report.append(f"as **stubs** - very short articles that need expansion.\n")
-            elif avg_length < 2000:
-                report.append(f"as **short articles** - basic but incomplete coverage.\n")
-            else:
-                report.append(f"as **substantial articles** - relatively complete from the start.\n")
+        print(f"\n🏷️  EDITING PLATFORM USAGE")
+        for label, column in (('Mobile edits', 'mobile_edits'), ('Desktop edits', 'desktop_edits'),
+                              ('Visual editor', 've_edits'), ('Source editor', 'source_edits')):
+            count = progression_df[column].sum()
+            print(f"   {label}: {count} ({count/total*100:.1f}%)")
 
-        report.append(f"\n### Creator Behavior")
-        report.append(f"- {len(patterns['unique_creators'])} unique creators")
+        collaborative = (progression_df['unique_contributors'] > 1).sum()
+        print(f"\n   Articles with multiple editors: {collaborative} ({collaborative/len(progression_df)*100:.1f}%)")
 
-        # Check if there are power users
-        top_creator_count = patterns['articles_per_creator'].most_common(1)[0][1] if patterns['articles_per_creator'] else 0
-        if top_creator_count > 5:
-            report.append(f"- Power users detected: Some creators made {top_creator_count}+ articles")
-            report.append(f"- This suggests experienced mobile editors are comfortable creating articles\n")
-        else:
-            report.append(f"- Most creators made only 1-2 articles")
-            report.append(f"- This suggests mobile article creation may be used by newcomers\n")
+        print(f"\n📈 ARTICLE GROWTH")
+        print(f"   Median net growth: {progression_df['net_growth'].median():.0f} bytes")
+        print(f"\n   Top {top} by net growth:")
+        for idx, row in enumerate(progression_df.nlargest(top, 'net_growth').itertuples(), 1):
+            print(f"   {idx}. {row.article}: {row.initial_length} -> {row.final_length} bytes "
+                  f"over {row.total_revisions} revisions")
+
+    @timed()
+    def generate_report(self, articles_df, output_path=REPORT_PATH, patterns=None):
+        """
+        Generate a comprehensive markdown report. Pass the patterns already
+        returned by analyze_first_revision_patterns to avoid recomputing them;
+        articles_df may then be None (chunked loading).
+        """
+        if patterns is None:
+            # Silently: the analysis was already printed by whoever computed it
+            patterns, _ = self.first_revision_stats(articles_df)
+        total_articles = len(articles_df) if articles_df is not None else self.article_count
+        report = render_markdown_report(summarize_first_revisions(patterns, total_articles))
 
         # Write report
         with open(output_path, 'w') as f:
-            f.write('\n'.join(report))
+            f.write(report)
 
         print(f"\n📄 Report saved to: {output_path}")
 
-        return '\n'.join(report)
-
-
-def main():
+        return report
+
+
+def add_analysis_stages(pipeline, analyzer, sketch_errors=None):
+    """
+    The statistics stages over whichever of the 'articles' and 'revisions'
+    inputs the pipeline has. With sketch_errors (a dict, possibly empty,
+    overriding SKETCH_ERRORS) the first-revision statistics come from
+    streaming sketches instead of the exact aggregates.
+    """
+    if 'articles' in pipeline and sketch_errors is not None:
+        errors = dict(SKETCH_ERRORS, **sketch_errors)
+        pipeline.stage('first_revision_sketches', ['articles'],
+                       lambda articles: analyzer.first_revision_sketches(articles, errors),
+                       version=STAGE_VERSIONS['first_revision_sketches'], params=errors)
+        pipeline.stage('first_revision_summary', ['first_revision_sketches'],
+                       lambda aggregator: aggregator.summary(),
+                       version=STAGE_VERSIONS['first_revision_summary'])
+    elif 'articles' in pipeline:
+        pipeline.stage('first_revision_stats', ['articles'], analyzer.first_revision_stats,
+                       version=STAGE_VERSIONS['first_revision_stats'])
+        pipeline.stage('first_revision_summary', ['first_revision_stats'],
+                       lambda stats: summarize_first_revisions(*stats),
+                       version=STAGE_VERSIONS['first_revision_summary'])
+    if 'revisions' in pipeline:
+        pipeline.stage('progression', ['revisions'], analyzer.analyze_revision_progressions,
+                       version=STAGE_VERSIONS['progression'])
+
+
+def write_reports(analyzer, pipeline, formats=REPORT_FORMATS):
+    """
+    Print the analysis and write the markdown, CSV and JSON reports, all
+    rendered from the same stage results; each stage runs at most once
+    """
+    summary = pipeline.get('first_revision_summary') if 'first_revision_summary' in pipeline else None
+    if summary is not None:
+        analyzer.print_first_revision_summary(summary)
+        if 'md' in formats:
+            with open(REPORT_PATH, 'w') as f:
+                f.write(render_markdown_report(summary))
+            print(f"\n📄 Report saved to: {REPORT_PATH}")
+
+    progression_df = pipeline.get('progression') if 'progression' in pipeline else None
+    if progression_df is not None:
+        analyzer.print_progression_summary(progression_df)
+        if 'csv' in formats:
+            progression_df.to_csv(PROGRESSION_PATH, index=False)
+            print(f"\n✅ Revision progression table saved to: {PROGRESSION_PATH}")
+
+    if 'json' in formats and (summary is not None or progression_df is not None):
+        with open(REPORT_JSON_PATH, 'w', encoding='utf-8') as f:
+            f.write(render_json_report(summary, progression_df))
+        print(f"📄 JSON report saved to: {REPORT_JSON_PATH}")
+
+    if pipeline.cache_dir:
+        print(f"🧮 Stages ({pipeline.cache_dir}): {', '.join(pipeline.describe())}")
+
+
+def analyze_warehouse(analyzer, warehouse_path, days=30, stage_cache=None, formats=REPORT_FORMATS,
+                      sketch_errors=None):
+    """Run the whole analysis from a local warehouse instead of Quarry CSV exports"""
+    from quarry_warehouse import QuarryWarehouse
+
+    # Whole days, so every run on the same day over an unchanged warehouse shares stage results
+    since = (datetime.utcnow() - timedelta(days=days)).strftime('%Y%m%d000000')
+    signature = [warehouse_path, since] + [file_signature(path) for path in (warehouse_path, warehouse_path + '-wal')
+                                           if os.path.exists(path)]
+
+    with QuarryWarehouse(warehouse_path) as warehouse:
+        def load_articles():
+            print(f"\n🗄️  Running QUERY 1 against {warehouse_path} (since {since[:8]})")
+            with analyzer.metrics.stage('warehouse_query_1'):
+                articles_df = warehouse.query(1, since=since)
+            if articles_df.empty:
+                print("\n⚠️  No mobile VE article creations in the warehouse")
+                return None
+            return articles_df
+
+        def load_revisions(articles_df):
+            # QUERY 3 for every article at once
+            with analyzer.metrics.stage('warehouse_revision_histories'):
+                return warehouse.revision_histories(articles_df['page_title'])
+
+        pipeline = AnalysisPipeline(stage_cache)
+        pipeline.source('articles', signature, load_articles)
+        # Only the progression table is worth keeping; the histories are re-read when it is stale
+        pipeline.stage('revisions', ['articles'], load_revisions, persist=False)
+        add_analysis_stages(pipeline, analyzer, sketch_errors)
+        write_reports(analyzer, pipeline, formats)
+
+
+def main(chunksize=0, engine=None, cache_path=CACHE_PATH, workers=None, warehouse_path=None, days=30,
+         metrics_path=METRICS_PATH, stage_cache=None, formats=REPORT_FORMATS, sketch_errors=None):
     print("="*80)
     print("MOBILE VISUAL EDITOR ARTICLE PATTERN ANALYZER")
     print("="*80)
 
-    analyzer = MobileArticlePatternAnalyzer()
+    analyzer = MobileArticlePatternAnalyzer(engine=engine)
+
+    if warehouse_path:
+        analyze_warehouse(analyzer, warehouse_path, days=days, stage_cache=stage_cache, formats=formats,
+                          sketch_errors=sketch_errors)
+    else:
+        analyze_exports(analyzer, chunksize=chunksize, cache_path=cache_path, workers=workers,
+                        stage_cache=stage_cache, formats=formats, sketch_errors=sketch_errors)
+
+    analyzer.metrics.print_summary()
+    if metrics_path:
+        json_path, prom_path = analyzer.metrics.write(metrics_path)
+        print(f"Run metrics saved to: {json_path} and {prom_path}")
+
 
-    # Look for CSV files from Quarry exports
-    csv_files = glob.glob('*.csv')
+def analyze_exports(analyzer, chunksize=0, cache_path=CACHE_PATH, workers=None, stage_cache=None,
+                    formats=REPORT_FORMATS, sketch_errors=None):
+    """Run the whole analysis from the Quarry CSV exports in the current directory"""
+    # Look for CSV files from Quarry exports (an earlier run's outputs are not exports)
+    csv_files = sorted(f for f in glob.glob('*.csv') if f not in OUTPUT_CSV_PATHS)
 
     if not csv_files:
         print("\n⚠️  No CSV files found in current directory")
@@ -286,34 +840,84 @@ def main():
             articles_file = f
             break
 
-    if not articles_file and csv_files:
-        articles_file = csv_files[0]
+    if not articles_file:
+        # Otherwise the first export that is not a revision history
+        articles_file = next((f for f in csv_files if 'revision' not in f.lower()), None)
 
-    if articles_file:
+    if not articles_file:
+        print("\n⚠️  Could not identify main articles CSV file")
+        return
+
+    # Inputs are only read when a stage result is not already cached
+    pipeline = AnalysisPipeline(stage_cache)
+
+    def load_articles():
+        if chunksize:
+            # Stream the export: only the aggregates are ever held in memory
+            print(f"\n📂 Streaming articles from: {articles_file} ({chunksize} rows per chunk)")
+            return analyzer.iter_article_chunks(articles_file, chunksize)
         print(f"\n📂 Loading articles from: {articles_file}")
-        articles_df = analyzer.load_article_list(articles_file)
+        return analyzer.load_article_list(articles_file)
 
-        if articles_df is not None:
-            # Analyze patterns
-            patterns = analyzer.analyze_first_revision_patterns(articles_df)
+    pipeline.source('articles', [articles_file, file_signature(articles_file)], load_articles)
 
-            # Generate report
-            analyzer.generate_report(articles_df)
+    # Look for revision history files
+    # Our own revision_progression.csv output is not an export
+    revision_files = discover_revision_files(exclude=OUTPUT_CSV_PATHS)
 
-            # Look for revision history files
-            revision_files = [f for f in csv_files if 'revision' in f.lower()]
+    if revision_files:
+        print(f"\nFound {len(revision_files)} revision history files")
 
-            if revision_files:
-                print(f"\n\nFound {len(revision_files)} revision history files")
+        # Every file at once: one combined frame, one groupby over all articles
+        pipeline.source('revisions', {path: file_signature(path) for path in revision_files},
+                        lambda: analyzer.load_revision_histories(revision_files, cache_path=cache_path,
+                                                                 workers=workers))
 
-                for rev_file in revision_files[:5]:  # Analyze first 5
-                    rev_df = analyzer.load_revision_history(rev_file)
-                    if rev_df is not None:
-                        article_title = os.path.splitext(rev_file)[0].replace('revisions_', '')
-                        analyzer.analyze_revision_progression(rev_df, article_title)
-    else:
-        print("\n⚠️  Could not identify main articles CSV file")
+    add_analysis_stages(pipeline, analyzer, sketch_errors)
+    write_reports(analyzer, pipeline, formats)
 
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Analyze Quarry CSV exports of mobile VE article creations')
+    parser.add_argument('--chunksize', type=int, default=0,
+                        help='Stream the articles list in chunks of this many rows (0 loads it at once)')
+    parser.add_argument('--engine', choices=['c', 'pyarrow'], default=None,
+                        help='CSV parser; pyarrow is multithreaded and used only when installed')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Threads parsing revision exports (default: one per core, plus four)')
+    parser.add_argument('--cache', default=CACHE_PATH,
+                        help='Parsed revision exports cache; unchanged files are not parsed again')
+    parser.add_argument('--no-cache', action='store_true', help='Always parse every revision export')
+    parser.add_argument('--warehouse', metavar='PATH',
+                        help='Query a local SQLite warehouse (see quarry_warehouse.py) instead of CSV exports')
+    parser.add_argument('--days', type=int, default=30, help='Creation window for --warehouse')
+    parser.add_argument('--stage-cache', metavar='DIR',
+                        help='Persist stage results here; reruns over unchanged inputs only render reports')
+    parser.add_argument('--formats', nargs='+', choices=REPORT_FORMATS, default=list(REPORT_FORMATS),
+                        help='Reports to write: analysis_report.md, revision_progression.csv, analysis_report.json')
+    parser.add_argument('--sketch', action='store_true',
+                        help='First-revision statistics from mergeable streaming sketches, in bounded memory')
+    parser.add_argument('--quantile-error', type=float, default=SKETCH_ERRORS['quantile'],
+                        help='--sketch: rank error of the median length')
+    parser.add_argument('--distinct-error', type=float, default=SKETCH_ERRORS['distinct'],
+                        help='--sketch: relative standard error of the unique creator count')
+    parser.add_argument('--top-error', type=float, default=SKETCH_ERRORS['top'],
+                        help='--sketch: top creator count error, as a fraction of all articles')
+    parser.add_argument('--metrics', metavar='BASE', default=METRICS_PATH,
+                        help='Write stage timings to BASE.json and BASE.prom (Prometheus textfile)')
+    parser.add_argument('--no-metrics', action='store_true', help='Only print the stage timings')
+    parser.add_argument('--profile', metavar='PATH', help='cProfile the run and save the stats here')
+    parser.add_argument('--sample-stacks', metavar='PATH',
+                        help='Sample every thread\'s stack and save collapsed stacks here (for flame graphs)')
+    args = parser.parse_args()
+
+    with profiled(args.profile), sampled(args.sample_stacks):
+        main(chunksize=args.chunksize, engine=args.engine,
+             cache_path=None if args.no_cache else args.cache, workers=args.workers,
+             warehouse_path=args.warehouse, days=args.days,
+             metrics_path=None if args.no_metrics else args.metrics,
+             stage_cache=args.stage_cache, formats=args.formats,
+             sketch_errors={'quantile': args.quantile_error, 'distinct': args.distinct_error,
+                            'top': args.top_error} if args.sketch else None)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Analysis Process Pool Benchmark
+Times WikipediaAnalyzer.analyze_articles in-process and with 1/2/4/8 worker
+processes on a synthetic corpus, and checks that every run produces the
+same patterns in the same order
+"""
+
+import argparse
+import os
+import time
+
+from synthetic_wiki import generate_corpus
+from wikipedia_mobile_analysis import WikipediaAnalyzer
+
+
+def build_jobs(pages: int, max_revisions: int, seed: int):
+    """Synthetic pages in the (key, revisions, previous) shape analyze_articles expects"""
+    corpus = generate_corpus(pages=pages, max_revisions=max_revisions, seed=seed)
+    jobs = []
+    for page in corpus:
+        revisions = [dict(revision, slots={'main': {'*': revision['content']}}) for revision in page['revisions']]
+        for revision in revisions:
+            del revision['content']
+        jobs.append((page['title'], revisions, None))
+    return jobs
+
+
+def run(analyzer, jobs, workers):
+    start = time.perf_counter()
+    results = list(analyzer.analyze_articles(iter(jobs), workers=workers))
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark process-pool revision analysis on synthetic articles')
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--max-revisions', type=int, default=40)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    jobs = build_jobs(args.pages, args.max_revisions, args.seed)
+    revisions = sum(len(job[1]) for job in jobs)
+    analyzer = WikipediaAnalyzer()
+
+    print("=" * 80)
+    print("ANALYSIS PROCESS POOL BENCHMARK")
+    print(f"{len(jobs)} articles, {revisions} revisions, {os.cpu_count()} CPUs available")
+    print("=" * 80)
+
+    baseline, expected = run(analyzer, jobs, 0)
+    print(f"  in-process  : {baseline:7.2f}s  {revisions / baseline:9.1f} revisions/s")
+
+    for workers in args.workers:
+        elapsed, results = run(analyzer, jobs, workers)
+        identical = 'identical' if results == expected else 'DIFFERENT OUTPUT'
+        print(f"  workers={workers:<3d}: {elapsed:7.2f}s  {revisions / elapsed:9.1f} revisions/s  "
+              f"{baseline / elapsed:5.2f}x  {identical}")
+
+
+if __name__ == "__main__":
+    main()
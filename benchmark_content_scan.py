@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Revision Content Scanner Benchmark
+Compares WikipediaAnalyzer.analyze_revision_content against the original
+per-line implementation, and incremental against full re-parse history
+analysis, on a synthetic wikitext corpus generated here
+"""
+
+import argparse
+import random
+import time
+from typing import List, Dict, Any
+
+from synthetic_wiki import WORDS, generate_history
+from wikipedia_mobile_analysis import WikipediaAnalyzer
+
+
+def reference_analyze_revision_content(content: str) -> Dict[str, Any]:
+    """The original line-by-line implementation, kept as the correctness reference"""
+    lines = content.split('\n')
+
+    analysis = {
+        'total_chars': len(content),
+        'total_lines': len(lines),
+        'sections': [],
+        'has_infobox': False,
+        'has_references': False,
+        'has_categories': False,
+        'has_images': False,
+        'reference_count': 0,
+        'category_count': 0,
+        'image_count': 0,
+        'external_links': 0,
+        'template_count': 0,
+        'lead_length': 0,
+        'wikilinks_count': 0
+    }
+
+    lead_section = []
+    in_lead = True
+
+    for line in lines:
+        if line.strip().startswith('=='):
+            in_lead = False
+            level = len(line) - len(line.lstrip('='))
+            section_title = line.strip('= \t\n')
+            analysis['sections'].append({
+                'title': section_title,
+                'level': level // 2
+            })
+        elif in_lead:
+            lead_section.append(line)
+
+        if '{{Infobox' in line or '{{infobox' in line:
+            analysis['has_infobox'] = True
+
+        if '[[File:' in line or '[[Image:' in line:
+            analysis['has_images'] = True
+            analysis['image_count'] += line.count('[[File:') + line.count('[[Image:')
+
+        if '[[Category:' in line:
+            analysis['has_categories'] = True
+            analysis['category_count'] += line.count('[[Category:')
+
+        if '<ref' in line:
+            analysis['has_references'] = True
+            analysis['reference_count'] += line.count('<ref')
+
+        if '{{' in line:
+            analysis['template_count'] += line.count('{{')
+
+        if '[[' in line:
+            analysis['wikilinks_count'] += line.count('[[')
+
+        if line.strip().startswith('*') and ('http://' in line or 'https://' in line):
+            analysis['external_links'] += 1
+
+    analysis['lead_length'] = len('\n'.join(lead_section))
+
+    return analysis
+
+
+def _short_line_block(rng: random.Random) -> str:
+    """Infobox parameters, lists and tables: the many-short-lines shape of real articles"""
+    lines = ['{{Infobox person']
+    lines += [f"| {rng.choice(WORDS)}_{i} = [[{rng.choice(WORDS).capitalize()}]]" for i in range(rng.randint(10, 40))]
+    lines.append('}}')
+    lines += [f"* {rng.choice(WORDS).capitalize()} ({rng.randint(1900, 2025)})" for _ in range(rng.randint(10, 60))]
+    lines.append('{| class="wikitable"')
+    for _ in range(rng.randint(5, 30)):
+        lines += ['|-', f"| {rng.choice(WORDS)} || {rng.randint(1, 9999)} || [[{rng.choice(WORDS)}]]"]
+    lines.append('|}')
+    lines += [f"* [https://example.org/{rng.randint(1, 10 ** 6)} {rng.choice(WORDS)}]" for _ in range(rng.randint(3, 15))]
+    return '\n'.join(lines)
+
+
+def generate_revisions(count: int, target_kb: int, seed: int = 0) -> List[str]:
+    """Build `count` revisions of roughly `target_kb` kilobytes each"""
+    rng = random.Random(seed)
+    revisions = []
+    for index in range(count):
+        parts = []
+        size = 0
+        while size < target_kb * 1024:
+            part = generate_history(rng, f"Benchmark {index}", rng.randint(20, 60))[-1]
+            part += '\n' + _short_line_block(rng)
+            parts.append(part)
+            size += len(part)
+        revisions.append('\n'.join(parts))
+    return revisions
+
+
+def generate_edit_history(revisions: int, target_kb: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """A long article edited a few lines at a time, in get_page_revisions shape"""
+    rng = random.Random(seed)
+    content = generate_revisions(1, target_kb, seed)[0]
+    history = []
+    for index in range(revisions):
+        lines = content.split('\n')
+        position = rng.randrange(len(lines))
+        action = rng.random()
+        if action < 0.5:
+            lines.insert(position, _short_line_block(rng).split('\n')[rng.randrange(5)])
+        elif action < 0.8:
+            lines[position] += f" {rng.choice(WORDS)}<ref>{{{{cite web|url=https://example.org/{index}}}}}</ref>"
+        elif action < 0.9:
+            lines.insert(position, f"== {rng.choice(WORDS).capitalize()} {index} ==")
+        else:
+            del lines[position]
+        content = '\n'.join(lines)
+        history.append({'revid': index + 1, 'timestamp': '2025-01-01T00:00:00Z', 'user': 'Bench',
+                        'tags': [], 'comment': '', 'slots': {'main': {'*': content}}})
+    return history
+
+
+def _time(function, revisions: List[str], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content in revisions:
+            function(content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark analyze_revision_content on synthetic wikitext')
+    parser.add_argument('--revisions', type=int, default=20)
+    parser.add_argument('--size-kb', type=int, default=300, help='Approximate size of each revision')
+    parser.add_argument('--history', type=int, default=200, help='Revisions in the edit-history benchmark')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    revisions = generate_revisions(args.revisions, args.size_kb, args.seed)
+    total_mb = sum(len(content) for content in revisions) / 1024 ** 2
+    analyzer = WikipediaAnalyzer()
+
+    print("=" * 80)
+    print("REVISION CONTENT SCANNER BENCHMARK")
+    print(f"{len(revisions)} revisions, {total_mb:.1f} MB of wikitext")
+    print("=" * 80)
+
+    mismatches = sum(1 for content in revisions
+                     if analyzer.analyze_revision_content(content) != reference_analyze_revision_content(content))
+    print(f"  Output identical to reference: {'yes' if mismatches == 0 else f'NO ({mismatches} differ)'}")
+
+    reference = _time(reference_analyze_revision_content, revisions, args.repeat)
+    scanner = _time(analyzer.analyze_revision_content, revisions, args.repeat)
+
+    print(f"  per-line reference : {reference * 1000 / len(revisions):8.2f} ms/revision  {total_mb / reference:7.1f} MB/s")
+    print(f"  compiled scanner   : {scanner * 1000 / len(revisions):8.2f} ms/revision  {total_mb / scanner:7.1f} MB/s")
+    print(f"  speedup            : {reference / scanner:8.1f}x")
+
+    history = generate_edit_history(args.history, args.size_kb, args.seed)
+    print(f"\nEDIT HISTORY: {len(history)} revisions of a ~{args.size_kb} KB article")
+
+    full = analyzer.analyze_editing_pattern(history, incremental=False)
+    incremental = analyzer.analyze_editing_pattern(history, incremental=True)
+    print(f"  Incremental output identical to full re-parse: {'yes' if full == incremental else 'NO'}")
+
+    full_time = _time(lambda _: analyzer.analyze_editing_pattern(history, incremental=False), [None], args.repeat)
+    incremental_time = _time(lambda _: analyzer.analyze_editing_pattern(history, incremental=True), [None], args.repeat)
+    print(f"  full re-parse      : {full_time * 1000:8.1f} ms")
+    print(f"  incremental        : {incremental_time * 1000:8.1f} ms")
+    print(f"  speedup            : {full_time / incremental_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
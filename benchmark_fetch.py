@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Revision Fetch Throughput Benchmark
+Compares the serial fetch loop against the concurrent fetcher using the
+fake MediaWiki API, so no requests reach Wikipedia
+"""
+
+import argparse
+import time
+
+from fake_mediawiki_api import FakeMediaWikiAPI
+from synthetic_wiki import generate_corpus
+from rate_limiter import RateController
+from wikipedia_mobile_analysis import WikipediaAnalyzer
+
+
+def run_serial(api_url, titles):
+    # Unpaced: this measures fetch throughput, not politeness
+    analyzer = WikipediaAnalyzer(api_url=api_url, rate_controller=RateController(rate=None))
+    start = time.perf_counter()
+    for title in titles:
+        analyzer.get_page_revisions(title)
+    return time.perf_counter() - start
+
+
+def run_concurrent(api_url, titles, concurrency):
+    analyzer = WikipediaAnalyzer(api_url=api_url, max_connections=concurrency,
+                                 rate_controller=RateController(rate=None))
+    start = time.perf_counter()
+    for _title, _revisions in analyzer.iter_page_revisions(titles, concurrency=concurrency):
+        pass
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark revision fetching against a fake MediaWiki API')
+    parser.add_argument('--pages', type=int, default=100)
+    parser.add_argument('--max-revisions', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.05, help='Simulated seconds per API request')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    corpus = generate_corpus(pages=args.pages, max_revisions=args.max_revisions)
+    titles = [page['title'] for page in corpus]
+
+    print("=" * 80)
+    print("REVISION FETCH BENCHMARK")
+    print(f"{len(titles)} pages, {args.latency * 1000:.0f} ms simulated latency per request")
+    print("=" * 80)
+
+    with FakeMediaWikiAPI(corpus, latency=args.latency) as api:
+        elapsed = run_serial(api.api_url, titles)
+        print(f"  serial          : {elapsed:7.2f}s  {len(titles) / elapsed:8.1f} pages/s")
+
+        for concurrency in args.concurrency:
+            elapsed = run_concurrent(api.api_url, titles, concurrency)
+            print(f"  concurrency={concurrency:<3d}: {elapsed:7.2f}s  {len(titles) / elapsed:8.1f} pages/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Lazy-Content Milestone Benchmark
+Checks the milestones --lazy-content finds by bisection against a full
+scan of every revision, on a synthetic corpus with reverts and on a
+history where an element is added, reverted away and added again before
+the bisected boundary. Also reports how many revision contents each mode
+downloads.
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+
+from fake_mediawiki_api import FakeMediaWikiAPI
+from rate_limiter import RateController
+from synthetic_wiki import generate_corpus
+from wikipedia_mobile_analysis import MILESTONES, WikipediaAnalyzer
+
+
+def revert_history():
+    """
+    A page whose categories appear at revision 3, are reverted away at
+    revision 4 (back to revision 2's text) and return at revision 7: the
+    presence pattern 0010001111, which bisection alone reports as 7
+    """
+    texts = [' '.join(['Lead text.'] * (index + 1)) for index in range(10)]
+    present = '0010001111'
+    contents = [text + ('\n[[Category:Example]]' if flag == '1' else '') for text, flag in zip(texts, present)]
+    contents[3] = contents[1]
+
+    revisions = []
+    for index, content in enumerate(contents):
+        encoded = content.encode('utf-8')
+        revisions.append({
+            'revid': 9000001 + index, 'parentid': 9000000 + index if index else 0,
+            'timestamp': f"2025-01-01T00:{index:02d}:00Z", 'user': 'Example', 'userid': 1,
+            'size': len(encoded), 'sha1': hashlib.sha1(encoded).hexdigest(), 'tags': [],
+            'comment': 'Revert' if index == 3 else 'Edit', 'content': content
+        })
+    return {'pageid': 90000, 'ns': 0, 'title': 'Reverted categories', 'revisions': revisions}
+
+
+def compare(analyzer, page):
+    """(lazy milestones, full-scan milestones, contents downloaded lazily) for one page"""
+    revisions = analyzer.get_page_revisions(page['title'], content=False)
+    lazy = analyzer.analyze_milestones(revisions)
+    full = analyzer.analyze_editing_pattern(analyzer.get_page_revisions(page['title']))
+    keys = list(MILESTONES)
+    return ({key: lazy['progression'][key] for key in keys}, {key: full['progression'][key] for key in keys},
+            lazy['content_revisions_fetched'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check lazy-content milestones against a full scan')
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--max-revisions', type=int, default=20)
+    parser.add_argument('--revert-rate', type=float, default=0.05)
+    args = parser.parse_args()
+
+    corpus = generate_corpus(pages=args.pages, max_revisions=args.max_revisions, revert_rate=args.revert_rate)
+    special = revert_history()
+
+    print("=" * 80)
+    print("LAZY-CONTENT MILESTONES vs FULL SCAN")
+    print(f"{len(corpus)} synthetic pages (revert rate {args.revert_rate}) plus a constructed revert")
+    print("=" * 80)
+
+    with FakeMediaWikiAPI(corpus + [special]) as api:
+        analyzer = WikipediaAnalyzer(api_url=api.api_url, rate_controller=RateController(rate=None))
+        with contextlib.redirect_stdout(io.StringIO()):
+            lazy, full, fetched = compare(analyzer, special)
+            results = [compare(analyzer, page) for page in corpus]
+
+    print(f"  constructed revert: lazy categories at {lazy['when_categories_added']}, "
+          f"full scan {full['when_categories_added']}  {'ok' if lazy == full else 'MISMATCH'}")
+
+    mismatches = sum(lazy != full for lazy, full, _ in results)
+    downloaded = sum(fetched for _, _, fetched in results)
+    total = sum(len(page['revisions']) for page in corpus)
+    print(f"  corpus: {len(corpus) - mismatches}/{len(corpus)} pages with identical milestones")
+    print(f"  contents downloaded: lazy {downloaded}, full scan {total} ({downloaded / total:.0%})")
+    print(f"\n  All milestones identical: {'yes' if mismatches == 0 and lazy == full else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
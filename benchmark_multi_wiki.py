@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Multi-Wiki Crawl Benchmark
+Crawls several fake MediaWiki APIs of different sizes, one after the other
+and then concurrently with crawl_wikis(), each wiki held to the same rate
+budget. The concurrent wall time should be close to the largest wiki's,
+not the sum, and the merged outputs must equal the per-wiki ones.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from analysis_records import iter_analyses
+from fake_mediawiki_api import FakeMediaWikiAPI
+from synthetic_wiki import generate_corpus
+from wikipedia_mobile_analysis import ANALYSES_PATH, FAST_SETTINGS, crawl_wikis, wiki_key
+
+
+@contextlib.contextmanager
+def scratch_directory():
+    """Run in a fresh temporary directory, as the crawl writes its outputs to the current one"""
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            yield directory
+        finally:
+            os.chdir(previous)
+
+
+def crawl(api_urls, rate_settings, limit):
+    """(seconds, merged analyses keyed by (wiki, page_id)) for one crawl_wikis() run in a scratch directory"""
+    with scratch_directory():
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            crawl_wikis(api_urls, rate_settings=rate_settings, limit=limit, metrics_path=None,
+                        concurrency=FAST_SETTINGS['concurrency'])
+        seconds = time.perf_counter() - start
+        return seconds, {(record['wiki'], record['page_id']): record for record in iter_analyses(ANALYSES_PATH)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark concurrent multi-wiki crawls against crawling one by one')
+    parser.add_argument('--pages', type=int, nargs='+', default=[200, 100, 50, 50],
+                        help='Pages of each fake wiki (one wiki per value)')
+    parser.add_argument('--max-revisions', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.02, help='Simulated seconds per API request')
+    parser.add_argument('--rate', type=float, default=20.0, help='Requests per second allowed per wiki')
+    parser.add_argument('--limit', type=int, default=0, help='Articles to analyze per wiki (0 for all)')
+    args = parser.parse_args()
+
+    # A fixed budget per wiki, so each wiki's crawl time follows from its size
+    rate_settings = {'rate': args.rate, 'min_rate': args.rate, 'max_rate': args.rate}
+    apis = [FakeMediaWikiAPI(generate_corpus(pages=pages, max_revisions=args.max_revisions, seed=seed),
+                             latency=args.latency) for seed, pages in enumerate(args.pages)]
+    api_urls = [api.start() for api in apis]
+
+    print("=" * 80)
+    print("MULTI-WIKI CRAWL BENCHMARK")
+    print(f"{len(apis)} wikis of {args.pages} pages, {args.rate:.0f} req/s each, {args.latency * 1000:.0f}ms latency")
+    print("=" * 80)
+
+    try:
+        one_by_one = {}
+        serial_seconds = 0.0
+        for api_url, pages in zip(api_urls, args.pages):
+            seconds, analyses = crawl([api_url], rate_settings, args.limit)
+            serial_seconds += seconds
+            one_by_one.update(analyses)
+            print(f"  {wiki_key(api_url):<18s} {pages:5d} pages  {len(analyses):5d} analyses  {seconds:6.2f}s")
+        print(f"  {'one by one':<18s} {'':30s}{serial_seconds:6.2f}s")
+
+        concurrent_seconds, merged = crawl(api_urls, rate_settings, args.limit)
+        print(f"  {'concurrent':<18s} {'':11s}{len(merged):5d} analyses  {concurrent_seconds:6.2f}s"
+              f"  ({serial_seconds / concurrent_seconds:.1f}x)")
+    finally:
+        for api in apis:
+            api.stop()
+
+    same = merged.keys() == one_by_one.keys() and all(
+        merged[key]['editing_pattern'] == one_by_one[key]['editing_pattern'] for key in merged)
+    shared = len({page_id for _, page_id in merged}) < len(merged)
+    print(f"\n  Merged analyses identical to per-wiki crawls: {'yes' if same else 'NO'}"
+          f"{' (page ids repeat across wikis; kept apart by wiki)' if shared else ''}")
+
+
+if __name__ == "__main__":
+    main()
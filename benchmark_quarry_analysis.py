@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Quarry Analysis Benchmark
+Compares the typed loader against a bare read_csv, and the vectorized
+analyze_first_revision_patterns against the original per-record loop, on a
+generated Quarry QUERY 1 export; optionally compares the batch revision
+progression against the per-file loop on generated QUERY 3 exports
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from collections import defaultdict, Counter
+
+import pandas as pd
+
+from analyze_quarry_results import MobileArticlePatternAnalyzer
+from quarry_loader import read_quarry_csv
+from synthetic_quarry import write_articles_csv, write_revision_csvs
+
+
+def reference_analyze_first_revision_patterns(articles_df):
+    """The original per-record implementation, kept as the correctness reference"""
+
+    print("\n" + "="*80)
+    print("FIRST REVISION PATTERNS ANALYSIS")
+    print("="*80)
+
+    patterns = {
+        'length_distribution': [],
+        'by_hour_of_day': defaultdict(int),
+        'by_day_of_week': defaultdict(int),
+        'unique_creators': set(),
+        'articles_per_creator': Counter()
+    }
+
+    for article in articles_df.to_dict('records'):
+        # Length distribution
+        if 'initial_length' in article:
+            patterns['length_distribution'].append(article['initial_length'])
+
+        # Creator statistics
+        if 'creator' in article:
+            creator = article['creator']
+            patterns['unique_creators'].add(creator)
+            patterns['articles_per_creator'][creator] += 1
+
+        # Time patterns
+        if 'creation_timestamp' in article:
+            try:
+                timestamp = pd.to_datetime(article['creation_timestamp'])
+                patterns['by_hour_of_day'][timestamp.hour] += 1
+                patterns['by_day_of_week'][timestamp.day_name()] += 1
+            except:
+                pass
+
+    # Calculate statistics
+    lengths = patterns['length_distribution']
+
+    print(f"\n📊 INITIAL ARTICLE LENGTH STATISTICS")
+    print(f"   Total articles analyzed: {len(lengths)}")
+    if lengths:
+        print(f"   Average length: {sum(lengths)/len(lengths):.0f} bytes")
+        print(f"   Median length: {sorted(lengths)[len(lengths)//2]:.0f} bytes")
+        print(f"   Min length: {min(lengths)} bytes")
+        print(f"   Max length: {max(lengths)} bytes")
+
+        # Categorize by length
+        very_short = len([l for l in lengths if l < 500])
+        short = len([l for l in lengths if 500 <= l < 2000])
+        medium = len([l for l in lengths if 2000 <= l < 5000])
+        long = len([l for l in lengths if l >= 5000])
+
+        print(f"\n   Length Categories:")
+        print(f"   - Very short (<500 bytes): {very_short} ({very_short/len(lengths)*100:.1f}%)")
+        print(f"   - Short (500-2000 bytes): {short} ({short/len(lengths)*100:.1f}%)")
+        print(f"   - Medium (2000-5000 bytes): {medium} ({medium/len(lengths)*100:.1f}%)")
+        print(f"   - Long (>5000 bytes): {long} ({long/len(lengths)*100:.1f}%)")
+
+    print(f"\n👥 CREATOR STATISTICS")
+    print(f"   Unique creators: {len(patterns['unique_creators'])}")
+    print(f"   Articles per creator (avg): {len(articles_df)/len(patterns['unique_creators']):.2f}")
+
+    # Top creators
+    print(f"\n   Top 10 Most Active Creators:")
+    for idx, (creator, count) in enumerate(patterns['articles_per_creator'].most_common(10), 1):
+        print(f"   {idx}. {creator}: {count} articles")
+
+    # Time patterns
+    print(f"\n⏰ CREATION TIME PATTERNS")
+    print(f"\n   By Hour of Day:")
+    for hour in sorted(patterns['by_hour_of_day'].keys()):
+        count = patterns['by_hour_of_day'][hour]
+        bar = '█' * (count // max(1, max(patterns['by_hour_of_day'].values()) // 20))
+        print(f"   {hour:02d}:00 - {count:3d} {bar}")
+
+    print(f"\n   By Day of Week:")
+    day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    for day in day_order:
+        if day in patterns['by_day_of_week']:
+            count = patterns['by_day_of_week'][day]
+            bar = '█' * (count // max(1, max(patterns['by_day_of_week'].values()) // 20))
+            print(f"   {day:10s}: {count:3d} {bar}")
+
+    return patterns
+
+
+def _run(function, articles_df):
+    """Call function, capturing its printed report; returns (seconds, patterns, report)"""
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        patterns = function(articles_df)
+    return time.perf_counter() - start, patterns, output.getvalue()
+
+
+def benchmark_revision_progressions(files, revisions, seed):
+    """Per-file analyze_revision_progression over every export vs one batch groupby"""
+    analyzer = MobileArticlePatternAnalyzer()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        paths = write_revision_csvs(workdir, files, revisions, seed)
+
+        print("=" * 80)
+        print("REVISION PROGRESSION BENCHMARK")
+        print(f"{files} revision files, {revisions} revisions each")
+        print("=" * 80)
+
+        output = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            expected = {}
+            for path in paths:
+                title = os.path.splitext(os.path.basename(path))[0].replace('revisions_', '')
+                expected[title] = analyzer.analyze_revision_progression(analyzer.load_revision_history(path), title)
+        per_file = time.perf_counter() - start
+        print(f"  per-file loop      : {per_file:8.2f}s")
+
+        start = time.perf_counter()
+        revisions_df = analyzer.load_revision_histories(paths)
+        loaded = time.perf_counter()
+        progression = analyzer.analyze_revision_progressions(revisions_df)
+        batch = time.perf_counter() - start
+        print(f"  batch              : {batch:8.2f}s  (load {loaded - start:.2f}s, "
+              f"analyze {time.perf_counter() - loaded:.2f}s)")
+
+        # Ingestion alone: one parser thread, the default pool, and a warm cache
+        cache_path = os.path.join(workdir, 'revision_histories.parquet')
+        for label, options in (('load, 1 thread', {'workers': 1}),
+                               ('load, thread pool', {}),
+                               ('load, cold cache', {'cache_path': cache_path}),
+                               ('load, warm cache', {'cache_path': cache_path})):
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                cached = analyzer.load_revision_histories(paths, **options)
+                elapsed = time.perf_counter() - start
+            same = cached.equals(revisions_df)
+            print(f"  {label:<19s}: {elapsed:8.2f}s{'' if same else '  (frame differs!)'}")
+
+    print(f"  speedup            : {per_file / batch:8.1f}x")
+    columns = list(next(iter(expected.values())))
+    actual = {row['article']: {column: int(row[column]) for column in columns}
+              for row in progression.to_dict('records')}
+    print(f"  Results identical  : {'yes' if actual == expected else 'NO'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark analyze_first_revision_patterns on a generated export')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--csv', help='Use this articles CSV instead of generating one')
+    parser.add_argument('--skip-reference', action='store_true', help='Only time the vectorized version')
+    parser.add_argument('--revision-files', type=int, default=0,
+                        help='Also benchmark revision progression over this many generated QUERY 3 files')
+    parser.add_argument('--revisions', type=int, default=200, help='Revisions per generated file')
+    args = parser.parse_args()
+
+    if args.revision_files:
+        benchmark_revision_progressions(args.revision_files, args.revisions, args.seed)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        csv_path = args.csv
+        if not csv_path:
+            csv_path = os.path.join(workdir, 'articles_list.csv')
+            start = time.perf_counter()
+            write_articles_csv(csv_path, args.rows, args.seed)
+            print(f"Generated {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+        print("=" * 80)
+        print("QUARRY CSV LOADING")
+        print("=" * 80)
+        for label, load in (('untyped read_csv', lambda: pd.read_csv(csv_path)),
+                            ('typed loader (c)', lambda: read_quarry_csv(csv_path)),
+                            ('typed loader (pyarrow)', lambda: read_quarry_csv(csv_path, engine='pyarrow'))):
+            start = time.perf_counter()
+            frame = load()
+            elapsed = time.perf_counter() - start
+            print(f"  {label:<22s}: {elapsed:6.2f}s  {frame.memory_usage(deep=True).sum() / 1024 ** 2:8.1f} MB in memory")
+
+        articles_df = read_quarry_csv(csv_path)
+
+    print("=" * 80)
+    print("FIRST REVISION PATTERNS BENCHMARK")
+    print(f"{len(articles_df)} articles")
+    print("=" * 80)
+
+    analyzer = MobileArticlePatternAnalyzer()
+    vectorized, patterns, report = _run(analyzer.analyze_first_revision_patterns, articles_df)
+    print(f"  vectorized         : {vectorized:8.2f}s")
+
+    if args.skip_reference:
+        return
+
+    reference, expected_patterns, expected_report = _run(reference_analyze_first_revision_patterns, articles_df)
+    print(f"  per-record loop    : {reference:8.2f}s")
+    print(f"  speedup            : {reference / vectorized:8.1f}x")
+    print(f"  Patterns identical : {'yes' if patterns == expected_patterns else 'NO'}")
+    print(f"  Report identical   : {'yes' if report == expected_report else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Streaming Sketch Benchmark
+Validates the --sketch first-revision statistics against the exact path on
+a generated Quarry QUERY 1 export: every quantile, the unique creator count
+and the top creators are checked against their error bounds, for one pass
+over chunks and for per-day partial aggregates built in worker processes
+and merged. Also compares time and the size of the state each path keeps.
+"""
+
+import argparse
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from analyze_quarry_results import (SKETCH_ERRORS, FirstRevisionAggregator, SketchedFirstRevisionAggregator,
+                                    summarize_first_revisions)
+from synthetic_quarry import generate_articles_frame
+
+QUANTILES = np.linspace(0.01, 0.99, 99)
+
+
+def _chunks(frame, chunksize):
+    for start in range(0, len(frame), chunksize):
+        yield frame.iloc[start:start + chunksize]
+
+
+def sketch_part(frame, errors, chunksize):
+    """One worker's partial aggregate (module level, so it pickles into a process pool)"""
+    aggregator = SketchedFirstRevisionAggregator(errors['quantile'], errors['distinct'], errors['top'])
+    for chunk in _chunks(frame, chunksize):
+        aggregator.add(chunk)
+    return aggregator
+
+
+def check(label, value, bound, ok):
+    print(f"  {label:<34s} {value:>12}   bound {bound:<12}  {'ok' if ok else 'OUT OF BOUNDS'}")
+    return ok
+
+
+def validate(aggregator, exact_lengths, exact_creators, rows):
+    """Every sketch estimate against the exact value; returns whether all are within bounds"""
+    summary = aggregator.summary()
+    ok = True
+
+    # Rank error over the whole distribution, not just the median
+    sketch = aggregator.lengths
+    rank_errors = []
+    for q in QUANTILES:
+        value = sketch.quantile(q)
+        low = np.searchsorted(exact_lengths, value, side='left') / len(exact_lengths)
+        high = np.searchsorted(exact_lengths, value, side='right') / len(exact_lengths)
+        # Ties: any rank the value occupies counts as exact
+        rank_errors.append(0.0 if low <= q <= high else min(abs(low - q), abs(high - q)))
+    ok &= check('max quantile rank error', f"{max(rank_errors):.4%}", f"{sketch.error:.2%}",
+                max(rank_errors) <= sketch.error)
+    exact_median = int(exact_lengths[len(exact_lengths) // 2])
+    print(f"  {'median (sketch / exact)':<34s} {summary['length']['median']:>12} / {exact_median}")
+
+    true_unique = len(exact_creators)
+    relative = (summary['unique_creators'] - true_unique) / true_unique
+    # The bound is a standard error: allow three of them
+    ok &= check('unique creators relative error', f"{relative:+.3%}",
+                f"±{3 * aggregator.creators.error:.2%} (3σ)", abs(relative) <= 3 * aggregator.creators.error)
+
+    space_saving = aggregator.top_creators
+    overcounts = [count - exact_creators.get(creator, 0) for creator, count in summary['top_creators']]
+    ok &= check('top creator max overcount', max(overcounts), f"{space_saving.floor} (≤ {space_saving.error * rows:.0f})",
+                0 <= min(overcounts) and max(overcounts) <= space_saving.floor <= space_saving.error * rows)
+    # Creators whose true count exceeds the error are guaranteed a counter
+    heavy = [creator for creator, count in exact_creators.most_common(10) if count > space_saving.floor]
+    found = sum(creator in space_saving.counts for creator in heavy)
+    ok &= check('exact top 10 above error kept', f"{found}/{len(heavy)}", 'all', found == len(heavy))
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Validate the streaming sketch statistics against the exact path')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunksize', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=4, help='Processes building per-day partial aggregates')
+    parser.add_argument('--power-users', type=float, default=0.05,
+                        help='Share of articles reassigned to a few Zipf-distributed prolific creators')
+    parser.add_argument('--quantile-error', type=float, default=SKETCH_ERRORS['quantile'])
+    parser.add_argument('--distinct-error', type=float, default=SKETCH_ERRORS['distinct'])
+    parser.add_argument('--top-error', type=float, default=SKETCH_ERRORS['top'])
+    args = parser.parse_args()
+    errors = {'quantile': args.quantile_error, 'distinct': args.distinct_error, 'top': args.top_error}
+
+    start = time.perf_counter()
+    articles_df = generate_articles_frame(args.rows, args.seed)
+    # The generated creators are nearly uniform; power users give Space-Saving real heavy hitters to find
+    rng = np.random.default_rng(args.seed)
+    power = rng.random(args.rows) < args.power_users
+    articles_df.loc[power, 'creator'] = np.char.add('PowerUser', rng.zipf(1.3, size=power.sum()).astype(str))
+    print(f"Generated {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+    print("=" * 80)
+    print("EXACT vs STREAMING SKETCHES")
+    print(f"{args.rows} articles in chunks of {args.chunksize}, errors {errors}")
+    print("=" * 80)
+
+    start = time.perf_counter()
+    exact = FirstRevisionAggregator()
+    for chunk in _chunks(articles_df, args.chunksize):
+        exact.add(chunk)
+    patterns = exact.patterns()
+    exact_summary = summarize_first_revisions(patterns, exact.rows)
+    exact_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    single = sketch_part(articles_df, errors, args.chunksize)
+    single.summary()
+    sketch_seconds = time.perf_counter() - start
+
+    # One partial aggregate per creation day, spread over worker processes, merged at the end
+    days = articles_df['creation_timestamp'] // 1000000
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        parts = list(pool.map(sketch_part, (frame for _, frame in articles_df.groupby(days, sort=False)),
+                              [errors] * days.nunique(), [args.chunksize] * days.nunique()))
+    merged = SketchedFirstRevisionAggregator(errors['quantile'], errors['distinct'], errors['top'])
+    for part in parts:
+        merged.merge(part)
+    merged_seconds = time.perf_counter() - start
+
+    print(f"  exact                 : {exact_seconds:8.2f}s  state {len(pickle.dumps(patterns)) / 1024:10.0f} KB")
+    print(f"  sketches, one pass    : {sketch_seconds:8.2f}s  state {len(pickle.dumps(single)) / 1024:10.0f} KB")
+    print(f"  sketches, {len(parts):3d} merged : {merged_seconds:8.2f}s  state {len(pickle.dumps(merged)) / 1024:10.0f} KB"
+          f"  (per-day parts in {args.workers} processes)")
+
+    exact_lengths = np.sort(exact.lengths().to_numpy())
+    all_ok = True
+    for label, aggregator in (('one pass', single), (f'{len(parts)} merged parts', merged)):
+        print(f"\n  Sketches, {label}:")
+        all_ok &= validate(aggregator, exact_lengths, patterns['articles_per_creator'], exact.rows)
+        summary = aggregator.summary()
+        same = all(summary[key] == exact_summary[key]
+                   for key in ('total_articles', 'length_categories', 'by_hour_of_day', 'by_day_of_week'))
+        print(f"  {'exact counters identical':<34s} {'yes' if same else 'NO':>12}")
+        all_ok &= same
+
+    print(f"\n  All estimates within bounds: {'yes' if all_ok else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
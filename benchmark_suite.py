@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Offline Benchmark Suite
+Runs a fixed set of benchmarks over both scripts on synthetic data - the
+content scanner, history analysis, the end-to-end main() crawl against the
+fake MediaWiki API and the Quarry analyzer - and appends the timings to a
+results file keyed by git commit, so regressions show up by comparing runs
+across commits
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Callable, Optional
+
+import analyze_quarry_results
+import wikipedia_mobile_analysis
+from benchmark_analysis_pool import build_jobs
+from benchmark_content_scan import generate_edit_history, generate_revisions
+from fake_mediawiki_api import FakeMediaWikiAPI
+from rate_limiter import RateController
+from synthetic_quarry import generate_articles_frame, write_corpus_exports, write_revision_csvs
+from synthetic_wiki import generate_corpus
+
+RESULTS_PATH = 'benchmark_results.jsonl'
+
+# Workload sizes; --quick is for checking the suite runs, not for comparing
+SIZES = {
+    'default': {'scan_revisions': 20, 'scan_kb': 100, 'history': 200, 'pages': 200, 'max_revisions': 20,
+                'crawl_pages': 300, 'latency': 0.01, 'quarry_rows': 500000, 'revision_files': 300,
+                'revisions_per_file': 50},
+    'quick': {'scan_revisions': 3, 'scan_kb': 50, 'history': 30, 'pages': 20, 'max_revisions': 8,
+              'crawl_pages': 40, 'latency': 0.0, 'quarry_rows': 20000, 'revision_files': 20,
+              'revisions_per_file': 20},
+}
+
+
+def _best(function: Callable[[], Any], repeat: int) -> float:
+    """Fastest of repeat runs; the minimum is the least noisy estimate on a shared machine"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@contextlib.contextmanager
+def _quiet_in(directory: str):
+    """Run in directory with stdout discarded: main() writes its outputs to the working directory"""
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        os.chdir(cwd)
+
+
+# --- benchmarks ------------------------------------------------------------------
+# Each takes the size dict and repeat count and returns {metric: value};
+# metrics ending in _seconds are the ones compared across commits.
+
+def bench_content_scan(size: Dict[str, Any], repeat: int) -> Dict[str, float]:
+    analyzer = wikipedia_mobile_analysis.WikipediaAnalyzer()
+    revisions = generate_revisions(size['scan_revisions'], size['scan_kb'])
+    seconds = _best(lambda: [analyzer.analyze_revision_content(content) for content in revisions], repeat)
+    megabytes = sum(len(content) for content in revisions) / 1024 ** 2
+    return {'analyze_revision_content_seconds': seconds, 'analyze_revision_content_mb_per_second': megabytes / seconds}
+
+
+def bench_editing_pattern(size: Dict[str, Any], repeat: int) -> Dict[str, float]:
+    analyzer = wikipedia_mobile_analysis.WikipediaAnalyzer()
+    history = generate_edit_history(size['history'], size['scan_kb'])
+    jobs = build_jobs(size['pages'], size['max_revisions'], seed=0)
+    return {
+        'analyze_editing_pattern_history_seconds': _best(lambda: analyzer.analyze_editing_pattern(history), repeat),
+        'analyze_editing_pattern_corpus_seconds': _best(
+            lambda: [analyzer.analyze_editing_pattern(revisions) for _, revisions, _ in jobs], repeat)
+    }
+
+
+def bench_crawl(size: Dict[str, Any], repeat: int) -> Dict[str, float]:
+    """The whole of wikipedia_mobile_analysis.main() against a local fake api.php"""
+    corpus = generate_corpus(pages=size['crawl_pages'], max_revisions=size['max_revisions'])
+    best = None
+    with FakeMediaWikiAPI(corpus, latency=size['latency']) as api:
+        for _ in range(repeat):
+            with tempfile.TemporaryDirectory() as directory, _quiet_in(directory):
+                requests_before = api.request_count
+                start = time.perf_counter()
+                # Unpaced, with the --fast concurrency: this measures the crawler, not the politeness policy
+                wikipedia_mobile_analysis.main(limit=0, api_url=api.api_url, rate_controller=RateController(rate=None),
+                                               concurrency=wikipedia_mobile_analysis.FAST_SETTINGS['concurrency'])
+                seconds = time.perf_counter() - start
+                with open(wikipedia_mobile_analysis.METRICS_PATH + '.json', 'r', encoding='utf-8') as f:
+                    stages = json.load(f)['stages']
+            if best is None or seconds < best['crawl_main_seconds']:
+                best = {
+                    'crawl_main_seconds': seconds,
+                    'crawl_api_requests': api.request_count - requests_before,
+                    'crawl_analysis_cpu_seconds': stages.get('analyze_editing_pattern', {}).get('cpu_seconds', 0.0)
+                }
+    return best
+
+
+def bench_quarry(size: Dict[str, Any], repeat: int) -> Dict[str, float]:
+    analyzer = analyze_quarry_results.MobileArticlePatternAnalyzer()
+    articles_df = generate_articles_frame(size['quarry_rows'])
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        results['quarry_first_revision_patterns_seconds'] = _best(
+            lambda: analyzer.analyze_first_revision_patterns(articles_df), repeat)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_revision_csvs(directory, size['revision_files'], size['revisions_per_file'])
+        with contextlib.redirect_stdout(io.StringIO()):
+            results['quarry_load_revisions_seconds'] = _best(
+                lambda: analyzer.load_revision_histories(paths, cache_path=None), repeat)
+            revisions_df = analyzer.load_revision_histories(paths, cache_path=None)
+            results['quarry_revision_progressions_seconds'] = _best(
+                lambda: analyzer.analyze_revision_progressions(revisions_df), repeat)
+
+    # The whole analyze_quarry_results.main() on the exports of a synthetic wiki
+    corpus = generate_corpus(pages=size['crawl_pages'], max_revisions=size['max_revisions'])
+    best = float('inf')
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as directory:
+            write_corpus_exports(corpus, directory)
+            with _quiet_in(directory):
+                start = time.perf_counter()
+                analyze_quarry_results.main(cache_path=None, metrics_path=None)
+                best = min(best, time.perf_counter() - start)
+    results['quarry_main_seconds'] = best
+    return results
+
+
+BENCHMARKS = {
+    'content_scan': bench_content_scan,
+    'editing_pattern': bench_editing_pattern,
+    'crawl': bench_crawl,
+    'quarry': bench_quarry,
+}
+
+
+# --- recording and comparing --------------------------------------------------------
+
+def git_revision() -> Dict[str, Any]:
+    """Current commit and whether the working tree has uncommitted changes"""
+    # The repository this script lives in, wherever it is run from
+    repo = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True, cwd=repo).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    capture_output=True, text=True, check=True, cwd=repo).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+    return {'commit': commit, 'dirty': dirty}
+
+
+def load_results(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def find_baseline(records: List[Dict[str, Any]], current: Dict[str, Any],
+                  commit: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    The latest earlier record of the same workload: from `commit` when given,
+    otherwise from any commit other than the current one
+    """
+    for record in reversed(records):
+        if record['size'] != current['size'] or record['python'] != current['python']:
+            continue
+        if commit is not None:
+            if record['commit'] and record['commit'].startswith(commit):
+                return record
+        elif record['commit'] != current['commit'] or record['dirty'] != current['dirty']:
+            return record
+    return None
+
+
+def compare(current: Dict[str, Any], baseline: Optional[Dict[str, Any]], threshold: float) -> List[str]:
+    """Print every metric next to the baseline's; returns the names of regressed timings"""
+    regressions = []
+    if baseline:
+        label = baseline['commit'] + (' (dirty)' if baseline['dirty'] else '')
+        print(f"\nCompared with {label} recorded {baseline['recorded_at']}:")
+    else:
+        print("\nNo earlier run of this workload to compare with")
+
+    for name, value in current['results'].items():
+        line = f"  {name:<44s} {value:12.4f}"
+        previous = baseline['results'].get(name) if baseline else None
+        if previous:
+            change = (value - previous) / previous
+            line += f"  {previous:12.4f}  {change:+7.1%}"
+            if name.endswith('_seconds') and change > threshold:
+                line += "  ⚠️  REGRESSION"
+                regressions.append(name)
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the offline benchmark suite and record results per commit')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='Run just these benchmarks')
+    parser.add_argument('--quick', action='store_true', help='Tiny workloads, to check the suite itself')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--results', default=RESULTS_PATH, help='JSONL file results are appended to')
+    parser.add_argument('--no-record', action='store_true', help='Compare only, do not append this run')
+    parser.add_argument('--baseline', metavar='COMMIT', help='Compare with this commit instead of the last other one')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Slowdown of a timing (fraction) reported as a regression')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit with status 1 on any regression')
+    args = parser.parse_args()
+
+    size_name = 'quick' if args.quick else 'default'
+    names = args.only or list(BENCHMARKS)
+
+    print("=" * 80)
+    print("OFFLINE BENCHMARK SUITE")
+    print(f"{size_name} workload, best of {args.repeat}: {', '.join(names)}")
+    print("=" * 80)
+
+    results = {}
+    for name in names:
+        start = time.perf_counter()
+        results.update(BENCHMARKS[name](SIZES[size_name], args.repeat))
+        print(f"  {name:<16s} done in {time.perf_counter() - start:6.1f}s")
+
+    record = dict(git_revision(), **{
+        'recorded_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'size': size_name,
+        'repeat': args.repeat,
+        'results': {name: round(value, 6) for name, value in results.items()}
+    })
+
+    baseline = find_baseline(load_results(args.results), record, args.baseline)
+    regressions = compare(record, baseline, args.threshold)
+
+    if not args.no_record:
+        with open(args.results, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+        print(f"\nResults appended to: {args.results}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
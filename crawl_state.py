@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Crawl Checkpoint State
+Persists recentchanges continue tokens, the newest processed timestamp per
+tag and the last analyzed revision per page, so crawls can resume after an
+interruption and daily runs only fetch what is new
+"""
+
+import json
+import os
+from typing import List, Dict, Any, Optional
+
+
+class CrawlState:
+    """
+    JSON checkpoint file plus a JSONL side file holding the pages collected
+    by the crawl that is currently in progress.
+
+    Layout of the JSON file:
+        tags.<tag>.newest_rcstart  upper bound of the last completed crawl
+        tags.<tag>.run             window, continue token and completion flag
+                                   of the crawl in progress
+        revisions.<pageid>         newest revid already analyzed
+    """
+
+    def __init__(self, path: str = 'crawl_state.json'):
+        self.path = path
+        self.pages_path = os.path.splitext(path)[0] + '.pages.jsonl'
+        self.data = {'tags': {}, 'revisions': {}}
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.data.update(json.load(f))
+
+    def save(self):
+        """Write the checkpoint atomically so a crash never leaves a torn file"""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    # --- recentchanges crawl -------------------------------------------------
+
+    def tag_state(self, tag: str) -> Dict[str, Any]:
+        return self.data['tags'].setdefault(tag, {})
+
+    def newest_rcstart(self, tag: str) -> Optional[str]:
+        return self.tag_state(tag).get('newest_rcstart')
+
+    def pending_run(self, tag: str) -> Optional[Dict[str, Any]]:
+        return self.tag_state(tag).get('run')
+
+    def start_run(self, tag: str, rcstart: str, rcend: str) -> Dict[str, Any]:
+        run = {'rcstart': rcstart, 'rcend': rcend, 'continue': None, 'complete': False}
+        self.tag_state(tag)['run'] = run
+        self.save()
+        return run
+
+    def record_batch(self, tag: str, pages: List[Dict[str, Any]], continue_param: Optional[Dict[str, Any]]):
+        """Append one batch of results and move the continue token past it"""
+        with open(self.pages_path, 'a', encoding='utf-8') as f:
+            for page in pages:
+                f.write(json.dumps({'tag': tag, 'page': page}, ensure_ascii=False) + '\n')
+
+        run = self.tag_state(tag)['run']
+        run['continue'] = continue_param
+        run['complete'] = continue_param is None
+        self.save()
+
+    def collected_pages(self) -> List[Dict[str, Any]]:
+        """Pages recorded so far by the crawl in progress (including interrupted runs)"""
+        if not os.path.exists(self.pages_path):
+            return []
+
+        pages = []
+        with open(self.pages_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    pages.append(json.loads(line)['page'])
+                except ValueError:
+                    # A crash mid-write can leave a truncated last line
+                    continue
+        return pages
+
+    def finish_runs(self):
+        """Promote every completed run to the tag's newest processed window"""
+        for tag_state in self.data['tags'].values():
+            run = tag_state.pop('run', None)
+            if run:
+                tag_state['newest_rcstart'] = run['rcstart']
+
+        if os.path.exists(self.pages_path):
+            os.remove(self.pages_path)
+        self.save()
+
+    # --- revision fetches ----------------------------------------------------
+
+    def last_revid(self, pageid: Any) -> Optional[int]:
+        return self.data['revisions'].get(str(pageid))
+
+    def set_last_revid(self, pageid: Any, revid: int):
+        self.data['revisions'][str(pageid)] = revid
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+MediaWiki XML Dump Reader
+Streams pages-meta-history / stub-meta-history dumps (.xml, .bz2 or .gz)
+as an offline alternative to the live API, yielding article creations with
+their revision histories in the shape get_page_revisions returns
+"""
+
+import bz2
+import gzip
+import re
+import xml.etree.ElementTree as ET
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Set, Tuple
+
+
+def open_dump(path: str, mode: str = 'rb'):
+    """Open a dump file, decompressing .bz2 and .gz on the fly"""
+    kwargs = {'encoding': 'utf-8', 'errors': 'replace'} if 't' in mode else {}
+    if path.endswith('.bz2'):
+        return bz2.open(path, mode, **kwargs)
+    if path.endswith('.gz'):
+        return gzip.open(path, mode, **kwargs)
+    return open(path, mode, **kwargs)
+
+
+def _local(tag: str) -> str:
+    """Strip the export schema namespace ({http://www.mediawiki.org/xml/export-0.11/}page -> page)"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _sha1_hex(base36: Optional[str]) -> Optional[str]:
+    """Dumps store sha1 in base 36; the API (and the analysis memo) use hex"""
+    if not base36:
+        return None
+    return format(int(base36, 36), '040x')
+
+
+def _parse_revision(elem: ET.Element, content: bool) -> Dict[str, Any]:
+    rev = {'revid': 0, 'parentid': 0, 'timestamp': None, 'user': None, 'userid': 0,
+           'size': 0, 'sha1': None, 'tags': [], 'comment': ''}
+    text = None
+
+    for child in elem:
+        name = _local(child.tag)
+        if name == 'id':
+            rev['revid'] = int(child.text)
+        elif name == 'parentid':
+            rev['parentid'] = int(child.text)
+        elif name == 'timestamp':
+            rev['timestamp'] = child.text
+        elif name == 'contributor':
+            for field in child:
+                field_name = _local(field.tag)
+                if field_name in ('username', 'ip'):
+                    rev['user'] = field.text
+                elif field_name == 'id':
+                    rev['userid'] = int(field.text)
+        elif name == 'comment':
+            rev['comment'] = child.text or ''
+        elif name == 'sha1':
+            rev['sha1'] = _sha1_hex(child.text)
+        elif name == 'text':
+            rev['size'] = int(child.get('bytes', 0))
+            text = child.text or ''
+
+    # Stub dumps carry no text; leave 'slots' out like a metadata-only API fetch
+    if content and text is not None:
+        rev['slots'] = {'main': {'*': text}}
+    return rev
+
+
+def iter_dump_pages(path: str, start: Optional[str] = None, end: Optional[str] = None,
+                    tags: Optional[Iterable[str]] = None,
+                    revision_tags: Optional[Dict[int, List[str]]] = None,
+                    namespaces: Tuple[int, ...] = (0,),
+                    content: bool = True) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """
+    Yield (page, revisions) for every page in the dump created in [start, end)
+    whose creating revision carries one of `tags`.
+
+    `page` has the fields get_new_pages_with_tags returns for a recentchanges
+    creation entry; `revisions` is the history oldest first, each revision
+    shaped like a get_page_revisions result. XML dumps do not record change
+    tags, so they come from `revision_tags` (see load_change_tags); without
+    it every revision has empty tags and `tags` must be None.
+
+    Elements are cleared as soon as they are read and pages that fail the
+    filters are skipped after their first revision, so memory stays flat on
+    multi-gigabyte dumps; only the history of one matching page is held.
+    """
+    wanted_tags = set(tags) if tags else None
+    revision_tags = revision_tags or {}
+    if wanted_tags and not revision_tags:
+        raise ValueError("Tag filtering needs revision_tags: XML dumps do not contain change tags")
+
+    with open_dump(path) as f:
+        yield from _iter_pages(f, start, end, wanted_tags, revision_tags, namespaces, content)
+
+
+def _iter_pages(f, start: Optional[str], end: Optional[str], wanted_tags: Optional[Set[str]],
+                revision_tags: Dict[int, List[str]], namespaces: Tuple[int, ...],
+                content: bool) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    context = ET.iterparse(f, events=('start', 'end'))
+    _, root = next(context)
+
+    page = page_elem = None
+    revisions = []
+    skip = False
+
+    for event, elem in context:
+        name = _local(elem.tag)
+
+        if event == 'start':
+            if name == 'page':
+                page, page_elem, revisions, skip = {}, elem, [], False
+            continue
+
+        if page is None:
+            # siteinfo and anything else outside <page>
+            if name == 'siteinfo':
+                root.clear()
+            continue
+
+        if name == 'revision':
+            if not skip:
+                rev = _parse_revision(elem, content)
+                rev['tags'] = revision_tags.get(rev['revid'], [])
+                if not revisions and not _is_wanted_creation(page, rev, start, end, wanted_tags, namespaces):
+                    skip = True
+                else:
+                    revisions.append(rev)
+            # Detach the revision too, so long histories do not pile up empty elements
+            page_elem.remove(elem)
+        elif name == 'page':
+            if not skip and revisions:
+                revisions.sort(key=lambda rev: rev['revid'])
+                yield _creation_entry(page, revisions[0]), revisions
+            page, page_elem, revisions = None, None, []
+            root.clear()
+        elif name in ('title', 'ns', 'id') and name not in page:
+            # <id> also appears inside <revision> and <contributor>; the page's own id comes first
+            page[name] = elem.text
+
+
+def _is_wanted_creation(page: Dict[str, Any], rev: Dict[str, Any], start: Optional[str], end: Optional[str],
+                        wanted_tags: Optional[Set[str]], namespaces: Tuple[int, ...]) -> bool:
+    if int(page.get('ns', 0)) not in namespaces:
+        return False
+    if rev.get('parentid'):
+        # History starts mid-way (page moved in or partial export): not a creation
+        return False
+    timestamp = rev['timestamp'] or ''
+    if (start and timestamp < start) or (end and timestamp >= end):
+        return False
+    return not wanted_tags or bool(wanted_tags.intersection(rev['tags']))
+
+
+def _creation_entry(page: Dict[str, Any], first: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'type': 'new',
+        'ns': int(page.get('ns', 0)),
+        'title': page.get('title'),
+        'pageid': int(page['id']),
+        'revid': first['revid'],
+        'old_revid': 0,
+        'user': first['user'],
+        'userid': first['userid'],
+        'oldlen': 0,
+        'newlen': first['size'],
+        'timestamp': first['timestamp'],
+        'comment': first['comment'],
+        'tags': first['tags']
+    }
+
+
+# --- change tags -------------------------------------------------------------
+
+_VALUE_RE = re.compile(r"'(?:[^'\\]|\\.)*'|[^,()']+")
+_ROW_RE = re.compile(r"\(((?:'(?:[^'\\]|\\.)*'|[^'()])*)\)")
+_COLUMN_RE = re.compile(r"^\s*`(\w+)`")
+
+
+def _iter_sql_rows(path: str) -> Iterator[Dict[str, str]]:
+    """
+    Stream the rows of a mysqldump table file (e.g. enwiki-*-change_tag.sql.gz)
+    as {column: raw value}, taking the column order from its CREATE TABLE
+    """
+    columns = []
+    in_create = False
+    with open_dump(path, 'rt') as f:
+        for line in f:
+            if line.startswith('CREATE TABLE'):
+                columns, in_create = [], True
+            elif in_create:
+                match = _COLUMN_RE.match(line)
+                if match:
+                    columns.append(match.group(1))
+                elif line.startswith(')'):
+                    in_create = False
+            elif line.startswith('INSERT INTO'):
+                for row in _ROW_RE.finditer(line):
+                    values = [value.strip() for value in _VALUE_RE.findall(row.group(1))]
+                    yield dict(zip(columns, values))
+
+
+def _sql_string(value: str) -> str:
+    if value.startswith("'"):
+        return re.sub(r"\\(.)", r"\1", value[1:-1])
+    return value
+
+
+def load_change_tags(change_tag_path: str, change_tag_def_path: str,
+                     tags: Optional[Iterable[str]] = None) -> Dict[int, List[str]]:
+    """
+    Build {rev_id: [tag names]} from the change_tag and change_tag_def SQL
+    dumps published next to the XML dumps. Only the given tags are kept,
+    which keeps the mapping small enough for memory on full-size wikis.
+    """
+    names = {}
+    for row in _iter_sql_rows(change_tag_def_path):
+        name = _sql_string(row['ctd_name'])
+        if not tags or name in tags:
+            names[row['ctd_id']] = name
+
+    revision_tags = {}
+    for row in _iter_sql_rows(change_tag_path):
+        name = names.get(row['ct_tag_id'])
+        rev_id = row.get('ct_rev_id')
+        if name and rev_id and rev_id != 'NULL':
+            revision_tags.setdefault(int(rev_id), []).append(name)
+    return revision_tags
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Fake Event Stream Server
+Replays recorded recentchange events as server-sent events, the way
+stream.wikimedia.org serves them, so the live consumer can be run and
+tested offline - including dropped connections and Last-Event-ID resumes
+"""
+
+import json
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional
+
+from synthetic_wiki import generate_corpus
+
+TOPIC = 'eqiad.mediawiki.recentchange'
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+def load_fixtures(path: str) -> List[Dict[str, Any]]:
+    """Events recorded by recentchange_stream.py --record, one JSON object per line"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def corpus_events(corpus: List[Dict[str, Any]], wiki: str = 'enwiki', server_url: str = 'https://en.wikipedia.org',
+                  tags: bool = True) -> List[Dict[str, Any]]:
+    """
+    recentchange events for every revision of a synthetic corpus, oldest
+    first: a 'new' event for each creation and an 'edit' event for the rest.
+    Real recentchange events carry no change tags; with tags=False neither do
+    these, and the consumer has to look them up at server_url (point it at a
+    FakeMediaWikiAPI serving the same corpus).
+    """
+    server_name = server_url.split('://', 1)[-1]
+    revisions = sorted(((page, index, rev) for page in corpus for index, rev in enumerate(page['revisions'])),
+                       key=lambda item: (item[2]['timestamp'], item[2]['revid']))
+    events = []
+    for page, index, rev in revisions:
+        created = datetime.strptime(rev['timestamp'], '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+        previous = page['revisions'][index - 1] if index else None
+        event = {
+            '$schema': '/mediawiki/recentchange/1.0.0',
+            'meta': {'uri': f"{server_url}/wiki/{page['title'].replace(' ', '_')}", 'domain': server_name,
+                     'stream': 'mediawiki.recentchange', 'dt': rev['timestamp']},
+            'id': rev['revid'],
+            'type': 'edit' if previous else 'new',
+            'namespace': page['ns'],
+            'title': page['title'],
+            'comment': rev['comment'],
+            'timestamp': int(created.timestamp()),
+            'user': rev['user'],
+            'bot': False,
+            'minor': False,
+            'length': {'old': previous['size'], 'new': rev['size']} if previous else {'new': rev['size']},
+            'revision': {'old': previous['revid'], 'new': rev['revid']} if previous else {'new': rev['revid']},
+            'server_url': server_url,
+            'server_name': server_name,
+            'server_script_path': '/w',
+            'wiki': wiki,
+        }
+        if tags:
+            event['tags'] = rev['tags']
+        events.append(event)
+    return events
+
+
+class FakeEventStream:
+    """
+    A threaded HTTP server streaming a fixed list of events as SSE.
+
+    Event ids are Kafka offsets in EventStreams' format; a request with a
+    Last-Event-ID header continues after that event. Once every event has
+    been sent the connection stays open with heartbeat comments, as the real
+    stream does when nothing happens. drop_after closes each connection
+    abruptly after that many events, to exercise reconnects.
+    """
+
+    def __init__(self, events: Optional[List[Dict[str, Any]]] = None, host: str = '127.0.0.1', port: int = 0,
+                 interval: float = 0.0, drop_after: Optional[int] = None, heartbeat: float = 1.0):
+        self.events = events if events is not None else corpus_events(generate_corpus())
+        self.interval = interval
+        self.drop_after = drop_after
+        self.heartbeat = heartbeat
+        self.connections = 0
+        self.last_event_ids = []
+        self.sent = Counter()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+        self.server = _Server((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v2/stream/recentchange"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._stopping.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @staticmethod
+    def event_id(offset: int) -> str:
+        return json.dumps([{'topic': TOPIC, 'partition': 0, 'offset': offset}])
+
+    @staticmethod
+    def offset_after(last_event_id: Optional[str]) -> int:
+        """Index of the first event after last_event_id (0 without one or when unreadable)"""
+        if not last_event_id:
+            return 0
+        try:
+            return max(item['offset'] for item in json.loads(last_event_id) if item.get('topic') == TOPIC) + 1
+        except (ValueError, TypeError, KeyError):
+            return 0
+
+    def _make_handler(self):
+        stream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Chunked, as EventStreams serves it: clients see each event as soon as it is sent
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                last_event_id = self.headers.get('Last-Event-ID')
+                with stream._lock:
+                    stream.connections += 1
+                    stream.last_event_ids.append(last_event_id)
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                try:
+                    self._write(':ok\n\n')
+                    sent = 0
+                    for offset in range(stream.offset_after(last_event_id), len(stream.events)):
+                        if stream._stopping.is_set():
+                            return
+                        if stream.drop_after is not None and sent >= stream.drop_after:
+                            # Abruptly, without the closing chunk, as a proxy timeout would
+                            return
+                        self._write(f"event: message\nid: {stream.event_id(offset)}\n"
+                                    f"data: {json.dumps(stream.events[offset], ensure_ascii=False)}\n\n")
+                        sent += 1
+                        with stream._lock:
+                            stream.sent[offset] += 1
+                        if stream.interval:
+                            time.sleep(stream.interval)
+                    while not stream._stopping.wait(stream.heartbeat):
+                        self._write(':\n\n')
+                    self.wfile.write(b'0\r\n\r\n')
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client went away
+                    pass
+
+            def _write(self, text):
+                data = text.encode('utf-8')
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Replay recentchange events as a local server-sent events stream')
+    parser.add_argument('--fixtures', metavar='PATH',
+                        help='JSONL events recorded with recentchange_stream.py --record (default: a synthetic wiki)')
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--max-revisions', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--interval', type=float, default=0.01, help='Seconds between events')
+    parser.add_argument('--drop-after', type=int, help='Close every connection after this many events')
+    args = parser.parse_args()
+
+    if args.fixtures:
+        events = load_fixtures(args.fixtures)
+    else:
+        events = corpus_events(generate_corpus(pages=args.pages, max_revisions=args.max_revisions, seed=args.seed))
+    stream = FakeEventStream(events, port=args.port, interval=args.interval, drop_after=args.drop_after)
+    print(f"Streaming {len(events)} recentchange events at {stream.url}")
+    try:
+        stream.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stream.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Fake MediaWiki API Server
+Serves a synthetic corpus through a local api.php so the crawler can be run
+and benchmarked offline
+"""
+
+import json
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional
+from urllib.parse import urlparse, parse_qs
+
+from synthetic_wiki import generate_corpus
+
+# Per-request limits enforced by the real API for normal (non-bot) accounts
+MAX_TITLES = 50
+MAX_REVISIONS = 500
+MAX_CONTENT_REVISIONS = 50
+# $wgAPIMaxResultSize: a multi-page revisions query stops adding content
+# beyond this many bytes and returns an rvcontinue for the remaining pages
+MAX_RESULT_SIZE = 8 * 1024 ** 2
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class FakeMediaWikiAPI:
+    """A threaded HTTP server emulating the subset of api.php used by WikipediaAnalyzer"""
+
+    def __init__(self, corpus: Optional[List[Dict[str, Any]]] = None, latency: float = 0.0,
+                 host: str = '127.0.0.1', port: int = 0, rate_limit: Optional[float] = None,
+                 lag: float = 0.0, retry_after: int = 1, max_result_size: int = MAX_RESULT_SIZE):
+        self.corpus = corpus if corpus is not None else generate_corpus()
+        self.latency = latency
+        self.max_result_size = max_result_size
+        self.request_count = 0
+        self.request_log = Counter()
+        self._lock = threading.Lock()
+
+        # Throttling injection: more than rate_limit requests in a second get
+        # HTTP 429, and while lag (seconds of simulated replica lag, may be
+        # changed at any time) exceeds a request's maxlag it gets a maxlag error
+        self.rate_limit = rate_limit
+        self.lag = lag
+        self.retry_after = retry_after
+        self.throttle_log = Counter()
+        self._window = deque()
+
+        self.pages_by_title = {page['title']: page for page in self.corpus}
+        self.pages_by_id = {page['pageid']: page for page in self.corpus}
+        self.revisions_by_id = {rev['revid']: (page, rev) for page in self.corpus for rev in page['revisions']}
+
+        # recentchanges is ordered newest first, like the real rcdir=older default
+        self.creations = sorted(
+            (page for page in self.corpus if page['revisions']),
+            key=lambda page: page['revisions'][0]['timestamp'],
+            reverse=True
+        )
+
+        self.server = _Server((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def api_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/w/api.php"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.api_url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _make_handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                query = {key: values[-1] for key, values in parse_qs(urlparse(self.path).query).items()}
+                headers = {}
+                throttled = api.throttle(query)
+                if throttled:
+                    status, payload, headers = throttled
+                else:
+                    status, payload = api.handle(query)
+                body = json.dumps(payload).encode('utf-8')
+
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def throttle(self, params: Dict[str, str]):
+        """(status, payload, headers) refusing the request the way Wikimedia does, or None to serve it"""
+        if self.lag and 'maxlag' in params and self.lag > float(params['maxlag']):
+            with self._lock:
+                self.throttle_log['maxlag'] += 1
+            # maxlag errors come back as HTTP 200 with an error body and Retry-After
+            return 200, {'error': {
+                'code': 'maxlag',
+                'info': f"Waiting for 10.64.0.1: {self.lag:.0f} seconds lagged.",
+                'host': '10.64.0.1', 'lag': self.lag, 'type': 'db'
+            }}, {'Retry-After': str(self.retry_after), 'X-Database-Lag': f"{self.lag:.0f}"}
+
+        if self.rate_limit:
+            now = time.monotonic()
+            with self._lock:
+                while self._window and now - self._window[0] >= 1.0:
+                    self._window.popleft()
+                if len(self._window) >= self.rate_limit:
+                    self.throttle_log['http-429'] += 1
+                    return 429, _error('ratelimited', 'You have exceeded your rate limit. Please wait some time '
+                                       'and try again.'), {'Retry-After': str(self.retry_after)}
+                self._window.append(now)
+        return None
+
+    def handle(self, params: Dict[str, str]):
+        """Dispatch one api.php request and return (status, payload)"""
+        if self.latency:
+            time.sleep(self.latency)
+
+        kind = params.get('list') or params.get('prop') or params.get('action', '')
+        with self._lock:
+            self.request_count += 1
+            self.request_log[kind] += 1
+
+        if params.get('action') != 'query':
+            return 200, _error('badvalue', 'Only action=query is supported by the fake API.')
+        if params.get('list') == 'tags':
+            return 200, self._list_tags()
+        if params.get('list') == 'recentchanges':
+            return 200, self._list_recentchanges(params)
+        if params.get('prop') == 'revisions':
+            return 200, self._prop_revisions(params)
+        return 200, _error('badvalue', 'Unsupported query.')
+
+    def _list_tags(self) -> Dict[str, Any]:
+        hits = Counter()
+        for page in self.corpus:
+            for rev in page['revisions']:
+                hits.update(rev['tags'])
+
+        tags = [
+            {'name': name, 'displayname': name, 'description': name, 'hitcount': count}
+            for name, count in sorted(hits.items())
+        ]
+        return {'batchcomplete': '', 'query': {'tags': tags}}
+
+    def _list_recentchanges(self, params: Dict[str, str]) -> Dict[str, Any]:
+        tag = params.get('rctag')
+        rcstart = params.get('rcstart')
+        rcend = params.get('rcend')
+        limit = min(int(params.get('rclimit', 10)), MAX_REVISIONS)
+        offset = int(params.get('rccontinue', 0))
+        props = set(params.get('rcprop', 'title|timestamp|ids').split('|'))
+
+        matches = []
+        for page in self.creations:
+            first = page['revisions'][0]
+            if tag and tag not in first['tags']:
+                continue
+            if rcstart and first['timestamp'] > rcstart:
+                continue
+            if rcend and first['timestamp'] < rcend:
+                continue
+            matches.append((page, first))
+
+        changes = []
+        for page, first in matches[offset:offset + limit]:
+            change = {'type': 'new', 'ns': page['ns']}
+            if 'title' in props:
+                change['title'] = page['title']
+            if 'ids' in props:
+                change.update({'pageid': page['pageid'], 'revid': first['revid'],
+                               'old_revid': 0, 'rcid': first['revid']})
+            if 'timestamp' in props:
+                change['timestamp'] = first['timestamp']
+            if 'user' in props:
+                change['user'] = first['user']
+            if 'userid' in props:
+                change['userid'] = first['userid']
+            if 'sizes' in props:
+                change.update({'oldlen': 0, 'newlen': first['size']})
+            if 'comment' in props:
+                change['comment'] = first['comment']
+            if 'tags' in props:
+                change['tags'] = first['tags']
+            changes.append(change)
+
+        payload = {'query': {'recentchanges': changes}}
+        if offset + limit < len(matches):
+            payload['continue'] = {'rccontinue': str(offset + limit), 'continue': '-||'}
+        else:
+            payload['batchcomplete'] = ''
+        return payload
+
+    def _prop_revisions(self, params: Dict[str, str]) -> Dict[str, Any]:
+        if 'revids' in params:
+            return self._revisions_by_id(params)
+        if 'titles' in params:
+            requested = [(title, self.pages_by_title.get(title)) for title in params['titles'].split('|')]
+        else:
+            requested = [(pageid, self.pages_by_id.get(int(pageid)))
+                         for pageid in params.get('pageids', '').split('|') if pageid]
+
+        if len(requested) > MAX_TITLES:
+            return _error('toomanyvalues', f'Too many values supplied for parameter "titles". The limit is {MAX_TITLES}.')
+
+        props = set(params.get('rvprop', 'ids|timestamp|flags|comment|user').split('|'))
+        single_page_mode = any(key in params for key in ('rvlimit', 'rvdir', 'rvstartid', 'rvendid'))
+        if single_page_mode and len(requested) > 1:
+            return _error('multpages', 'rvlimit may only be used with a single page.')
+
+        # Multi-page mode walks the pages in pageid order; rvcontinue is
+        # "pageid|revid" of the first page whose revision did not fit
+        continue_pageid = 0
+        if not single_page_mode:
+            requested.sort(key=lambda item: item[1]['pageid'] if item[1] else 0)
+            if 'rvcontinue' in params:
+                continue_pageid = int(params['rvcontinue'].split('|')[0])
+        result_size = 0
+
+        pages = {}
+        payload = {'query': {'pages': pages}}
+        missing = -1
+        for key, page in requested:
+            if page is None:
+                pages[str(missing)] = {'ns': 0, 'title': str(key), 'missing': ''}
+                missing -= 1
+                continue
+
+            entry = {'pageid': page['pageid'], 'ns': page['ns'], 'title': page['title']}
+            revisions = page['revisions']
+
+            if not single_page_mode:
+                selected = revisions[-1:]
+                if page['pageid'] < continue_pageid or 'continue' in payload:
+                    # Returned by an earlier request, or left for the next one
+                    pages[str(page['pageid'])] = entry
+                    continue
+                if 'content' in props and selected:
+                    size = len(selected[0]['content'].encode('utf-8'))
+                    if result_size and result_size + size > self.max_result_size:
+                        payload['continue'] = {'rvcontinue': f"{page['pageid']}|{selected[0]['revid']}",
+                                               'continue': '||'}
+                        pages[str(page['pageid'])] = entry
+                        continue
+                    result_size += size
+            else:
+                limit_cap = MAX_CONTENT_REVISIONS if 'content' in props else MAX_REVISIONS
+                requested_limit = params.get('rvlimit', '1')
+                limit = limit_cap if requested_limit == 'max' else int(requested_limit)
+                if limit > limit_cap:
+                    payload['warnings'] = {'revisions': {
+                        '*': f'rvlimit may not be over {limit_cap} (set to {requested_limit}) for users'
+                    }}
+                    limit = limit_cap
+
+                ordered = revisions if params.get('rvdir') == 'newer' else revisions[::-1]
+                start = 0
+                if 'rvcontinue' in params:
+                    continue_revid = int(params['rvcontinue'].split('|')[-1])
+                    start = next((i for i, rev in enumerate(ordered) if rev['revid'] == continue_revid), len(ordered))
+                elif 'rvstartid' in params:
+                    start_revid = int(params['rvstartid'])
+                    if params.get('rvdir') == 'newer':
+                        start = sum(1 for rev in ordered if rev['revid'] < start_revid)
+                    else:
+                        start = sum(1 for rev in ordered if rev['revid'] > start_revid)
+
+                selected = ordered[start:start + limit]
+                if start + limit < len(ordered):
+                    next_rev = ordered[start + limit]
+                    payload['continue'] = {
+                        'rvcontinue': f"{next_rev['timestamp']}|{next_rev['revid']}",
+                        'continue': '||'
+                    }
+
+            entry['revisions'] = [_format_revision(rev, props) for rev in selected]
+            pages[str(page['pageid'])] = entry
+
+        if 'continue' not in payload:
+            payload['batchcomplete'] = ''
+        return payload
+
+
+    def _revisions_by_id(self, params: Dict[str, str]) -> Dict[str, Any]:
+        """revids= mode: specific revisions grouped under their pages"""
+        revids = [int(revid) for revid in params['revids'].split('|') if revid]
+        if len(revids) > MAX_TITLES:
+            return _error('toomanyvalues', f'Too many values supplied for parameter "revids". The limit is {MAX_TITLES}.')
+
+        props = set(params.get('rvprop', 'ids|timestamp|flags|comment|user').split('|'))
+        pages = {}
+        bad_revids = []
+        for revid in revids:
+            found = self.revisions_by_id.get(revid)
+            if found is None:
+                bad_revids.append({'revid': revid})
+                continue
+            page, rev = found
+            entry = pages.setdefault(str(page['pageid']), {
+                'pageid': page['pageid'], 'ns': page['ns'], 'title': page['title'], 'revisions': []
+            })
+            entry['revisions'].append(_format_revision(rev, props))
+
+        query = {'pages': pages}
+        if bad_revids:
+            query['badrevids'] = {str(item['revid']): item for item in bad_revids}
+        return {'batchcomplete': '', 'query': query}
+
+
+def _format_revision(rev: Dict[str, Any], props: set) -> Dict[str, Any]:
+    formatted = {}
+    if 'ids' in props:
+        formatted['revid'] = rev['revid']
+        formatted['parentid'] = rev['parentid']
+    for prop in ('timestamp', 'user', 'userid', 'size', 'sha1', 'tags', 'comment'):
+        if prop in props:
+            formatted[prop] = rev[prop]
+    if 'content' in props:
+        formatted['slots'] = {'main': {'contentmodel': 'wikitext', 'contentformat': 'text/x-wiki', '*': rev['content']}}
+    return formatted
+
+
+def _error(code: str, info: str) -> Dict[str, Any]:
+    return {'error': {'code': code, 'info': info}}
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serve a synthetic corpus through a fake MediaWiki api.php')
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--max-revisions', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds of delay per request')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rate-limit', type=float, help='Answer 429 above this many requests per second')
+    parser.add_argument('--lag', type=float, default=0.0,
+                        help='Simulated replica lag; requests with a lower maxlag get maxlag errors')
+    args = parser.parse_args()
+
+    corpus = generate_corpus(pages=args.pages, max_revisions=args.max_revisions, seed=args.seed)
+    api = FakeMediaWikiAPI(corpus, latency=args.latency, port=args.port, rate_limit=args.rate_limit, lag=args.lag)
+    print(f"Serving {len(corpus)} synthetic pages at {api.api_url}")
+    try:
+        api.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Quarry Revision Export Ingestion
+Discovers per-article revision exports (QUERY 3), parses them concurrently
+on a thread pool and caches the combined frame as one columnar file, so
+files that have not changed since the last run are never parsed again
+"""
+
+import glob
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from quarry_loader import parse_timestamps, pyarrow, read_quarry_csv
+
+CACHE_PATH = 'revision_histories.parquet'
+CACHE_VERSION = 1
+
+# Columns a combined revisions frame always has, whatever the exports contained
+REVISION_FRAME_COLUMNS = ['article', 'rev_id', 'rev_timestamp', 'rev_user_text', 'rev_len', 'tags']
+
+
+def discover_revision_files(pattern='*.csv', exclude=()):
+    """Revision exports among the CSVs matching pattern, in a stable order, minus files in exclude"""
+    return sorted(path for path in glob.glob(pattern)
+                  if 'revision' in os.path.basename(path).lower() and path not in exclude)
+
+
+def article_title_from_path(csv_path):
+    """Article name for a revision export, as main() has always derived it"""
+    return os.path.splitext(os.path.basename(csv_path))[0].replace('revisions_', '')
+
+
+def file_signature(path):
+    """(mtime in ns, size) - cheap to read, and changes whenever an export is rewritten"""
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def combine_revision_frames(frames):
+    """Concatenate per-article revision frames, re-encoding the repetitive columns as categories"""
+    if not frames:
+        return pd.DataFrame(columns=REVISION_FRAME_COLUMNS)
+    combined = pd.concat(frames, ignore_index=True).reindex(columns=REVISION_FRAME_COLUMNS)
+    combined['rev_timestamp'] = parse_timestamps(combined['rev_timestamp'])
+    # Per-file categories do not survive concat; one shared encoding makes tag matching per category
+    for column in ('article', 'rev_user_text', 'tags'):
+        combined[column] = combined[column].astype('category')
+    return combined
+
+
+def _read_revision_file(path, engine):
+    try:
+        # Timestamps are parsed once over the combined frame, not per file
+        df = read_quarry_csv(path, schema_name='revisions', engine=engine, parse_dates=False)
+    except Exception as e:
+        print(f"Error loading {path}: {e}")
+        return None
+    return df.assign(article=article_title_from_path(path))
+
+
+def read_revision_files(paths, workers=None, engine=None):
+    """
+    Parse revision exports on a thread pool and return them combined, in
+    the order of paths. The C and pyarrow parsers release the GIL while
+    tokenizing, so threads overlap both the file I/O and the parsing.
+    """
+    if not paths:
+        return combine_revision_frames([])
+    if workers == 1 or len(paths) == 1:
+        frames = [_read_revision_file(path, engine) for path in paths]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='csv') as executor:
+            frames = list(executor.map(lambda path: _read_revision_file(path, engine), paths))
+    return combine_revision_frames([frame for frame in frames if frame is not None and len(frame)])
+
+
+class RevisionCache:
+    """
+    The combined revisions frame of the last run, plus a manifest of the
+    (mtime, size) of every export it was built from.
+
+    Stored as Parquet when pyarrow is installed and as a pickle otherwise;
+    the manifest sits next to it as <cache>.manifest.json.
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        if pyarrow is None and path.endswith('.parquet'):
+            path = os.path.splitext(path)[0] + '.pkl'
+        self.path = path
+        self.manifest_path = path + '.manifest.json'
+
+    def load(self):
+        """(frame, {path: signature}) of the last run, or (None, {}) when there is no usable cache"""
+        if not (os.path.exists(self.path) and os.path.exists(self.manifest_path)):
+            return None, {}
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') != CACHE_VERSION:
+                return None, {}
+            frame = pd.read_parquet(self.path) if self.path.endswith('.parquet') else pd.read_pickle(self.path)
+        except Exception as e:
+            print(f"Ignoring unreadable cache {self.path}: {e}")
+            return None, {}
+        return frame, manifest['files']
+
+    def save(self, frame, files):
+        # Frame first, manifest last: a crash in between leaves a manifest
+        # that no longer matches, which only costs a re-parse
+        tmp_path = self.path + '.tmp'
+        if self.path.endswith('.parquet'):
+            frame.to_parquet(tmp_path, index=False)
+        else:
+            frame.to_pickle(tmp_path)
+        os.replace(tmp_path, self.path)
+
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'files': files}, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+
+def ingest_revision_histories(paths, cache_path=CACHE_PATH, workers=None, engine=None):
+    """
+    Combined revisions frame for paths, with an 'article' column naming the
+    source of each row. With a cache_path, exports whose mtime and size
+    match the previous run are taken from the cache and only new or changed
+    files are parsed; when nothing changed no CSV is opened at all.
+    """
+    if not cache_path:
+        return read_revision_files(paths, workers, engine)
+
+    cache = RevisionCache(cache_path)
+    cached, cached_files = cache.load()
+    signatures = {path: file_signature(path) for path in paths}
+
+    if cached is not None and cached_files == signatures:
+        print(f"📦 {len(paths)} revision files unchanged, loaded from {cache.path}")
+        return cached
+
+    fresh = [path for path in paths if cached_files.get(path) != signatures[path]]
+    parsed = read_revision_files(fresh, workers, engine)
+
+    pieces = {}
+    if cached is not None:
+        kept = {article_title_from_path(path) for path in paths if path not in fresh}
+        for article, frame in cached[cached['article'].isin(kept)].groupby('article', sort=False, observed=True):
+            pieces[article] = frame
+    for article, frame in parsed.groupby('article', sort=False, observed=True):
+        pieces[article] = frame
+    print(f"📦 Parsed {len(fresh)} new or changed revision files, "
+          f"{len(paths) - len(fresh)} taken from {cache.path}")
+
+    # Back into the order of paths, whichever side each article came from
+    order = [article_title_from_path(path) for path in paths]
+    combined = combine_revision_frames([pieces[article] for article in dict.fromkeys(order) if article in pieces])
+    cache.save(combined, signatures)
+    return combined
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Typed Quarry CSV Loading
+Explicit schemas for the result sets of quarry_queries.sql, column pruning,
+a chunked mode for streaming aggregation and an optional pyarrow engine, so
+large Quarry exports load with fixed dtypes in bounded memory
+"""
+
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pyarrow = None
+    pa_csv = None
+
+# Column dtypes of each query's result set. 'timestamp' columns hold
+# MediaWiki YYYYMMDDHHMMSS values and are parsed after reading; nullable
+# integer types keep missing lengths from turning whole columns into floats.
+SCHEMAS = {
+    # QUERY 1 (and the articles list in general)
+    'articles': {
+        'page_id': 'int64',
+        'page_title': 'string',
+        'page_namespace': 'int16',
+        'first_revision_id': 'int64',
+        'creation_timestamp': 'timestamp',
+        'creator': 'category',
+        'initial_length': 'Int64',
+        'tags': 'category',
+    },
+    # QUERY 2
+    'tags': {
+        'ctd_id': 'int32',
+        'ctd_name': 'string',
+        'usage_count': 'int64',
+    },
+    # QUERY 3
+    'revisions': {
+        'rev_id': 'int64',
+        'rev_timestamp': 'timestamp',
+        'rev_user_text': 'category',
+        'rev_len': 'Int64',
+        'rev_comment': 'string',
+        'rev_minor_edit': 'Int8',
+        'tags': 'category',
+    },
+    # QUERY 4
+    'daily_creations': {
+        'creation_date': 'date',
+        'articles_created': 'int64',
+        'avg_initial_length': 'float64',
+        'min_initial_length': 'Int64',
+        'max_initial_length': 'Int64',
+        'unique_creators': 'int64',
+    },
+    # QUERY 5
+    'revision_counts': {
+        'page_id': 'int64',
+        'page_title': 'string',
+        'created_at': 'timestamp',
+        'creator': 'category',
+        'total_revisions': 'int64',
+        'initial_length': 'Int64',
+        'current_length': 'Int64',
+        'length_growth': 'Int64',
+    },
+    # QUERY 6
+    'creators': {
+        'username': 'string',
+        'articles_created': 'int64',
+        'avg_article_length': 'float64',
+        'first_article': 'timestamp',
+        'latest_article': 'timestamp',
+    },
+}
+
+# Columns the analyzer actually reads; everything else is pruned at parse time
+ANALYSIS_COLUMNS = {
+    'articles': ['page_id', 'page_title', 'creation_timestamp', 'creator', 'initial_length', 'tags'],
+    'revisions': ['rev_id', 'rev_timestamp', 'rev_user_text', 'rev_len', 'tags'],
+}
+
+_PARSED_LATER = ('timestamp', 'date')
+
+
+def parse_timestamps(values):
+    """
+    Parse a timestamp column in one pass. MediaWiki's YYYYMMDDHHMMSS form,
+    as text or as a number, is tried first with its exact layout; values it
+    does not fit are retried with format inference, then one at a time.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+
+    if pd.api.types.is_integer_dtype(values) and values.between(10 ** 13, 10 ** 14 - 1).all():
+        parts = pd.DataFrame({
+            'year': values // 10 ** 10, 'month': values // 10 ** 8 % 100, 'day': values // 10 ** 6 % 100,
+            'hour': values // 10 ** 4 % 100, 'minute': values // 100 % 100, 'second': values % 100
+        })
+        return pd.to_datetime(parts, errors='coerce')
+
+    parsed = pd.to_datetime(values, format='%Y%m%d%H%M%S', errors='coerce')
+    failed = parsed.isna() & values.notna()
+    if failed.any():
+        parsed[failed] = pd.to_datetime(values[failed], errors='coerce')
+        failed &= parsed.isna()
+    if failed.any():
+        parsed[failed] = pd.to_datetime(values[failed], errors='coerce', format='mixed')
+    return parsed
+
+
+def detect_schema(columns):
+    """Name of the schema sharing the most columns with the given header, or None"""
+    columns = set(columns)
+    best = max(SCHEMAS, key=lambda name: len(columns & set(SCHEMAS[name])))
+    return best if len(columns & set(SCHEMAS[best])) >= 2 else None
+
+
+def _read_options(path, schema_name=None, columns=None):
+    """Resolve schema, pruned column list and read dtypes against the file's header"""
+    header = pd.read_csv(path, nrows=0).columns.tolist()
+    schema_name = schema_name or detect_schema(header)
+    schema = SCHEMAS.get(schema_name, {})
+
+    if columns is None and schema_name in ANALYSIS_COLUMNS:
+        columns = ANALYSIS_COLUMNS[schema_name]
+    usecols = [column for column in header if columns is None or column in columns]
+
+    dtypes = {}
+    for column in usecols:
+        dtype = schema.get(column)
+        if dtype in _PARSED_LATER:
+            # Left to inference: 14-digit MediaWiki timestamps read fastest as int64
+            continue
+        if dtype:
+            dtypes[column] = dtype
+    return schema, usecols, dtypes
+
+
+def _finish(frame, schema):
+    """Parse timestamp and date columns of a freshly read frame, in place"""
+    for column in frame.columns:
+        dtype = schema.get(column)
+        if dtype == 'timestamp':
+            frame[column] = parse_timestamps(frame[column])
+        elif dtype == 'date':
+            frame[column] = pd.to_datetime(frame[column], errors='coerce')
+    return frame
+
+
+def apply_schema(frame, schema_name=None):
+    """
+    Give a frame that did not come from a CSV (an SQL result, say) the
+    dtypes read_quarry_csv would have given the same export
+    """
+    schema = SCHEMAS.get(schema_name or detect_schema(frame.columns), {})
+    dtypes = {column: dtype for column, dtype in schema.items()
+              if column in frame.columns and dtype not in _PARSED_LATER}
+    return _finish(frame.astype(dtypes), schema)
+
+
+def read_quarry_csv(path, schema_name=None, columns=None, engine=None, parse_dates=True):
+    """
+    Read a Quarry export with fixed dtypes.
+
+    schema_name  a key of SCHEMAS; detected from the header when omitted
+    columns      columns to keep; defaults to ANALYSIS_COLUMNS for the schema
+                 (None there means all), unknown names are ignored
+    engine       'pyarrow' for the multithreaded pyarrow parser when it is
+                 installed; pandas' C parser otherwise
+    parse_dates  False leaves timestamp and date columns as read, for callers
+                 that concatenate many files and parse the result once
+    """
+    schema, usecols, dtypes = _read_options(path, schema_name, columns)
+    if engine == 'pyarrow' and pyarrow is None:
+        engine = None
+    frame = pd.read_csv(path, usecols=usecols, dtype=dtypes, engine=engine or 'c')
+    return _finish(frame, schema) if parse_dates else frame
+
+
+def iter_quarry_csv(path, schema_name=None, columns=None, chunksize=200000, engine=None):
+    """
+    Yield typed DataFrames of at most `chunksize` rows, for aggregators that
+    never need the whole export in memory. With engine='pyarrow' the file is
+    streamed as pyarrow record batches.
+    """
+    schema, usecols, dtypes = _read_options(path, schema_name, columns)
+
+    if engine == 'pyarrow' and pa_csv is not None:
+        convert = pa_csv.ConvertOptions(include_columns=usecols)
+        reader = pa_csv.open_csv(path, read_options=pa_csv.ReadOptions(block_size=1 << 24),
+                                 convert_options=convert)
+        for batch in reader:
+            frame = batch.to_pandas()
+            yield _finish(frame.astype({column: dtype for column, dtype in dtypes.items()
+                                        if column in frame.columns}), schema)
+        return
+
+    for frame in pd.read_csv(path, usecols=usecols, dtype=dtypes, chunksize=chunksize):
+        yield _finish(frame, schema)
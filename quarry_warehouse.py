@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Local Quarry Warehouse
+A SQLite database with MediaWiki-shaped page, revision, change_tag and
+change_tag_def tables, loaded from XML / change tag dumps or from the API
+crawler, that runs the queries of quarry_queries.sql offline and returns
+their results as typed DataFrames for MobileArticlePatternAnalyzer
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Iterable, Optional
+
+import pandas as pd
+
+from dump_reader import iter_dump_pages, load_change_tags
+from quarry_ingest import combine_revision_frames
+from quarry_loader import apply_schema
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS page (
+        page_id INTEGER PRIMARY KEY,
+        page_namespace INTEGER NOT NULL,
+        page_title TEXT NOT NULL,
+        page_latest INTEGER,
+        page_len INTEGER
+    );
+    CREATE TABLE IF NOT EXISTS revision (
+        rev_id INTEGER PRIMARY KEY,
+        rev_page INTEGER NOT NULL,
+        rev_parent_id INTEGER NOT NULL DEFAULT 0,
+        rev_timestamp TEXT NOT NULL,
+        rev_user INTEGER,
+        rev_user_text TEXT,
+        rev_len INTEGER,
+        rev_comment TEXT,
+        rev_minor_edit INTEGER NOT NULL DEFAULT 0,
+        rev_sha1 TEXT
+    );
+    CREATE TABLE IF NOT EXISTS change_tag (
+        ct_id INTEGER PRIMARY KEY,
+        ct_rev_id INTEGER NOT NULL,
+        ct_tag_id INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS change_tag_def (
+        ctd_id INTEGER PRIMARY KEY,
+        ctd_name TEXT NOT NULL UNIQUE,
+        ctd_count INTEGER NOT NULL DEFAULT 0
+    );
+
+    -- The join keys of quarry_queries.sql
+    CREATE UNIQUE INDEX IF NOT EXISTS page_name_title ON page (page_namespace, page_title);
+    CREATE INDEX IF NOT EXISTS rev_page_timestamp ON revision (rev_page, rev_timestamp);
+    CREATE INDEX IF NOT EXISTS rev_parent_timestamp ON revision (rev_parent_id, rev_timestamp);
+    CREATE UNIQUE INDEX IF NOT EXISTS ct_rev_tag ON change_tag (ct_rev_id, ct_tag_id);
+    CREATE INDEX IF NOT EXISTS ct_tag_rev ON change_tag (ct_tag_id, ct_rev_id);
+"""
+
+# Tags of one revision, as the GROUP_CONCAT(DISTINCT ... SEPARATOR ', ') of the
+# Quarry queries (SQLite's GROUP_CONCAT cannot combine DISTINCT and a separator)
+_TAGS = """(
+    SELECT GROUP_CONCAT(name, ', ') FROM (
+        SELECT DISTINCT d.ctd_name AS name
+        FROM change_tag t INNER JOIN change_tag_def d ON t.ct_tag_id = d.ctd_id
+        WHERE t.ct_rev_id = {rev} ORDER BY d.ctd_name
+    )
+)"""
+
+
+def _has_tag_like(pattern: str) -> str:
+    return f"""EXISTS (
+        SELECT 1 FROM change_tag ct INNER JOIN change_tag_def ctd ON ct.ct_tag_id = ctd.ctd_id
+        WHERE ct.ct_rev_id = r.rev_id AND ctd.ctd_name LIKE '{pattern}'
+    )"""
+
+
+_MOBILE_VE = f"{_has_tag_like('%mobile%')} AND {_has_tag_like('%visual%')}"
+
+# quarry_queries.sql in SQLite, with :since (YYYYMMDDHHMMSS), :limit and
+# :title parameters in place of NOW() - 30 days and literals. Tag filters
+# are EXISTS subqueries: joining change_tag directly repeats each revision
+# once per matching tag, which inflated COUNT and AVG in Queries 4 and 5.
+# Query 1 matches the tag intersection on rev_id (the original compared it
+# to page_id) and Query 6 uses the same mobile AND visual condition (the
+# original required both words in a single tag name, which no tag has).
+QUERIES = {
+    1: f"""
+        SELECT p.page_id, p.page_title, p.page_namespace, r.rev_id AS first_revision_id,
+               r.rev_timestamp AS creation_timestamp, r.rev_user_text AS creator,
+               r.rev_len AS initial_length, {_TAGS.format(rev='r.rev_id')} AS tags
+        FROM page p INNER JOIN revision r ON p.page_id = r.rev_page
+        WHERE p.page_namespace = 0 AND r.rev_parent_id = 0 AND r.rev_timestamp >= :since
+          AND {_MOBILE_VE}
+        ORDER BY r.rev_timestamp DESC
+        LIMIT :limit
+    """,
+    2: """
+        SELECT ctd.ctd_id, ctd.ctd_name, COUNT(ct.ct_tag_id) AS usage_count
+        FROM change_tag_def ctd LEFT JOIN change_tag ct ON ctd.ctd_id = ct.ct_tag_id
+        GROUP BY ctd.ctd_id, ctd.ctd_name
+        HAVING ctd_name LIKE '%mobile%' OR ctd_name LIKE '%visual%' OR ctd_name LIKE '%editor%'
+        ORDER BY usage_count DESC
+    """,
+    3: f"""
+        SELECT r.rev_id, r.rev_timestamp, r.rev_user_text, r.rev_len, r.rev_comment, r.rev_minor_edit,
+               {_TAGS.format(rev='r.rev_id')} AS tags
+        FROM page p INNER JOIN revision r ON p.page_id = r.rev_page
+        WHERE p.page_title = :title AND p.page_namespace = 0
+        ORDER BY r.rev_timestamp ASC, r.rev_id ASC
+    """,
+    4: """
+        SELECT substr(r.rev_timestamp, 1, 4) || '-' || substr(r.rev_timestamp, 5, 2) || '-'
+                   || substr(r.rev_timestamp, 7, 2) AS creation_date,
+               COUNT(DISTINCT p.page_id) AS articles_created,
+               AVG(r.rev_len) AS avg_initial_length,
+               MIN(r.rev_len) AS min_initial_length,
+               MAX(r.rev_len) AS max_initial_length,
+               COUNT(DISTINCT r.rev_user_text) AS unique_creators
+        FROM page p INNER JOIN revision r ON p.page_id = r.rev_page
+        WHERE p.page_namespace = 0 AND r.rev_parent_id = 0 AND r.rev_timestamp >= :since
+          AND EXISTS (
+              SELECT 1 FROM change_tag ct INNER JOIN change_tag_def ctd ON ct.ct_tag_id = ctd.ctd_id
+              WHERE ct.ct_rev_id = r.rev_id
+                AND ctd.ctd_name IN ('mobile edit', 'mobile web edit', 'visualeditor', 'visualeditor-wikitext')
+          )
+        GROUP BY creation_date
+        ORDER BY creation_date DESC
+    """,
+    5: f"""
+        SELECT p.page_id, p.page_title, r.rev_timestamp AS created_at, r.rev_user_text AS creator,
+               COUNT(r2.rev_id) AS total_revisions, r.rev_len AS initial_length,
+               MAX(r2.rev_len) AS current_length, MAX(r2.rev_len) - r.rev_len AS length_growth
+        FROM page p
+            INNER JOIN revision r ON p.page_id = r.rev_page AND r.rev_parent_id = 0
+            LEFT JOIN revision r2 ON p.page_id = r2.rev_page
+        WHERE p.page_namespace = 0 AND r.rev_timestamp >= :since
+          AND ({_has_tag_like('%mobile%')} OR {_has_tag_like('%visual%')})
+        GROUP BY p.page_id, p.page_title, r.rev_timestamp, r.rev_user_text, r.rev_len
+        HAVING total_revisions > 0
+        ORDER BY total_revisions DESC
+        LIMIT :limit
+    """,
+    6: f"""
+        SELECT r.rev_user_text AS username, COUNT(DISTINCT p.page_id) AS articles_created,
+               AVG(r.rev_len) AS avg_article_length, MIN(r.rev_timestamp) AS first_article,
+               MAX(r.rev_timestamp) AS latest_article
+        FROM page p INNER JOIN revision r ON p.page_id = r.rev_page
+        WHERE p.page_namespace = 0 AND r.rev_parent_id = 0 AND r.rev_timestamp >= :since
+          AND {_MOBILE_VE}
+        GROUP BY r.rev_user_text
+        HAVING articles_created >= 1
+        ORDER BY articles_created DESC
+        LIMIT :limit
+    """,
+}
+
+# Row limits the Quarry versions hard-code; -1 is SQLite for no limit
+DEFAULT_LIMITS = {1: 1000, 5: 100, 6: 50}
+
+# quarry_loader schema of each query's result
+QUERY_SCHEMAS = {1: 'articles', 2: 'tags', 3: 'revisions', 4: 'daily_creations', 5: 'revision_counts',
+                 6: 'creators'}
+
+# Query 3 for many articles at once, in the order of the temp.wanted table
+_HISTORIES = f"""
+    SELECT w.title AS article, r.rev_id, r.rev_timestamp, r.rev_user_text, r.rev_len,
+           {_TAGS.format(rev='r.rev_id')} AS tags
+    FROM temp.wanted w
+        INNER JOIN page p ON p.page_namespace = 0 AND p.page_title = w.title
+        INNER JOIN revision r ON p.page_id = r.rev_page
+    ORDER BY w.position, r.rev_timestamp, r.rev_id
+"""
+
+
+def mediawiki_timestamp(timestamp: Optional[str]) -> Optional[str]:
+    """2025-10-06T12:34:56Z -> 20251006123456, the form MediaWiki stores"""
+    if not timestamp:
+        return None
+    return ''.join(character for character in timestamp if character.isdigit())[:14]
+
+
+def db_title(title: str) -> str:
+    """Page titles are stored with underscores for spaces"""
+    return title.replace(' ', '_')
+
+
+class QuarryWarehouse:
+    """The four MediaWiki tables the Quarry queries read, in one SQLite file"""
+
+    def __init__(self, path: str = 'quarry_warehouse.sqlite'):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+        self._tag_ids = dict(self.db.execute('SELECT ctd_name, ctd_id FROM change_tag_def'))
+
+    # --- loading -------------------------------------------------------------
+
+    def _tag_id(self, name: str) -> int:
+        tag_id = self._tag_ids.get(name)
+        if tag_id is None:
+            tag_id = self.db.execute('INSERT INTO change_tag_def (ctd_name) VALUES (?)', (name,)).lastrowid
+            self._tag_ids[name] = tag_id
+        return tag_id
+
+    def add_page(self, page: Dict[str, Any], revisions: List[Dict[str, Any]], commit: bool = True):
+        """
+        Insert or update one page and the given revisions, which are shaped
+        like get_page_revisions results. page may be a recentchanges entry
+        or a corpus / dump page ('pageid', 'title', 'ns').
+        """
+        if not revisions:
+            return
+        page_id = page['pageid']
+        latest = max(revisions, key=lambda rev: rev.get('revid', 0))
+        self.db.execute(
+            'INSERT INTO page VALUES (?, ?, ?, ?, ?) ON CONFLICT (page_id) DO UPDATE SET '
+            'page_latest = MAX(page_latest, excluded.page_latest), '
+            'page_len = CASE WHEN excluded.page_latest >= page_latest THEN excluded.page_len ELSE page_len END',
+            (page_id, page.get('ns', 0), db_title(page['title']), latest.get('revid'), latest.get('size'))
+        )
+        self.db.executemany(
+            'INSERT OR REPLACE INTO revision VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [(rev['revid'], page_id, rev.get('parentid', 0), mediawiki_timestamp(rev.get('timestamp')),
+              rev.get('userid'), rev.get('user'), rev.get('size'), rev.get('comment'),
+              int('minor' in rev), rev.get('sha1'))
+             for rev in revisions]
+        )
+        self.db.executemany(
+            'INSERT OR IGNORE INTO change_tag (ct_rev_id, ct_tag_id) VALUES (?, ?)',
+            [(rev['revid'], self._tag_id(tag)) for rev in revisions for tag in rev.get('tags', [])]
+        )
+        if commit:
+            self.db.commit()
+
+    def add_pages(self, pages: Iterable[Any], batch: int = 1000) -> int:
+        """Insert (page, revisions) pairs, committing every batch pages"""
+        count = 0
+        for page, revisions in pages:
+            self.add_page(page, revisions, commit=False)
+            count += 1
+            if count % batch == 0:
+                self.db.commit()
+        self.db.commit()
+        return count
+
+    def load_dump(self, dump_path: str, change_tag_path: str = None, change_tag_def_path: str = None) -> int:
+        """Load every article created in a pages-meta-history / stub dump, with its change tags"""
+        revision_tags = None
+        if change_tag_path and change_tag_def_path:
+            revision_tags = load_change_tags(change_tag_path, change_tag_def_path)
+        return self.add_pages((entry, revisions) for entry, revisions
+                              in iter_dump_pages(dump_path, revision_tags=revision_tags, content=False))
+
+    def refresh_tag_counts(self):
+        """ctd_count as MediaWiki keeps it: the number of uses of each tag"""
+        self.db.execute('UPDATE change_tag_def SET ctd_count = '
+                        '(SELECT COUNT(*) FROM change_tag WHERE ct_tag_id = ctd_id)')
+        self.db.commit()
+
+    # --- querying ------------------------------------------------------------
+
+    def query(self, number: int, since: str = None, days: int = 30, limit: int = None,
+              title: str = None) -> pd.DataFrame:
+        """
+        Run Query `number` of quarry_queries.sql and return its result with
+        the dtypes read_quarry_csv gives the exported CSV. since is a
+        MediaWiki or ISO timestamp and defaults to `days` ago; title is
+        Query 3's article.
+        """
+        if number == 3 and not title:
+            raise ValueError("Query 3 needs the article title")
+        if since is None:
+            since = (datetime.utcnow() - timedelta(days=days)).strftime('%Y%m%d%H%M%S')
+        params = {
+            'since': mediawiki_timestamp(since),
+            'limit': limit if limit is not None else DEFAULT_LIMITS.get(number, -1),
+            'title': db_title(title) if title else None
+        }
+        frame = pd.read_sql_query(QUERIES[number], self.db, params=params)
+        return apply_schema(frame, QUERY_SCHEMAS[number])
+
+    def revision_histories(self, titles: Iterable[str]) -> pd.DataFrame:
+        """
+        Query 3 for every title at once, as the combined frame
+        MobileArticlePatternAnalyzer.analyze_revision_progressions takes
+        """
+        self.db.execute('CREATE TEMP TABLE IF NOT EXISTS wanted (position INTEGER PRIMARY KEY, title TEXT)')
+        self.db.execute('DELETE FROM temp.wanted')
+        self.db.executemany('INSERT INTO temp.wanted (title) VALUES (?)',
+                            [(db_title(title),) for title in dict.fromkeys(titles)])
+        frame = pd.read_sql_query(_HISTORIES, self.db)
+        self.db.execute('DELETE FROM temp.wanted')
+        return combine_revision_frames([apply_schema(frame, 'revisions')] if len(frame) else [])
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Load a local MediaWiki-shaped warehouse and run quarry_queries.sql')
+    parser.add_argument('--db', default='quarry_warehouse.sqlite', help='Warehouse SQLite file')
+    parser.add_argument('--load-dump', metavar='PATH', help='Load a pages-meta-history or stub XML dump')
+    parser.add_argument('--change-tags', metavar='PATH', help='change_tag SQL dump matching --load-dump')
+    parser.add_argument('--change-tag-def', metavar='PATH', help='change_tag_def SQL dump matching --load-dump')
+    parser.add_argument('--query', type=int, choices=sorted(QUERIES), help='Query of quarry_queries.sql to run')
+    parser.add_argument('--days', type=int, default=30, help='Window of the time-bounded queries')
+    parser.add_argument('--since', help='Start of the window instead of --days (YYYYMMDDHHMMSS or ISO)')
+    parser.add_argument('--limit', type=int, help="Row limit instead of the query's own (-1 for none)")
+    parser.add_argument('--title', help='Article for Query 3')
+    parser.add_argument('--csv', metavar='PATH', help='Write the result as a Quarry-style CSV')
+    args = parser.parse_args()
+
+    with QuarryWarehouse(args.db) as warehouse:
+        if args.load_dump:
+            count = warehouse.load_dump(args.load_dump, args.change_tags, args.change_tag_def)
+            warehouse.refresh_tag_counts()
+            print(f"Loaded {count} pages from {args.load_dump} into {args.db}")
+
+        if args.query:
+            result = warehouse.query(args.query, since=args.since, days=args.days, limit=args.limit,
+                                     title=args.title)
+            if args.csv:
+                # Timestamps go back to MediaWiki's form, as Quarry exports them
+                for column in result.columns:
+                    if pd.api.types.is_datetime64_any_dtype(result[column]) and column != 'creation_date':
+                        result[column] = result[column].dt.strftime('%Y%m%d%H%M%S')
+                result.to_csv(args.csv, index=False)
+                print(f"Wrote {len(result)} rows to {args.csv}")
+            else:
+                print(result.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
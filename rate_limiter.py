@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Adaptive API Rate Control
+A token bucket whose rate grows while the API answers normally and is cut
+when it pushes back, plus a requests transport adapter that sends maxlag,
+waits out Retry-After / maxlag / 429 responses and retries them with
+jittered exponential backoff
+"""
+
+import json
+import random
+import threading
+import time
+from collections import Counter
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Callable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# HTTP statuses that mean "slow down and try again"
+THROTTLE_STATUSES = (429, 503)
+
+# MediaWiki error codes (returned with HTTP 200) that mean the same
+THROTTLE_ERRORS = ('maxlag', 'ratelimited')
+
+
+class ThrottledError(requests.exceptions.RetryError):
+    """Raised when a request is still throttled after max_retries retries"""
+
+
+class RateController:
+    """
+    Paces requests for every thread sharing it.
+
+    rate          requests per second to start at; None disables pacing (only
+                  throttle responses are waited out and retried). The
+                  defaults stay polite toward production Wikimedia APIs;
+                  faster settings are for local mirrors, fake APIs and
+                  accounts allowed higher rates
+    min_rate      floor the rate is never cut below
+    max_rate      ceiling additive increases stop at (never below rate)
+    increase      requests per second added after each successful response
+    decrease      factor the rate is multiplied by on each throttle response
+    maxlag        seconds of replica lag above which the API should refuse
+                  the request instead of adding load; None to not send it
+    max_retries   retries of a throttled request before ThrottledError is
+                  raised, so a throttle body is never mistaken for data
+    """
+
+    def __init__(self, rate: Optional[float] = 1.0, burst: Optional[float] = None, min_rate: float = 0.5,
+                 max_rate: float = 2.0, increase: float = 0.2, decrease: float = 0.5,
+                 maxlag: Optional[int] = 5, max_retries: int = 5, backoff_base: float = 1.0,
+                 backoff_cap: float = 60.0, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep, seed: Optional[int] = None):
+        self.rate = rate
+        self.burst = burst or (max(1.0, rate) if rate else 1.0)
+        self.min_rate = min_rate
+        # An explicit starting rate above the default ceiling is kept, not cut back
+        self.max_rate = max(max_rate, rate or 0.0)
+        self.increase = increase
+        self.decrease = decrease
+        self.maxlag = maxlag
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._clock = clock
+        self._sleep = sleep
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        self._tokens = self.burst
+        self._refilled_at = clock()
+        # Set by a throttle response: nobody sends before this moment
+        self._paused_until = 0.0
+
+        self.counts = Counter()
+        self.waited = 0.0
+
+    # --- pacing --------------------------------------------------------------
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self._lock:
+                now = self._clock()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self.rate is None:
+                    return
+                else:
+                    self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+                    self._refilled_at = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+                self.waited += wait
+            self._sleep(wait)
+
+    def record_success(self):
+        with self._lock:
+            self.counts['responses'] += 1
+            if self.rate is not None:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def record_throttle(self, reason: str, delay: float):
+        """A throttle response: cut the rate and hold every sender back for delay seconds"""
+        with self._lock:
+            self.counts['responses'] += 1
+            self.counts[reason] += 1
+            now = self._clock()
+            # Requests already in flight when the first throttle arrived come
+            # back throttled too; cut the rate once per episode, not per thread
+            if self.rate is not None and now >= self._paused_until:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                # Drop saved-up tokens so the reduced rate applies at once
+                self._tokens = min(self._tokens, 1.0)
+            self._paused_until = max(self._paused_until, now + delay)
+
+    def record_retry(self):
+        with self._lock:
+            self.counts['retries'] += 1
+
+    def record_give_up(self):
+        with self._lock:
+            self.counts['gave_up'] += 1
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Seconds to wait before retry number attempt (0-based): doubling per
+        attempt, with up to half of it random so threads throttled together
+        do not retry together, and never less than a server-given Retry-After.
+        """
+        delay = min(self.backoff_cap, self.backoff_base * 2 ** attempt)
+        delay = delay / 2 + self._random.uniform(0, delay / 2)
+        if retry_after is not None:
+            delay = max(delay, retry_after + self._random.uniform(0, min(1.0, retry_after / 2)))
+        return delay
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'responses': self.counts['responses'],
+                'retries': self.counts['retries'],
+                'gave_up': self.counts['gave_up'],
+                'throttled': {reason: count for reason, count in self.counts.items()
+                              if reason not in ('responses', 'retries', 'gave_up')},
+                'seconds_waited': round(self.waited, 3),
+                'current_rate': self.rate
+            }
+
+
+def throttle_reason(response) -> Optional[str]:
+    """'maxlag', 'ratelimited', 'http-429', ... when the response asks us to slow down, else None"""
+    if response.status_code in THROTTLE_STATUSES:
+        return f"http-{response.status_code}"
+    if response.status_code != 200:
+        return None
+
+    # Errors come back as HTTP 200 with an {"error": ...} body
+    head = response.content[:32].lstrip()
+    if not head.startswith(b'{"error"'):
+        return None
+    try:
+        code = json.loads(response.content)['error'].get('code')
+    except (ValueError, KeyError, AttributeError):
+        return None
+    return code if code in THROTTLE_ERRORS else None
+
+
+def retry_after_seconds(response) -> Optional[float]:
+    """Retry-After as seconds; the header may be a number or an HTTP date"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """
+    Transport adapter pacing every request through a RateController.
+    Mounted below a CachedSession, cache hits never wait for a token.
+    """
+
+    def __init__(self, controller: RateController, **kwargs):
+        self.controller = controller
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        controller = self.controller
+        if controller.maxlag is not None and 'maxlag=' not in request.url:
+            request.prepare_url(request.url, {'maxlag': controller.maxlag})
+
+        attempt = 0
+        while True:
+            controller.acquire()
+            response = super().send(request, **kwargs)
+            # How many times this request was retried, for per-call metrics
+            response.retries = attempt
+            reason = throttle_reason(response)
+            if reason is None:
+                controller.record_success()
+                return response
+
+            delay = controller.backoff_delay(attempt, retry_after_seconds(response))
+            controller.record_throttle(reason, delay)
+            if attempt >= controller.max_retries:
+                controller.record_give_up()
+                response.close()
+                raise ThrottledError(f"{reason} still throttled after {attempt} retries",
+                                     request=request, response=response)
+            controller.record_retry()
+            response.close()
+            attempt += 1
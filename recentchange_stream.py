@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Live Recentchange Stream Consumer
+Follows a server-sent events feed of recentchange events (Wikimedia
+EventStreams), keeps the mobile VE article creations as they arrive and
+folds each into the first-revision statistics in constant time, writing a
+JSON snapshot and Prometheus metrics for dashboards as it goes. Dropped
+connections resume from the last event id, restarts from a checkpoint.
+"""
+
+import json
+import os
+import pickle
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional
+
+import requests
+
+from analyze_quarry_results import SketchedFirstRevisionAggregator
+from rate_limiter import RateController
+from run_metrics import RunMetrics
+from wikipedia_mobile_analysis import WikipediaAnalyzer
+
+STREAM_URL = 'https://stream.wikimedia.org/v2/stream/recentchange'
+
+# Statistics so far, rewritten every --snapshot-every seconds
+SNAPSHOT_PATH = 'live_creation_stats.json'
+
+# Last event id and aggregates, saved together so a restart neither loses nor double counts events
+STATE_PATH = 'live_stream_state.pkl'
+
+# Stream and tag lookup metrics: <base>.json and <base>.prom (Prometheus textfile)
+METRICS_PATH = 'mobile_ve_stream_metrics'
+
+# Seconds a creation whose tags cannot be looked up yet (replica lag) keeps
+# being retried before it is given up
+PENDING_LOOKUP_SECONDS = 600
+
+# Creations queued for a tag lookup before the queue is looked up at once,
+# between snapshots: one request per wiki and 50 revisions instead of one per event
+LOOKUP_BATCH_SIZE = 50
+
+
+def iter_sse(lines: Iterable[str]) -> Iterator[Dict[str, str]]:
+    """
+    Events of a text/event-stream body given line by line: dicts of 'id',
+    'event', 'retry' and 'data' (multi-line data joined with newlines).
+    Comments (heartbeats) come out as {'comment': text}, so a reader blocked
+    on a quiet stream still gets a chance to look at the clock.
+    """
+    event = {}
+    data = []
+    for line in lines:
+        if not line:
+            if data:
+                event['data'] = '\n'.join(data)
+            if event:
+                yield event
+            event, data = {}, []
+            continue
+        if line.startswith(':'):
+            yield {'comment': line[1:].strip()}
+            continue
+        field, _, value = line.partition(':')
+        if value.startswith(' '):
+            value = value[1:]
+        if field == 'data':
+            data.append(value)
+        elif field in ('id', 'event', 'retry'):
+            event[field] = value
+
+
+class EventStreamConsumer:
+    """
+    Iterates the JSON payloads of an SSE endpoint. When the connection drops
+    or the server ends the response it reconnects, sending the id of the last
+    event received as Last-Event-ID, so the stream continues where it broke
+    off rather than from now. Reconnects wait the server's retry delay,
+    doubling while connections keep failing.
+    """
+
+    def __init__(self, url: str = STREAM_URL, last_event_id: Optional[str] = None,
+                 session: Optional[requests.Session] = None, retry: float = 1.0, max_retry: float = 60.0,
+                 timeout: float = 60.0, deadline: Optional[float] = None):
+        self.url = url
+        self.last_event_id = last_event_id
+        self.session = session or requests.Session()
+        self.session.headers.update({'User-Agent': 'WikipediaMobileAnalysis/1.0 (Research Project)'})
+        self.retry = retry
+        self.max_retry = max_retry
+        # Read timeout: a stream quiet for longer (not even a heartbeat) is treated as dropped
+        self.timeout = timeout
+        # time.monotonic() value at which iteration stops
+        self.deadline = deadline
+        self.connections = 0
+        self.reconnects = 0
+        self.malformed = 0
+
+    def _expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        failures = 0
+        while not self._expired():
+            headers = {'Accept': 'text/event-stream'}
+            if self.last_event_id:
+                headers['Last-Event-ID'] = self.last_event_id
+            try:
+                with self.session.get(self.url, headers=headers, stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    response.encoding = 'utf-8'
+                    self.connections += 1
+                    for event in iter_sse(response.iter_lines(chunk_size=None, decode_unicode=True)):
+                        if self._expired():
+                            return
+                        if 'retry' in event and event['retry'].isdigit():
+                            self.retry = int(event['retry']) / 1000
+                        if 'data' not in event:
+                            # An id with no data still moves the resume point
+                            self.last_event_id = event.get('id', self.last_event_id)
+                            continue
+                        try:
+                            payload = json.loads(event['data'])
+                        except ValueError:
+                            self.malformed += 1
+                            continue
+                        failures = 0
+                        self.last_event_id = event.get('id', self.last_event_id)
+                        yield payload
+                print(f"  Stream ended by the server, reconnecting")
+            except requests.RequestException as e:
+                failures += 1
+                print(f"  Stream connection lost ({e.__class__.__name__}), reconnecting")
+
+            delay = min(self.max_retry, self.retry * 2 ** max(0, failures - 1))
+            if self.deadline is not None:
+                delay = min(delay, max(0.0, self.deadline - time.monotonic()))
+            time.sleep(delay)
+            self.reconnects += 1
+
+
+class RevisionTagLookup:
+    """
+    Change tags of the revision an event is about, from that event's own
+    wiki: recentchange events do not carry tags. One WikipediaAnalyzer (so
+    one connection pool and rate controller) per API endpoint.
+    """
+
+    def __init__(self, metrics: Optional[RunMetrics] = None, rate: Optional[float] = 1.0):
+        self.metrics = metrics
+        # Starting requests per second for each wiki (None: unpaced)
+        self.rate = rate
+        self.analyzers = {}
+        self.unresolved = 0
+
+    def __call__(self, event: Dict[str, Any]) -> Optional[List[str]]:
+        return self.resolve([event])[0]
+
+    def resolve(self, events: List[Dict[str, Any]]) -> List[Optional[List[str]]]:
+        """Tags of each event's revision, None where it cannot be looked up; one batched lookup per wiki"""
+        revids_by_api = {}
+        for event in events:
+            revid = event.get('revision', {}).get('new')
+            if revid:
+                api_url = f"{event['server_url']}{event.get('server_script_path', '/w')}/api.php"
+                revids_by_api.setdefault(api_url, []).append(revid)
+
+        found = {}
+        for api_url, revids in revids_by_api.items():
+            if api_url not in self.analyzers:
+                self.analyzers[api_url] = WikipediaAnalyzer(api_url=api_url, max_connections=1, metrics=self.metrics,
+                                                            rate_controller=RateController(rate=self.rate))
+            tags = self.analyzers[api_url].get_revision_tags(revids)
+            found.update(((api_url, revid), tags[revid]) for revid in revids if revid in tags)
+
+        results = []
+        for event in events:
+            api_url = f"{event.get('server_url')}{event.get('server_script_path', '/w')}/api.php"
+            tags = found.get((api_url, event.get('revision', {}).get('new')))
+            if tags is None:
+                # Typically replica lag: the revision is not visible to the API yet
+                self.unresolved += 1
+            results.append(tags)
+        return results
+
+
+def is_creation(event: Dict[str, Any], wiki: Optional[str] = 'enwiki') -> bool:
+    """A page creation in the article namespace, on wiki (None: any wiki)"""
+    return (event.get('type') == 'new' and event.get('namespace') == 0
+            and (wiki is None or event.get('wiki') == wiki))
+
+
+def has_mobile_ve_tags(tags: Optional[List[str]]) -> bool:
+    """Same test wikipedia_mobile_analysis applies to recentchanges entries"""
+    tags = tags or []
+    return any('mobile' in tag.lower() for tag in tags) and any('visual' in tag.lower() for tag in tags)
+
+
+class LiveCreationStats:
+    """
+    Stream state: the aggregates of every mobile VE creation seen so far
+    plus the id of the last event they include. Events are processed in
+    constant time each; memory is bounded by the sketches' error settings.
+
+    Creations whose tags need looking up never wait on the API in add():
+    they join a pending queue that is part of the checkpoint, looked up in
+    bulk by retry_pending() once lookup_batch of them are queued and before
+    every snapshot, until they resolve or are PENDING_LOOKUP_SECONDS old.
+    The resume point can then move on without leaving them behind or
+    counting anything twice.
+    """
+
+    def __init__(self, wiki: Optional[str] = 'enwiki', tag_lookup: Optional[Callable] = None,
+                 pending_seconds: float = PENDING_LOOKUP_SECONDS, lookup_batch: int = LOOKUP_BATCH_SIZE):
+        self.wiki = wiki
+        self.tag_lookup = tag_lookup
+        self.pending_seconds = pending_seconds
+        self.lookup_batch = lookup_batch
+        self.aggregator = SketchedFirstRevisionAggregator()
+        self.last_event_id = None
+        self.events = 0
+        self.creations = 0
+        self.matched = 0
+        self.newest_timestamp = None
+        # (event, time.time() it was queued)
+        self.pending = []
+        # Queued since the last lookup
+        self.queued = 0
+        self.given_up = 0
+
+    def __setstate__(self, state: Dict[str, Any]):
+        # Checkpoints written before the pending queue or batched lookups existed
+        self.__dict__.update({'pending_seconds': PENDING_LOOKUP_SECONDS, 'lookup_batch': LOOKUP_BATCH_SIZE,
+                              'pending': [], 'queued': 0, 'given_up': 0}, **state)
+
+    def add(self, event: Dict[str, Any], event_id: Optional[str] = None):
+        self.events += 1
+        self.last_event_id = event_id
+        if not is_creation(event, self.wiki):
+            return
+        self.creations += 1
+
+        tags = event.get('tags')
+        if tags is None and self.tag_lookup and 'server_url' in event:
+            self.pending.append((event, time.time()))
+            self.queued += 1
+            if self.queued >= self.lookup_batch:
+                self.retry_pending()
+            return
+        self._count(event, tags)
+
+    def retry_pending(self):
+        """Look up the pending creations, in one batch per wiki; give up on the ones too old"""
+        if not self.pending or not self.tag_lookup:
+            return
+        self.queued = 0
+        events = [event for event, _ in self.pending]
+        resolve = getattr(self.tag_lookup, 'resolve', None)
+        results = resolve(events) if resolve else [self.tag_lookup(event) for event in events]
+        now = time.time()
+        still_pending = []
+        for (event, since), tags in zip(self.pending, results):
+            if tags is not None:
+                self._count(event, tags)
+            elif now - since < self.pending_seconds:
+                still_pending.append((event, since))
+            else:
+                self.given_up += 1
+        self.pending = still_pending
+
+    def _count(self, event: Dict[str, Any], tags: Optional[List[str]]):
+        if not has_mobile_ve_tags(tags):
+            return
+
+        self.matched += 1
+        timestamp = event.get('timestamp')
+        created = datetime.fromtimestamp(timestamp, timezone.utc) if timestamp is not None else None
+        self.aggregator.add_creation(event.get('length', {}).get('new'), event.get('user'), created)
+        if timestamp is not None:
+            self.newest_timestamp = max(self.newest_timestamp or timestamp, timestamp)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'updated': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'stream': {'wiki': self.wiki, 'last_event_id': self.last_event_id, 'events': self.events,
+                       'creations': self.creations, 'mobile_ve_creations': self.matched,
+                       'pending_tag_lookups': len(self.pending), 'tag_lookups_given_up': self.given_up,
+                       'newest_creation': datetime.fromtimestamp(self.newest_timestamp, timezone.utc).isoformat()
+                       if self.newest_timestamp is not None else None},
+            'first_revisions': self.aggregator.summary(),
+        }
+
+    def save(self, path: str):
+        """Checkpoint atomically; the tag lookup (sessions) is not part of the state"""
+        tag_lookup, self.tag_lookup = self.tag_lookup, None
+        try:
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        finally:
+            self.tag_lookup = tag_lookup
+
+    @staticmethod
+    def load(path: str) -> Optional['LiveCreationStats']:
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
+def run_stream(url: str = STREAM_URL, wiki: Optional[str] = 'enwiki', state_path: Optional[str] = STATE_PATH,
+               snapshot_path: str = SNAPSHOT_PATH, snapshot_every: float = 10.0, max_events: Optional[int] = None,
+               duration: Optional[float] = None, record_path: Optional[str] = None, lookup_tags: bool = True,
+               lookup_rate: Optional[float] = 1.0, metrics_path: Optional[str] = METRICS_PATH) -> LiveCreationStats:
+    metrics = RunMetrics(prefix='mobile_ve_stream')
+    tag_lookup = RevisionTagLookup(metrics, rate=lookup_rate) if lookup_tags else None
+
+    stats = LiveCreationStats.load(state_path) if state_path else None
+    if stats and stats.wiki == wiki:
+        stats.tag_lookup = tag_lookup
+        print(f"Resuming after event {stats.last_event_id} ({stats.matched} mobile VE creations so far)")
+    else:
+        stats = LiveCreationStats(wiki, tag_lookup)
+
+    consumer = EventStreamConsumer(url, last_event_id=stats.last_event_id,
+                                   deadline=time.monotonic() + duration if duration else None)
+    print(f"\n=== Following {url} for mobile VE creations on {wiki or 'every wiki'} ===")
+
+    def publish():
+        # Queued creations are looked up in bulk; those not visible yet have had a snapshot interval to appear
+        stats.retry_pending()
+        snapshot = stats.snapshot()
+        # Dashboards may read it at any moment; never let them see half a file
+        tmp_path = snapshot_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, indent=2, ensure_ascii=False, default=str)
+        os.replace(tmp_path, snapshot_path)
+        if state_path:
+            stats.save(state_path)
+        for name, value in (('events', stats.events), ('creations', stats.creations),
+                            ('mobile_ve_creations', stats.matched), ('reconnects', consumer.reconnects),
+                            ('pending_tag_lookups', len(stats.pending)), ('tag_lookups_given_up', stats.given_up),
+                            ('unique_creators', snapshot['first_revisions']['unique_creators'])):
+            metrics.set_gauge(name, value)
+        if stats.newest_timestamp is not None:
+            metrics.set_gauge('newest_creation_age_seconds', round(time.time() - stats.newest_timestamp, 3))
+        if metrics_path:
+            metrics.write(metrics_path)
+        print(f"  {stats.events} events, {stats.creations} creations, {stats.matched} mobile VE "
+              f"({consumer.reconnects} reconnects)")
+
+    record = open(record_path, 'a', encoding='utf-8') if record_path else None
+    last_published = time.monotonic()
+    try:
+        for event in consumer:
+            if record:
+                record.write(json.dumps(event, ensure_ascii=False) + '\n')
+            stats.add(event, consumer.last_event_id)
+            if time.monotonic() - last_published >= snapshot_every:
+                publish()
+                last_published = time.monotonic()
+            if max_events and stats.events >= max_events:
+                break
+    except KeyboardInterrupt:
+        print("\nStopped")
+    finally:
+        if record:
+            record.close()
+        publish()
+
+    if stats.pending:
+        print(f"  {len(stats.pending)} creations still waiting for their tags; kept in the checkpoint and retried")
+    if stats.given_up:
+        print(f"  {stats.given_up} creations whose tags could not be looked up for "
+              f"{stats.pending_seconds:.0f}s were skipped")
+    print(f"\n📄 Snapshot saved to: {snapshot_path}")
+    return stats
+
+
+def main():
+    import argparse
+    from analyze_quarry_results import MobileArticlePatternAnalyzer
+
+    parser = argparse.ArgumentParser(description='Follow the recentchange event stream and keep mobile VE '
+                                                 'creation statistics current')
+    parser.add_argument('--url', default=STREAM_URL, help='SSE endpoint (e.g. a fake_event_stream.py replay)')
+    parser.add_argument('--wiki', default='enwiki', help="Database name to keep, or 'all'")
+    parser.add_argument('--state', default=STATE_PATH, help='Checkpoint of the aggregates and last event id')
+    parser.add_argument('--reset', action='store_true', help='Ignore the checkpoint and start from now')
+    parser.add_argument('--snapshot', default=SNAPSHOT_PATH, help='JSON statistics rewritten as events arrive')
+    parser.add_argument('--snapshot-every', type=float, default=10.0, help='Seconds between snapshots')
+    parser.add_argument('--max-events', type=int, help='Stop after this many events')
+    parser.add_argument('--duration', type=float, help='Stop after this many seconds')
+    parser.add_argument('--record', metavar='PATH', help='Append every event to this JSONL file (replay fixtures)')
+    parser.add_argument('--no-tag-lookup', action='store_true',
+                        help='Only use tags carried by the events themselves; never query the API')
+    parser.add_argument('--lookup-rate', type=float, default=1.0,
+                        help='Tag lookup requests per second to start at, per wiki (adapts to throttling)')
+    parser.add_argument('--metrics', metavar='BASE', default=METRICS_PATH,
+                        help='Write stream metrics to BASE.json and BASE.prom (Prometheus textfile)')
+    parser.add_argument('--no-metrics', action='store_true')
+    args = parser.parse_args()
+
+    if args.reset and os.path.exists(args.state):
+        os.remove(args.state)
+
+    stats = run_stream(url=args.url, wiki=None if args.wiki == 'all' else args.wiki, state_path=args.state,
+                       snapshot_path=args.snapshot, snapshot_every=args.snapshot_every, max_events=args.max_events,
+                       duration=args.duration, record_path=args.record, lookup_tags=not args.no_tag_lookup,
+                       lookup_rate=args.lookup_rate,
+                       metrics_path=None if args.no_metrics else args.metrics)
+    if stats.matched:
+        MobileArticlePatternAnalyzer().print_first_revision_summary(stats.aggregator.summary())
+
+
+if __name__ == "__main__":
+    main()
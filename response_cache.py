@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Persistent HTTP Response Cache
+SQLite-backed cache for MediaWiki API responses with per-query TTLs,
+size-bounded LRU eviction and a strict offline replay mode
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Seconds a cached response stays fresh, keyed by the list=/prop= module
+DEFAULT_TTLS = {
+    'tags': 7 * 86400,           # Tag definitions change rarely
+    'recentchanges': 3600,       # New creations keep arriving
+    'revisions': 86400,          # Histories grow, but slowly for most articles
+    'default': 3600
+}
+
+
+class CacheMissError(requests.exceptions.ConnectionError):
+    """Raised in offline mode when a request has no cached response"""
+
+
+class ResponseCache:
+    """Stores raw response bodies in SQLite keyed on normalized request parameters"""
+
+    def __init__(self, path: str = 'api_cache.sqlite', max_bytes: int = 2 * 1024 ** 3,
+                 ttls: Optional[Dict[str, int]] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                query_type TEXT NOT NULL,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                content_type TEXT,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.db.execute('CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)')
+        self.db.commit()
+
+        # Bytes stored, summed once here and then kept up to date by put and
+        # eviction, so inserts do not scan the table
+        self._total_bytes = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict[str, Any]]) -> str:
+        """Normalize parameters so equivalent requests share one cache entry"""
+        normalized = sorted((str(key), str(value)) for key, value in (params or {}).items() if value is not None)
+        return hashlib.sha256(json.dumps([url, normalized]).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def query_type(params: Optional[Dict[str, Any]]) -> str:
+        params = params or {}
+        return str(params.get('list') or params.get('prop') or 'default')
+
+    def get(self, key: str, query_type: str, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self.db.execute(
+                'SELECT url, status, content_type, body, stored_at FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+
+            ttl = self.ttls.get(query_type, self.ttls['default'])
+            if row is None or (not allow_stale and now - row[4] > ttl):
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.db.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+            self.db.commit()
+
+        url, status, content_type, body, _stored_at = row
+        return {'url': url, 'status': status, 'content_type': content_type, 'body': body}
+
+    def put(self, key: str, query_type: str, url: str, status: int, content_type: str, body: bytes):
+        now = time.time()
+        with self._lock:
+            replaced = self.db.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            self.db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, query_type, url, status, content_type, body, len(body), now, now)
+            )
+            self._total_bytes += len(body) - (replaced[0] if replaced else 0)
+            self._evict()
+            self.db.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        freed = 0
+        victims = []
+        for key, size in self.db.execute('SELECT key, size FROM responses ORDER BY accessed_at'):
+            victims.append((key,))
+            freed += size
+            if self._total_bytes - freed <= self.max_bytes:
+                break
+        self.db.executemany('DELETE FROM responses WHERE key = ?', victims)
+        self._total_bytes -= freed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self.db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+            # Resynchronize, in case another process shares the file
+            self._total_bytes = size
+        return {'entries': entries, 'bytes': size, 'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+
+class CachedSession(requests.Session):
+    """
+    A requests.Session that answers GET requests from a ResponseCache.
+    In offline mode nothing goes to the network: cached responses are served
+    even when stale and a miss raises CacheMissError.
+    """
+
+    def __init__(self, cache: ResponseCache, offline: bool = False):
+        super().__init__()
+        self.cache = cache
+        self.offline = offline
+
+    def request(self, method, url, params=None, **kwargs):
+        if method.upper() != 'GET':
+            return super().request(method, url, params=params, **kwargs)
+
+        key = self.cache.make_key(url, params)
+        query_type = self.cache.query_type(params)
+
+        cached = self.cache.get(key, query_type, allow_stale=self.offline)
+        if cached is not None:
+            return _build_response(cached)
+
+        if self.offline:
+            raise CacheMissError(f"Offline mode: no cached response for {query_type} request")
+
+        response = super().request(method, url, params=params, **kwargs)
+        # MediaWiki reports errors (maxlag, ratelimited, ...) with HTTP 200, so check the body too
+        if response.status_code == 200 and not response.content.lstrip().startswith(b'{"error"'):
+            self.cache.put(key, query_type, response.url, response.status_code,
+                           response.headers.get('content-type', ''), response.content)
+        response.from_cache = False
+        return response
+
+
+def _build_response(cached: Dict[str, Any]) -> requests.Response:
+    response = requests.Response()
+    response.status_code = cached['status']
+    response.url = cached['url']
+    response._content = cached['body']
+    response.headers = CaseInsensitiveDict({'Content-Type': cached['content_type'] or 'application/json'})
+    response.encoding = 'utf-8'
+    response.from_cache = True
+    return response
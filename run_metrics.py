@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Run Instrumentation
+Per call type API request counts, latency histograms, bytes and retry /
+cache-hit counts, wall and CPU time per processing stage, written at the
+end of a run as a JSON summary and a Prometheus textfile, plus opt-in
+cProfile and stack sampling hooks
+"""
+
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class RunMetrics:
+    """
+    Thread-safe collector for one run.
+
+    Requests are keyed by call type (the API module: 'recentchanges',
+    'revisions', ...). Stage times are inclusive: a stage that calls another
+    timed stage counts that time too, as cProfile's cumulative time does.
+    CPU time is the calling thread's, so concurrent stages do not inflate
+    each other.
+    """
+
+    def __init__(self, prefix: str = 'mobile_ve', buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+        self.requests = defaultdict(Counter)
+        self.latency_sum = Counter()
+        self.latency_buckets = defaultdict(lambda: [0] * (len(buckets) + 1))
+        self.stages = defaultdict(lambda: {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0})
+        self.gauges = {}
+
+    # --- recording -----------------------------------------------------------
+
+    def record_request(self, call_type: str, seconds: float, size: int = 0, cache_hit: bool = False,
+                       retries: int = 0, error: bool = False):
+        """One API call as the caller saw it, including pacing waits and retries"""
+        bucket = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        with self._lock:
+            counts = self.requests[call_type]
+            counts['requests'] += 1
+            counts['retries'] += retries
+            counts['errors'] += error
+            if cache_hit:
+                counts['cache_hits'] += 1
+            else:
+                counts['bytes'] += size
+            self.latency_sum[call_type] += seconds
+            self.latency_buckets[call_type][bucket] += 1
+
+    def add_stage(self, name: str, wall: float, cpu: float, calls: int = 1):
+        with self._lock:
+            stage = self.stages[name]
+            stage['calls'] += calls
+            stage['wall_seconds'] += wall
+            stage['cpu_seconds'] += cpu
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as one call of stage `name`"""
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - wall, time.thread_time() - cpu)
+
+    def take_stages(self) -> Dict[str, Dict[str, float]]:
+        """Stage totals recorded so far, which are then reset (for shipping out of worker processes)"""
+        with self._lock:
+            stages = {name: dict(stage) for name, stage in self.stages.items()}
+            self.stages.clear()
+        return stages
+
+    def merge_stages(self, stages: Dict[str, Dict[str, float]]):
+        for name, stage in stages.items():
+            self.add_stage(name, stage['wall_seconds'], stage['cpu_seconds'], stage['calls'])
+
+    def set_gauge(self, name: str, value: float):
+        """Any other number worth tracking across runs (pages analyzed, final request rate, ...)"""
+        with self._lock:
+            self.gauges[name] = value
+
+    # --- output --------------------------------------------------------------
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = {}
+            for call_type, counts in sorted(self.requests.items()):
+                count = counts['requests']
+                requests[call_type] = {
+                    'requests': count,
+                    'cache_hits': counts['cache_hits'],
+                    'retries': counts['retries'],
+                    'errors': counts['errors'],
+                    'bytes': counts['bytes'],
+                    'latency_seconds_total': round(self.latency_sum[call_type], 6),
+                    'latency_seconds_mean': round(self.latency_sum[call_type] / count, 6) if count else None,
+                    'latency_buckets': {str(bound): total for bound, total in
+                                        zip(list(self.buckets) + ['+Inf'], _cumulative(self.latency_buckets[call_type]))}
+                }
+            stages = {name: {'calls': stage['calls'], 'wall_seconds': round(stage['wall_seconds'], 6),
+                             'cpu_seconds': round(stage['cpu_seconds'], 6)}
+                      for name, stage in self.stages.items()}
+            gauges = dict(self.gauges)
+
+        return {
+            'started_at': self.started_at,
+            'duration_seconds': round(time.perf_counter() - self._started, 6),
+            'process_cpu_seconds': round(time.process_time(), 6),
+            'requests': requests,
+            'stages': stages,
+            'gauges': gauges
+        }
+
+    def prometheus(self) -> str:
+        """The summary in the Prometheus text exposition format"""
+        summary = self.summary()
+        p = self.prefix
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} {kind}")
+
+        family('run_duration_seconds', 'gauge', 'Wall time of the run')
+        lines.append(f"{p}_run_duration_seconds {summary['duration_seconds']}")
+        family('run_cpu_seconds', 'gauge', 'CPU time of the main process')
+        lines.append(f"{p}_run_cpu_seconds {summary['process_cpu_seconds']}")
+        family('run_timestamp_seconds', 'gauge', 'Unix time the run started')
+        lines.append(f"{p}_run_timestamp_seconds {summary['started_at']:.3f}")
+
+        requests = summary['requests']
+        for field, help_text in (('requests', 'API requests'), ('cache_hits', 'API requests served from cache'),
+                                 ('retries', 'Retries of throttled API requests'),
+                                 ('errors', 'API requests that raised'),
+                                 ('bytes', 'Response bytes downloaded')):
+            family(f"api_{field}_total", 'counter', f"{help_text}, by call type")
+            for call_type, stats in requests.items():
+                lines.append(f"{p}_api_{field}_total{{call={_label(call_type)}}} {stats[field]}")
+
+        family('api_latency_seconds', 'histogram', 'API request latency including pacing and retries, by call type')
+        for call_type, stats in requests.items():
+            call = _label(call_type)
+            for bound, total in stats['latency_buckets'].items():
+                lines.append(f"{p}_api_latency_seconds_bucket{{call={call},le=\"{bound}\"}} {total}")
+            lines.append(f"{p}_api_latency_seconds_sum{{call={call}}} {stats['latency_seconds_total']}")
+            lines.append(f"{p}_api_latency_seconds_count{{call={call}}} {stats['requests']}")
+
+        family('stage_calls_total', 'counter', 'Calls of each timed stage')
+        for name, stage in summary['stages'].items():
+            lines.append(f"{p}_stage_calls_total{{stage={_label(name)}}} {stage['calls']}")
+        family('stage_seconds_total', 'counter', 'Inclusive wall and CPU seconds of each timed stage')
+        for name, stage in summary['stages'].items():
+            lines.append(f"{p}_stage_seconds_total{{stage={_label(name)},clock=\"wall\"}} {stage['wall_seconds']}")
+            lines.append(f"{p}_stage_seconds_total{{stage={_label(name)},clock=\"cpu\"}} {stage['cpu_seconds']}")
+
+        for name, value in summary['gauges'].items():
+            family(name, 'gauge', name.replace('_', ' ').capitalize())
+            lines.append(f"{p}_{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, base_path: str) -> Tuple[str, str]:
+        """Write <base_path>.json and <base_path>.prom; returns both paths"""
+        json_path, prom_path = base_path + '.json', base_path + '.prom'
+        _write_atomic(json_path, json.dumps(self.summary(), indent=2))
+        # The node_exporter textfile collector may read at any moment; never let it see half a file
+        _write_atomic(prom_path, self.prometheus())
+        return json_path, prom_path
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"\n=== Run Metrics ({summary['duration_seconds']:.1f}s wall, "
+              f"{summary['process_cpu_seconds']:.1f}s CPU) ===")
+        for call_type, stats in summary['requests'].items():
+            print(f"  {call_type:<16s} {stats['requests']:6d} requests  {stats['cache_hits']:6d} cached  "
+                  f"{stats['retries']:4d} retries  {stats['bytes'] / 1024 ** 2:8.1f} MB  "
+                  f"mean {stats['latency_seconds_mean'] * 1000:7.1f} ms")
+        for name, stage in sorted(summary['stages'].items(), key=lambda item: -item[1]['wall_seconds']):
+            print(f"  {name:<32s} {stage['calls']:7d} calls  {stage['wall_seconds']:8.2f}s wall  "
+                  f"{stage['cpu_seconds']:8.2f}s CPU")
+
+
+def timed(stage: str = None):
+    """
+    Method decorator recording every call as a stage of self.metrics, named
+    after the method unless given. Only for methods that return a value,
+    not generators.
+    """
+    def decorate(method):
+        name = stage or method.__name__
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.stage(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _cumulative(counts: List[int]) -> List[int]:
+    total = 0
+    result = []
+    for count in counts:
+        total += count
+        result.append(total)
+    return result
+
+
+def _label(value: str) -> str:
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+
+
+def _write_atomic(path: str, text: str):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+# --- profiling hooks -----------------------------------------------------------
+
+@contextmanager
+def profiled(path: Optional[str], top: int = 25) -> Iterator[None]:
+    """
+    cProfile the enclosed block when path is given: stats are dumped to path
+    (for snakeviz / pstats) and the top functions by cumulative time printed.
+    cProfile only sees the calling thread; use sampled() for thread pools.
+    """
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(top)
+        print(report.getvalue())
+        print(f"Profile saved to: {path}")
+
+
+class StackSampler:
+    """
+    Samples the stack of every thread at a fixed interval from a background
+    thread and counts identical stacks. Written out in the collapsed format
+    flamegraph.pl and speedscope read: 'outer;...;inner count' per line.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def sampled(path: Optional[str], interval: float = 0.005) -> Iterator[None]:
+    """Sample every thread's stack during the enclosed block when path is given"""
+    if not path:
+        yield
+        return
+    sampler = StackSampler(interval)
+    sampler.start()
+    try:
+        yield
+    finally:
+        sampler.stop()
+        sampler.write(path)
+        print(f"{sum(sampler.samples.values())} stack samples saved to: {path}")
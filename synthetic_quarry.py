@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Synthetic Quarry Exports
+Generates CSVs shaped like the results of the queries in quarry_queries.sql,
+at any size, for benchmarking analyze_quarry_results.py offline
+"""
+
+from datetime import datetime
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+from synthetic_wiki import WORDS
+
+TAG_SETS = [
+    'mobile edit, mobile web edit, visualeditor',
+    'mobile edit, mobile web edit, visualeditor-wikitext',
+    'mobile edit, mobile web edit, visualeditor, visualeditor-wikitext',
+    'mobile edit, visualeditor',
+]
+
+
+def _mediawiki_timestamps(rng: np.random.Generator, count: int, days: int, end_date: datetime) -> np.ndarray:
+    """rev_timestamp values as Quarry exports them: 14-digit YYYYMMDDHHMMSS"""
+    end = np.datetime64(end_date.replace(microsecond=0), 's')
+    seconds = rng.integers(0, days * 86400, size=count)
+    stamps = (end - seconds.astype('timedelta64[s]')).astype(str)
+    return np.char.replace(np.char.replace(np.char.replace(stamps, '-', ''), 'T', ''), ':', '').astype(np.int64)
+
+
+def generate_articles_frame(rows: int = 1000000, seed: int = 0, days: int = 30,
+                            end_date: datetime = None) -> pd.DataFrame:
+    """Rows in the shape of QUERY 1 (mobile VE article creations), newest first"""
+    rng = np.random.default_rng(seed)
+    end_date = end_date or datetime(2025, 11, 1)
+
+    # A heavy-tailed creator distribution: a few prolific creators, many one-offs
+    creator_ids = (rng.zipf(1.6, size=rows) + rng.integers(0, max(1, rows // 4), size=rows) // 8) % max(1, rows // 3)
+    words = np.array(WORDS)
+    title_words = words[rng.integers(0, len(words), size=rows)]
+
+    frame = pd.DataFrame({
+        'page_id': np.arange(70000000, 70000000 + rows),
+        'page_title': np.char.add(np.char.capitalize(title_words.astype(str)),
+                                  np.char.add('_', np.arange(rows).astype(str))),
+        'page_namespace': 0,
+        'first_revision_id': np.arange(1300000000, 1300000000 + rows),
+        'creation_timestamp': _mediawiki_timestamps(rng, rows, days, end_date),
+        'creator': np.char.add('Creator', creator_ids.astype(str)),
+        'initial_length': rng.lognormal(7.2, 1.1, size=rows).astype(np.int64),
+        'tags': np.array(TAG_SETS)[rng.integers(0, len(TAG_SETS), size=rows)],
+    })
+    return frame.sort_values('creation_timestamp', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def write_articles_csv(path: str, rows: int = 1000000, seed: int = 0) -> pd.DataFrame:
+    frame = generate_articles_frame(rows, seed)
+    frame.to_csv(path, index=False)
+    return frame
+
+
+def generate_revisions_frame(revisions: int = 50, seed: int = 0, start_length: int = 1500,
+                             end_date: datetime = None) -> pd.DataFrame:
+    """Rows in the shape of QUERY 3 (one article's history), oldest first"""
+    rng = np.random.default_rng(seed)
+    end_date = end_date or datetime(2025, 11, 1)
+
+    # Mostly small additions, with the occasional large expansion or revert
+    deltas = rng.normal(200, 600, size=revisions).astype(np.int64)
+    deltas[0] = start_length
+    lengths = np.maximum(np.cumsum(deltas), 50)
+    editors = np.char.add('Editor', rng.integers(0, max(2, revisions // 3), size=revisions).astype(str))
+    tag_choices = np.array(TAG_SETS + ['visualeditor', 'mw-reverted', ''])
+
+    return pd.DataFrame({
+        'rev_id': np.arange(revisions) + 1300000000 + seed * 1000,
+        'rev_timestamp': np.sort(_mediawiki_timestamps(rng, revisions, 30, end_date)),
+        'rev_user_text': editors,
+        'rev_len': lengths,
+        'rev_comment': 'edit',
+        'rev_minor_edit': rng.integers(0, 2, size=revisions),
+        'tags': tag_choices[rng.integers(0, len(tag_choices), size=revisions)],
+    })
+
+
+def write_revision_csvs(directory: str, articles: int = 100, revisions: int = 50, seed: int = 0) -> list:
+    """Write article_revisions_<n>.csv files as main() expects them next to the articles list"""
+    paths = []
+    for index in range(articles):
+        path = f"{directory}/article_revisions_{index}.csv"
+        generate_revisions_frame(revisions, seed + index).to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def write_corpus_exports(corpus: List[Dict[str, Any]], directory: str) -> Tuple[str, List[str]]:
+    """
+    Write a synthetic_wiki corpus as the Quarry exports of the same wiki:
+    articles_list.csv (QUERY 1, mobile VE creations only) and one
+    article_revisions_<title>.csv (QUERY 3) per listed article, so the API
+    crawl and the Quarry analysis can be benchmarked on the same articles
+    """
+    def mediawiki(timestamp):
+        return int(timestamp.replace('-', '').replace('T', '').replace(':', '').rstrip('Z'))
+
+    articles = []
+    revision_paths = []
+    for page in corpus:
+        first = page['revisions'][0]
+        tags = first['tags']
+        if not (any('mobile' in tag for tag in tags) and any('visual' in tag for tag in tags)):
+            continue
+        title = page['title'].replace(' ', '_')
+        articles.append({
+            'page_id': page['pageid'], 'page_title': title, 'page_namespace': page['ns'],
+            'first_revision_id': first['revid'], 'creation_timestamp': mediawiki(first['timestamp']),
+            'creator': first['user'], 'initial_length': first['size'], 'tags': ', '.join(tags)
+        })
+        path = f"{directory}/article_revisions_{title}.csv"
+        pd.DataFrame({
+            'rev_id': [rev['revid'] for rev in page['revisions']],
+            'rev_timestamp': [mediawiki(rev['timestamp']) for rev in page['revisions']],
+            'rev_user_text': [rev['user'] for rev in page['revisions']],
+            'rev_len': [rev['size'] for rev in page['revisions']],
+            'rev_comment': [rev['comment'] for rev in page['revisions']],
+            'rev_minor_edit': 0,
+            'tags': [', '.join(rev['tags']) for rev in page['revisions']],
+        }).to_csv(path, index=False)
+        revision_paths.append(path)
+
+    articles_path = f"{directory}/articles_list.csv"
+    # Newest first, as QUERY 1 orders them
+    pd.DataFrame(articles).sort_values('creation_timestamp', ascending=False).to_csv(articles_path, index=False)
+    return articles_path, revision_paths
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Synthetic Wikipedia Corpus Generator
+Builds deterministic wikitext revision histories for offline benchmarking
+"""
+
+import hashlib
+import random
+import zlib
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional
+from xml.sax.saxutils import escape
+
+WORDS = [
+    'the', 'river', 'village', 'was', 'founded', 'in', 'by', 'a', 'local', 'council',
+    'population', 'census', 'district', 'school', 'church', 'railway', 'station', 'known',
+    'for', 'its', 'annual', 'festival', 'and', 'market', 'region', 'northern', 'southern',
+    'built', 'during', 'century', 'notable', 'album', 'released', 'band', 'film', 'directed',
+    'season', 'club', 'league', 'player', 'born', 'politician', 'elected', 'member', 'party'
+]
+
+SECTION_TITLES = [
+    'Early life', 'Career', 'History', 'Geography', 'Demographics', 'Economy',
+    'Personal life', 'Reception', 'Legacy', 'See also', 'References', 'External links'
+]
+
+CREATION_TAGS = [
+    ['mobile edit', 'mobile web edit', 'visualeditor'],
+    ['mobile edit', 'mobile web edit', 'visualeditor-wikitext'],
+    ['mobile edit', 'mobile web edit', 'visualeditor', 'visualeditor-wikitext'],
+    ['mobile edit', 'mobile web edit'],
+    ['visualeditor'],
+    ['visualeditor-wikitext'],
+]
+
+EDIT_TAGS = [
+    ['mobile edit', 'mobile web edit', 'visualeditor'],
+    ['mobile edit', 'mobile web edit'],
+    ['visualeditor'],
+    ['wikieditor'],
+    [],
+]
+
+
+def _sentence(rng: random.Random, wikilinks: float = 0.15) -> str:
+    words = []
+    for _ in range(rng.randint(8, 20)):
+        word = rng.choice(WORDS)
+        if rng.random() < wikilinks:
+            word = f"[[{word.capitalize()}]]"
+        words.append(word)
+    words[0] = words[0].capitalize()
+    return ' '.join(words) + '.'
+
+
+def _paragraph(rng: random.Random, state: Dict[str, Any]) -> str:
+    sentences = []
+    for _ in range(rng.randint(2, 5)):
+        sentence = _sentence(rng)
+        if state['references'] and rng.random() < 0.4:
+            state['ref_serial'] += 1
+            sentence += f"<ref>{{{{cite web|url=https://example.org/{state['ref_serial']}|title=Source}}}}</ref>"
+        sentences.append(sentence)
+    return ' '.join(sentences)
+
+
+def render_wikitext(title: str, state: Dict[str, Any]) -> str:
+    """Render the current article state as wikitext"""
+    parts = []
+    if state['infobox']:
+        parts.append('{{Infobox settlement\n| name = ' + title + '\n| country = Example\n}}')
+    parts.extend(state['lead'])
+    for section_title, paragraphs in state['sections']:
+        parts.append(f"== {section_title} ==")
+        parts.extend(paragraphs)
+    for image in state['images']:
+        parts.append(f"[[File:{image}.jpg|thumb|{title}]]")
+    if state['external_links']:
+        parts.append('== External links ==')
+        for link in state['external_links']:
+            parts.append(f"* [{link} Official website]")
+    if state['references']:
+        parts.append('{{Reflist}}')
+    for category in state['categories']:
+        parts.append(f"[[Category:{category}]]")
+    return '\n\n'.join(parts)
+
+
+def generate_history(rng: random.Random, title: str, revisions: int,
+                     revert_rate: float = 0.05) -> List[str]:
+    """
+    Generate the wikitext of every revision of one article, oldest first.
+    Articles start as a short lead and grow by sections, infobox, references,
+    images and categories; a small share of edits are reverts.
+    """
+    state = {
+        'lead': [], 'sections': [], 'infobox': False, 'references': False,
+        'images': [], 'categories': [], 'external_links': [], 'ref_serial': 0
+    }
+    state['lead'].append(_paragraph(rng, state))
+
+    history = [render_wikitext(title, state)]
+    while len(history) < revisions:
+        if len(history) > 1 and rng.random() < revert_rate:
+            history.append(history[-2])
+            continue
+
+        action = rng.random()
+        if action < 0.30:
+            if state['sections'] and rng.random() < 0.6:
+                rng.choice(state['sections'])[1].append(_paragraph(rng, state))
+            else:
+                state['lead'].append(_paragraph(rng, state))
+        elif action < 0.50:
+            unused = [t for t in SECTION_TITLES if t not in {s[0] for s in state['sections']}]
+            if unused:
+                state['sections'].append((rng.choice(unused), [_paragraph(rng, state)]))
+        elif action < 0.60:
+            state['infobox'] = True
+        elif action < 0.72:
+            state['references'] = True
+            state['lead'].append(_paragraph(rng, state))
+        elif action < 0.80:
+            state['images'].append(f"{title.replace(' ', '_')}_{len(state['images']) + 1}")
+        elif action < 0.90:
+            state['categories'].append(f"{rng.choice(WORDS).capitalize()} articles")
+        else:
+            state['external_links'].append(f"https://example.org/{rng.randint(1, 10 ** 6)}")
+
+        history.append(render_wikitext(title, state))
+
+    return history
+
+
+def generate_corpus(pages: int = 100, max_revisions: int = 20, seed: int = 0,
+                    days: int = 30, end_date: Optional[datetime] = None,
+                    revert_rate: float = 0.05) -> List[Dict[str, Any]]:
+    """
+    Generate a list of synthetic pages with full revision histories.
+
+    Each page is a dict with 'pageid', 'ns', 'title' and 'revisions'; each
+    revision carries the fields MediaWiki returns for
+    rvprop=ids|timestamp|user|userid|size|sha1|tags|comment plus raw 'content'.
+    """
+    rng = random.Random(seed)
+    end_date = end_date or datetime.utcnow().replace(microsecond=0)
+    corpus = []
+    revid = 1000000
+
+    for page_index in range(pages):
+        pageid = 10000 + page_index
+        title = f"Synthetic article {page_index + 1}"
+        creator = f"Creator{rng.randint(1, max(1, pages // 3))}"
+        created = end_date - timedelta(seconds=rng.randint(0, days * 86400 - 1))
+        history = generate_history(rng, title, rng.randint(1, max_revisions), revert_rate)
+
+        revisions = []
+        timestamp = created
+        parentid = 0
+        for index, content in enumerate(history):
+            revid += 1
+            if index == 0:
+                user, tags, comment = creator, list(rng.choice(CREATION_TAGS)), 'Created page'
+            else:
+                timestamp += timedelta(seconds=rng.randint(60, 86400))
+                user = creator if rng.random() < 0.6 else f"Editor{rng.randint(1, 50)}"
+                tags, comment = list(rng.choice(EDIT_TAGS)), 'Expanded article'
+            encoded = content.encode('utf-8')
+            revisions.append({
+                'revid': revid,
+                'parentid': parentid,
+                'timestamp': timestamp.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'user': user,
+                'userid': zlib.crc32(user.encode('utf-8')) % 10 ** 7,
+                'size': len(encoded),
+                'sha1': hashlib.sha1(encoded).hexdigest(),
+                'tags': tags,
+                'comment': comment,
+                'content': content
+            })
+            parentid = revid
+
+        corpus.append({'pageid': pageid, 'ns': 0, 'title': title, 'revisions': revisions})
+
+    return corpus
+
+
+def _base36(hex_digest: str) -> str:
+    value = int(hex_digest, 16)
+    digits = ''
+    while value:
+        value, remainder = divmod(value, 36)
+        digits = '0123456789abcdefghijklmnopqrstuvwxyz'[remainder] + digits
+    return digits.rjust(31, '0')
+
+
+def write_xml_dump(corpus: List[Dict[str, Any]], path: str, stub: bool = False):
+    """
+    Write a corpus as a MediaWiki export-0.11 history dump (stub-meta-history
+    with stub=True), compressed when the path ends in .bz2 or .gz
+    """
+    from dump_reader import open_dump
+
+    with open_dump(path, 'wt') as f:
+        f.write('<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.11/" version="0.11" xml:lang="en">\n')
+        f.write('  <siteinfo>\n    <sitename>Synthetic</sitename>\n    <dbname>synthwiki</dbname>\n  </siteinfo>\n')
+        for page in corpus:
+            f.write(f"  <page>\n    <title>{escape(page['title'])}</title>\n"
+                    f"    <ns>{page.get('ns', 0)}</ns>\n    <id>{page['pageid']}</id>\n")
+            for rev in page['revisions']:
+                f.write(f"    <revision>\n      <id>{rev['revid']}</id>\n")
+                if rev['parentid']:
+                    f.write(f"      <parentid>{rev['parentid']}</parentid>\n")
+                f.write(f"      <timestamp>{rev['timestamp']}</timestamp>\n"
+                        f"      <contributor>\n        <username>{escape(rev['user'])}</username>\n"
+                        f"        <id>{rev['userid']}</id>\n      </contributor>\n"
+                        f"      <comment>{escape(rev['comment'])}</comment>\n"
+                        f"      <model>wikitext</model>\n      <format>text/x-wiki</format>\n")
+                sha1 = _base36(rev['sha1'])
+                if stub:
+                    f.write(f'      <text bytes="{rev["size"]}" sha1="{sha1}" location="tt:{rev["revid"]}" id="{rev["revid"]}" />\n')
+                else:
+                    f.write(f'      <text bytes="{rev["size"]}" sha1="{sha1}" xml:space="preserve">'
+                            f'{escape(rev["content"])}</text>\n')
+                f.write(f"      <sha1>{sha1}</sha1>\n    </revision>\n")
+            f.write('  </page>\n')
+        f.write('</mediawiki>\n')
+
+
+def write_change_tag_sql(corpus: List[Dict[str, Any]], change_tag_path: str, change_tag_def_path: str):
+    """Write the corpus' revision tags as change_tag / change_tag_def mysqldump files"""
+    from dump_reader import open_dump
+
+    tag_ids = {}
+    rows = []
+    for page in corpus:
+        for rev in page['revisions']:
+            for tag in rev['tags']:
+                tag_id = tag_ids.setdefault(tag, len(tag_ids) + 1)
+                rows.append(f"({len(rows) + 1},NULL,NULL,{rev['revid']},NULL,{tag_id})")
+
+    with open_dump(change_tag_def_path, 'wt') as f:
+        f.write("CREATE TABLE `change_tag_def` (\n  `ctd_id` int(10) unsigned NOT NULL AUTO_INCREMENT,\n"
+                "  `ctd_name` varbinary(255) NOT NULL,\n  `ctd_user_defined` tinyint(1) NOT NULL,\n"
+                "  `ctd_count` bigint(20) unsigned NOT NULL DEFAULT 0,\n  PRIMARY KEY (`ctd_id`)\n"
+                ") ENGINE=InnoDB DEFAULT CHARSET=binary;\n")
+        values = ','.join(f"({tag_id},'{tag}',0,0)" for tag, tag_id in tag_ids.items())
+        f.write(f"INSERT INTO `change_tag_def` VALUES {values};\n")
+
+    with open_dump(change_tag_path, 'wt') as f:
+        f.write("CREATE TABLE `change_tag` (\n  `ct_id` int(10) unsigned NOT NULL AUTO_INCREMENT,\n"
+                "  `ct_rc_id` int(10) unsigned DEFAULT NULL,\n  `ct_log_id` int(10) unsigned DEFAULT NULL,\n"
+                "  `ct_rev_id` int(10) unsigned DEFAULT NULL,\n  `ct_params` blob DEFAULT NULL,\n"
+                "  `ct_tag_id` int(10) unsigned NOT NULL,\n  PRIMARY KEY (`ct_id`)\n"
+                ") ENGINE=InnoDB DEFAULT CHARSET=binary;\n")
+        # mysqldump splits long tables into several extended INSERTs
+        for offset in range(0, len(rows), 1000):
+            f.write(f"INSERT INTO `change_tag` VALUES {','.join(rows[offset:offset + 1000])};\n")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Write a synthetic corpus as XML and change tag dump fixtures')
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--max-revisions', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--prefix', default='synthwiki', help='Output file prefix')
+    parser.add_argument('--stub', action='store_true', help='Write stub-meta-history (no revision text)')
+    args = parser.parse_args()
+
+    corpus = generate_corpus(pages=args.pages, max_revisions=args.max_revisions, seed=args.seed)
+    kind = 'stub-meta-history' if args.stub else 'pages-meta-history'
+    write_xml_dump(corpus, f"{args.prefix}-{kind}.xml.bz2", stub=args.stub)
+    write_change_tag_sql(corpus, f"{args.prefix}-change_tag.sql.gz", f"{args.prefix}-change_tag_def.sql.gz")
+    print(f"Wrote {len(corpus)} pages to {args.prefix}-{kind}.xml.bz2 and change tag dumps")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,20 +5,129 @@ Analyzes articles created in the last 30 days using mobile web visual editor
 """
 
 import requests
+import asyncio
+import contextlib
 import json
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+import os
+import re
 import time
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import partial
+from itertools import chain
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, AsyncIterator, Iterable, Iterator, Optional, Tuple
+from collections import defaultdict, deque
+from urllib.parse import urlparse
+
+from analysis_memo import AnalysisMemo
+from analysis_records import AnalysisIndex, AnalysisWriter, iter_analyses
+from crawl_state import CrawlState
+from dump_reader import iter_dump_pages, load_change_tags
+from rate_limiter import RateController, RateLimitedAdapter
+from response_cache import ResponseCache, CachedSession
+from run_metrics import RunMetrics, profiled, sampled, timed
+
+REVISION_PROPS = 'ids|timestamp|user|userid|size|sha1|tags|comment'
+
+# Fields of a recentchanges creation entry that are used downstream:
+# title and pageid to fetch the history, timestamp/user/tags for the record
+RC_PROPS = 'title|timestamp|ids|tags|user'
+
+# Ways to find mobile VE creations server-side: every such creation carries
+# at least one tag of each entry (MobileFrontend adds 'mobile edit' to all
+# mobile edits; VE-tagged edits are saved in the visual or the 2017 wikitext
+# editor), so querying one entry's tags and checking the rest client-side
+# finds them all. The last entry is the original union of all four tags.
+MOBILE_VE_TAG_PLANS = [
+    ['mobile edit'],
+    ['visualeditor', 'visualeditor-wikitext'],
+    ['mobile web edit', 'mobile edit', 'visualeditor', 'visualeditor-wikitext'],
+]
+
+# The API accepts at most 50 titles/pageids per request for normal accounts
+MAX_PAGES_PER_REQUEST = 50
+
+# One compact JSON record per analyzed article, written as each one finishes
+ANALYSES_PATH = 'mobile_ve_detailed_analysis.jsonl'
+
+API_URL = 'https://en.wikipedia.org/w/api.php'
+
+# Run metrics are written to <base>.json and <base>.prom (Prometheus textfile)
+METRICS_PATH = 'mobile_ve_run_metrics'
+
+# Multi-wiki crawls run each wiki in its own directory under this one
+WIKIS_DIR = 'wikis'
+
+# Request pacing and revision requests in flight. The defaults are polite
+# toward production endpoints; --fast opts into the faster settings, meant
+# for local mirrors, fake APIs and bot accounts allowed higher rates
+POLITE_SETTINGS = {'rate': 1.0, 'max_rate': 2.0, 'concurrency': 1}
+FAST_SETTINGS = {'rate': 10.0, 'max_rate': 50.0, 'concurrency': 8}
+
+# Milestones reported in an editing pattern's progression, and the revision
+# analysis flag each one tracks
+MILESTONES = {
+    'when_infobox_added': 'has_infobox',
+    'when_references_added': 'has_references',
+    'when_categories_added': 'has_categories',
+    'when_images_added': 'has_images'
+}
+
+# Heading ('==') or bullet ('*') lines; the leading class matches what
+# str.strip() removes, i.e. any whitespace other than the line break
+_FIRST_LINE_RE = re.compile(r'[^\S\n]*(?:(?P<heading>==)|\*)')
+_LINE_START_RE = re.compile(r'\n[^\S\n]*(?:(?P<heading>==)|\*)')
 
 class WikipediaAnalyzer:
-    def __init__(self):
-        self.api_url = "https://en.wikipedia.org/w/api.php"
-        self.session = requests.Session()
+    def __init__(self, api_url: str = API_URL, max_connections: int = 1,
+                 cache_path: str = None, offline: bool = False, memo_path: str = None,
+                 rate_controller: RateController = None, metrics: RunMetrics = None):
+        self.api_url = api_url
+        self.max_connections = max_connections
+
+        # Request counts, latencies and stage timings of this run
+        self.metrics = metrics or RunMetrics()
+
+        # Shared by every request of this analyzer; adapts to how the API responds
+        self.rate_controller = rate_controller or RateController()
+
+        # Revision analyses memoized by content sha1, shared across articles and runs
+        self.memo = AnalysisMemo(memo_path) if memo_path else None
+
+        # Responses are cached on disk when a cache path is given; offline
+        # mode replays only from that cache and never touches the network
+        self.cache = None
+        if cache_path or offline:
+            self.cache = ResponseCache(cache_path or 'api_cache.sqlite')
+            self.session = CachedSession(self.cache, offline=offline)
+        else:
+            self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'WikipediaMobileAnalysis/1.0 (Research Project)'
         })
 
+        # One keep-alive pool shared by every worker of the concurrent fetcher,
+        # paced by the rate controller (below the cache, so hits are not paced)
+        adapter = RateLimitedAdapter(self.rate_controller, pool_connections=1, pool_maxsize=max_connections)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _api_get(self, params: Dict[str, Any]) -> requests.Response:
+        """GET api.php, recording the call under its module name ('revisions', 'recentchanges', ...)"""
+        call_type = ResponseCache.query_type(params)
+        start = time.perf_counter()
+        try:
+            response = self.session.get(self.api_url, params=params)
+        except Exception:
+            self.metrics.record_request(call_type, time.perf_counter() - start, error=True)
+            raise
+        cache_hit = getattr(response, 'from_cache', False)
+        self.metrics.record_request(call_type, time.perf_counter() - start,
+                                    size=0 if cache_hit else len(response.content), cache_hit=cache_hit,
+                                    retries=getattr(response, 'retries', 0))
+        return response
+
+    @timed()
     def get_available_tags(self) -> List[Dict[str, Any]]:
         """Fetch all available edit tags from Wikipedia"""
         params = {
@@ -29,7 +138,11 @@ class WikipediaAnalyzer:
             'tgprop': 'name|displayname|description|hitcount'
         }
 
-        response = self.session.get(self.api_url, params=params)
+        try:
+            response = self._api_get(params)
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching tags: {e}")
+            return [], []
         print(f"Response status: {response.status_code}")
         print(f"Response headers: {response.headers.get('content-type')}")
 
@@ -44,6 +157,10 @@ class WikipediaAnalyzer:
             print(f"Response text: {response.text[:500]}")
             return [], []
 
+        if 'error' in data:
+            print(f"API error: {data['error'].get('info', data['error'])}")
+            return [], []
+
         tags = data.get('query', {}).get('tags', [])
         print(f"\n=== Available Tags (Total: {len(tags)}) ===")
 
@@ -57,24 +174,73 @@ class WikipediaAnalyzer:
 
         return tags, mobile_ve_tags
 
-    def get_new_pages_with_tags(self, tags: List[str], days: int = 30) -> List[Dict[str, Any]]:
+    def plan_tag_query(self, plans: List[List[str]], available_tags: List[Dict[str, Any]]) -> List[str]:
+        """
+        Pick the tags to query server-side for an intersection of tags: of
+        the candidate plans (see MOBILE_VE_TAG_PLANS), the one whose tags have
+        the fewest uses in total according to list=tags hitcounts. Without
+        hitcounts the union of every plan is queried, as before.
         """
-        Fetch new pages created with specific tags in the last N days
+        hitcounts = {tag.get('name'): tag.get('hitcount', 0) for tag in available_tags or []}
+        if not hitcounts:
+            return list(dict.fromkeys(tag for plan in plans for tag in plan))
+
+        # A tag missing from list=tags has never been applied
+        costs = [sum(hitcounts.get(tag, 0) for tag in plan) for plan in plans]
+        print(f"\n=== Tag Query Plan ===")
+        for plan, cost in zip(plans, costs):
+            print(f"  {' + '.join(plan)}: {cost} tagged edits")
+        best = min(range(len(plans)), key=lambda index: (costs[index], len(plans[index])))
+        print(f"Querying server-side: {', '.join(plans[best])}")
+        return list(plans[best])
+
+    @timed()
+    def get_new_pages_with_tags(self, tags: List[str], days: int = 30,
+                                state: CrawlState = None) -> List[Dict[str, Any]]:
+        """
+        Fetch new pages created with specific tags in the last N days.
+
+        With a CrawlState the crawl is checkpointed after every batch: an
+        interrupted run resumes from the saved continue token, and once a run
+        completes, later runs only fetch creations newer than it.
         """
         end_date = datetime.utcnow()
+        if self.cache:
+            # Align the window to the hour so reruns produce the same cache keys
+            end_date = end_date.replace(minute=0, second=0, microsecond=0)
         start_date = end_date - timedelta(days=days)
 
         # Format: 2025-10-06T00:00:00Z
         start_timestamp = start_date.strftime('%Y-%m-%dT%H:%M:%SZ')
+        end_timestamp = end_date.strftime('%Y-%m-%dT%H:%M:%SZ')
 
         print(f"\n=== Searching for new articles created since {start_timestamp} ===")
         print(f"Looking for tags: {', '.join(tags)}")
 
-        all_pages = []
+        # Pages already collected by an interrupted run are picked up again
+        all_pages = state.collected_pages() if state else []
+        crawl_complete = True
 
         for tag in tags:
-            print(f"\nQuerying tag: {tag}")
+            rcstart, rcend = end_timestamp, start_timestamp
             continue_param = None
+
+            if state:
+                run = state.pending_run(tag)
+                if run and run['complete']:
+                    print(f"\nTag {tag} already finished in the interrupted run, using checkpoint")
+                    continue
+                if run:
+                    rcstart, rcend, continue_param = run['rcstart'], run['rcend'], run['continue']
+                    print(f"\nResuming tag {tag} from checkpoint ({rcend} to {rcstart})")
+                else:
+                    newest = state.newest_rcstart(tag)
+                    if newest and newest > rcend:
+                        # Only fetch creations newer than the last completed crawl
+                        rcend = newest
+                    state.start_run(tag, rcstart, rcend)
+
+            print(f"\nQuerying tag: {tag}")
             page_count = 0
 
             while True:
@@ -85,23 +251,31 @@ class WikipediaAnalyzer:
                     'rctype': 'new',  # Only new page creations
                     'rctag': tag,
                     'rcnamespace': 0,  # Main namespace (articles)
-                    'rcstart': end_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                    'rcend': start_timestamp,
+                    'rcstart': rcstart,
+                    'rcend': rcend,
                     'rclimit': 500,
-                    'rcprop': 'title|timestamp|ids|tags|user|userid|sizes|comment'
+                    'rcprop': RC_PROPS
                 }
 
                 if continue_param:
                     params.update(continue_param)
 
                 try:
-                    response = self.session.get(self.api_url, params=params)
+                    response = self._api_get(params)
                     data = response.json()
 
+                    # An error body has no pages and no continue; recording it
+                    # as a batch would mark the run complete and skip the window
+                    if 'error' in data:
+                        raise RuntimeError(data['error'].get('info', data['error']))
+
                     pages = data.get('query', {}).get('recentchanges', [])
                     page_count += len(pages)
                     all_pages.extend(pages)
 
+                    if state:
+                        state.record_batch(tag, pages, data.get('continue'))
+
                     print(f"  Found {len(pages)} pages in this batch (total for this tag: {page_count})")
 
                     # Check if there are more results
@@ -109,12 +283,18 @@ class WikipediaAnalyzer:
                         break
 
                     continue_param = data['continue']
-                    time.sleep(0.5)  # Rate limiting
 
                 except Exception as e:
                     print(f"  Error querying tag {tag}: {e}")
+                    crawl_complete = False
                     break
 
+        if state:
+            if crawl_complete:
+                state.finish_runs()
+            else:
+                print(f"\n  Crawl incomplete; rerun to resume from {state.path}")
+
         # Remove duplicates based on page ID
         unique_pages = {}
         for page in all_pages:
@@ -127,130 +307,358 @@ class WikipediaAnalyzer:
 
         return result
 
-    def get_page_revisions(self, page_title: str) -> List[Dict[str, Any]]:
+    @timed()
+    def get_page_revisions(self, page_title: str, content: bool = True,
+                           after_revid: int = None) -> List[Dict[str, Any]]:
         """
-        Get complete revision history for a page
+        Get complete revision history for a page, following rvcontinue until
+        the whole history has been read. With after_revid only revisions
+        newer than that revision are returned.
+
+        With an analysis memo, the history is fetched as metadata first and
+        content is downloaded only for revisions whose sha1 is not memoized.
         """
+        try:
+            if content and self.memo:
+                revisions = self._get_revision_history({'titles': page_title}, content=False, after_revid=after_revid)
+                self.fetch_unmemoized_content(revisions)
+                return revisions
+            return self._get_revision_history({'titles': page_title}, content=content, after_revid=after_revid)
+        except Exception as e:
+            print(f"Error fetching revisions for {page_title}: {e}")
+            return []
+
+    def fetch_unmemoized_content(self, revisions: List[Dict[str, Any]]):
+        """Attach content, in place, to the revisions whose sha1 the memo has not seen"""
+        missing = [rev for rev in revisions
+                   if 'slots' not in rev and not (rev.get('sha1') and rev['sha1'] in self.memo)]
+        contents = self.get_revision_contents([rev['revid'] for rev in missing])
+        for rev in missing:
+            rev['slots'] = {'main': {'*': contents.get(rev['revid'], '')}}
+
+    def iter_with_contents(self, histories: Dict[str, List[Dict[str, Any]]]
+                           ) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Drain {title: metadata-only revisions} in order, downloading content
+        for MAX_PAGES_PER_REQUEST revisions per request just before they are
+        yielded, so only one batch of content is held at a time. Revisions
+        whose sha1 the memo has seen are not downloaded. A history with any
+        content that could not be fetched comes back empty, like a failed fetch.
+        """
+        batch = []
+        for title, revisions in _drain(histories):
+            batch.append((title, revisions))
+            if sum(len(history) for _, history in batch) >= MAX_PAGES_PER_REQUEST:
+                yield from self._with_contents(batch)
+                batch = []
+        yield from self._with_contents(batch)
+
+    def _with_contents(self, batch: List[Tuple[str, List[Dict[str, Any]]]]
+                       ) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        wanted = [rev for _, history in batch for rev in history
+                  if 'slots' not in rev and not (self.memo and rev.get('sha1') and rev['sha1'] in self.memo)]
+        contents = self.get_revision_contents([rev['revid'] for rev in wanted])
+        failed = set()
+        for rev in wanted:
+            if rev['revid'] in contents:
+                rev['slots'] = {'main': {'*': contents[rev['revid']]}}
+            else:
+                failed.add(rev['revid'])
+
+        for title, history in batch:
+            yield title, [] if any(rev['revid'] in failed for rev in history) else history
+
+    def _get_revision_history(self, page: Dict[str, Any], content: bool = True,
+                              after_revid: int = None) -> List[Dict[str, Any]]:
+        """Fetch every revision of a single page (given as titles= or pageids=), oldest first"""
         params = {
             'action': 'query',
             'format': 'json',
             'prop': 'revisions',
-            'titles': page_title,
-            'rvprop': 'ids|timestamp|user|userid|size|tags|comment|content',
-            'rvlimit': 500,
-            'rvslots': 'main',
+            'rvprop': REVISION_PROPS + ('|content' if content else ''),
+            'rvlimit': 'max',
             'rvdir': 'newer'  # Oldest first
         }
-
-        try:
-            response = self.session.get(self.api_url, params=params)
+        params.update(page)
+        if content:
+            params['rvslots'] = 'main'
+        if after_revid:
+            # rvstartid is inclusive, so the already-seen revision is dropped below
+            params['rvstartid'] = after_revid
+
+        revisions = []
+        while True:
+            response = self._api_get(params)
             data = response.json()
 
+            if 'error' in data:
+                raise RuntimeError(data['error'].get('info', data['error']))
+
             pages = data.get('query', {}).get('pages', {})
             for page_id, page_data in pages.items():
-                if 'revisions' in page_data:
-                    return page_data['revisions']
+                revisions.extend(page_data.get('revisions', []))
 
-            return []
-        except Exception as e:
-            print(f"Error fetching revisions for {page_title}: {e}")
-            return []
+            if 'continue' not in data:
+                if after_revid:
+                    revisions = [rev for rev in revisions if rev.get('revid', 0) > after_revid]
+                return revisions
 
-    def analyze_revision_content(self, content: str) -> Dict[str, Any]:
+            params.update(data['continue'])
+
+    @timed()
+    def get_revisions_batch(self, pageids: List[int], content: bool = False,
+                            full_history: bool = True) -> Dict[int, List[Dict[str, Any]]]:
         """
-        Analyze the content structure of a revision
+        Get revisions for many pages at once, returned as {pageid: revisions}.
+
+        A first pass packs up to MAX_PAGES_PER_REQUEST pageids into each call
+        and returns the latest revision of every page (the API only allows
+        rvlimit for a single page). With content the API may cut a batch short
+        at its result size limit; its rvcontinue is followed until every page
+        of the batch has its revision. Pages whose latest revision is the
+        creation (parentid 0) are then complete; with full_history the
+        remaining pages get their whole history paged in with rvcontinue.
         """
-        lines = content.split('\n')
-
-        analysis = {
-            'total_chars': len(content),
-            'total_lines': len(lines),
-            'sections': [],
-            'has_infobox': False,
-            'has_references': False,
-            'has_categories': False,
-            'has_images': False,
-            'reference_count': 0,
-            'category_count': 0,
-            'image_count': 0,
-            'external_links': 0,
-            'template_count': 0,
-            'lead_length': 0,
-            'wikilinks_count': 0
-        }
+        results = {}
+        pageids = list(dict.fromkeys(pageids))
+
+        for offset in range(0, len(pageids), MAX_PAGES_PER_REQUEST):
+            chunk = pageids[offset:offset + MAX_PAGES_PER_REQUEST]
+            params = {
+                'action': 'query',
+                'format': 'json',
+                'prop': 'revisions',
+                'pageids': '|'.join(str(pageid) for pageid in chunk),
+                'rvprop': REVISION_PROPS + ('|content' if content else '')
+            }
+            if content:
+                params['rvslots'] = 'main'
 
-        current_section = None
-        lead_section = []
-        in_lead = True
+            try:
+                while True:
+                    response = self._api_get(params)
+                    data = response.json()
 
-        for line in lines:
-            # Check for sections (headers)
-            if line.strip().startswith('=='):
-                in_lead = False
-                # Count the number of '=' to determine level
-                level = len(line) - len(line.lstrip('='))
-                section_title = line.strip('= \t\n')
-                analysis['sections'].append({
-                    'title': section_title,
-                    'level': level // 2  # Each level uses 2 '='
-                })
-            elif in_lead:
-                lead_section.append(line)
+                    if 'error' in data:
+                        print(f"Error fetching revision batch at offset {offset}: {data['error'].get('info')}")
+                        break
 
-            # Check for various Wikipedia elements
-            if '{{Infobox' in line or '{{infobox' in line:
-                analysis['has_infobox'] = True
+                    # A continued response lists every page again, with revisions
+                    # only for the pages it covers
+                    for page_data in data.get('query', {}).get('pages', {}).values():
+                        if 'pageid' in page_data:
+                            results.setdefault(page_data['pageid'], []).extend(page_data.get('revisions', []))
 
-            if '[[File:' in line or '[[Image:' in line:
-                analysis['has_images'] = True
-                analysis['image_count'] += line.count('[[File:') + line.count('[[Image:')
+                    if 'continue' not in data:
+                        break
+                    params.update(data['continue'])
+            except Exception as e:
+                print(f"Error fetching revision batch at offset {offset}: {e}")
+
+        if full_history:
+            for pageid, revisions in results.items():
+                # No revisions means the batch did not cover the page: fetch it on its own
+                if not revisions or revisions[-1].get('parentid', 0) != 0:
+                    try:
+                        results[pageid] = self._get_revision_history({'pageids': pageid}, content=content)
+                    except Exception as e:
+                        print(f"Error fetching revisions for page {pageid}: {e}")
+
+        return results
+
+    @timed()
+    def get_revision_contents(self, revids: List[int]) -> Dict[int, str]:
+        """Fetch the wikitext of specific revisions, up to 50 revids per request"""
+        contents = {}
+        revids = list(dict.fromkeys(revids))
+
+        for offset in range(0, len(revids), MAX_PAGES_PER_REQUEST):
+            params = {
+                'action': 'query',
+                'format': 'json',
+                'prop': 'revisions',
+                'revids': '|'.join(str(revid) for revid in revids[offset:offset + MAX_PAGES_PER_REQUEST]),
+                'rvprop': 'ids|content',
+                'rvslots': 'main'
+            }
 
-            if '[[Category:' in line:
-                analysis['has_categories'] = True
-                analysis['category_count'] += line.count('[[Category:')
+            try:
+                response = self._api_get(params)
+                data = response.json()
+
+                if 'error' in data:
+                    raise RuntimeError(data['error'].get('info', data['error']))
+
+                for page_data in data.get('query', {}).get('pages', {}).values():
+                    for rev in page_data.get('revisions', []):
+                        contents[rev['revid']] = rev.get('slots', {}).get('main', {}).get('*', '')
+            except Exception as e:
+                print(f"Error fetching revision contents at offset {offset}: {e}")
+
+        return contents
+
+    @timed()
+    def get_revision_tags(self, revids: List[int]) -> Dict[int, List[str]]:
+        """Fetch the change tags of specific revisions, up to 50 revids per request"""
+        tags = {}
+        revids = list(dict.fromkeys(revids))
+
+        for offset in range(0, len(revids), MAX_PAGES_PER_REQUEST):
+            params = {
+                'action': 'query',
+                'format': 'json',
+                'prop': 'revisions',
+                'revids': '|'.join(str(revid) for revid in revids[offset:offset + MAX_PAGES_PER_REQUEST]),
+                'rvprop': 'ids|tags'
+            }
 
-            if '<ref' in line:
-                analysis['has_references'] = True
-                analysis['reference_count'] += line.count('<ref')
+            try:
+                response = self._api_get(params)
+                data = response.json()
 
-            if '{{' in line:
-                analysis['template_count'] += line.count('{{')
+                if 'error' in data:
+                    raise RuntimeError(data['error'].get('info', data['error']))
 
-            if '[[' in line:
-                analysis['wikilinks_count'] += line.count('[[')
+                for page_data in data.get('query', {}).get('pages', {}).values():
+                    for rev in page_data.get('revisions', []):
+                        tags[rev['revid']] = rev.get('tags', [])
+            except Exception as e:
+                print(f"Error fetching revision tags at offset {offset}: {e}")
 
-            if line.strip().startswith('*') and ('http://' in line or 'https://' in line):
-                analysis['external_links'] += 1
+        return tags
 
-        # Calculate lead section length
-        analysis['lead_length'] = len('\n'.join(lead_section))
+    async def fetch_page_revisions(self, titles: List[str], concurrency: int = None,
+                                   after_revids: Dict[str, int] = None,
+                                   content: bool = True) -> AsyncIterator[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Fetch revision histories for many pages, keeping up to `concurrency`
+        requests in flight. Yields (title, revisions) as each page finishes,
+        so results arrive in completion order rather than input order.
+        after_revids maps titles to the newest revision already analyzed.
+        """
+        after_revids = after_revids or {}
+        concurrency = max(1, min(concurrency or self.max_connections, len(titles) or 1))
+        loop = asyncio.get_running_loop()
+        pending = asyncio.Queue()
+        finished = asyncio.Queue()
+        for title in titles:
+            pending.put_nowait(title)
 
-        return analysis
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='revisions')
 
-    def analyze_editing_pattern(self, revisions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        async def worker():
+            while True:
+                try:
+                    title = pending.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                fetch = partial(self.get_page_revisions, title, content=content, after_revid=after_revids.get(title))
+                revisions = await loop.run_in_executor(executor, fetch)
+                await finished.put((title, revisions))
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            for _ in range(len(titles)):
+                yield await finished.get()
+        finally:
+            for task in workers:
+                task.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def iter_page_revisions(self, titles: List[str], concurrency: int = None,
+                            after_revids: Dict[str, int] = None,
+                            content: bool = True) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
         """
-        Analyze the editing pattern from revision history
+        Synchronous wrapper around fetch_page_revisions for callers that are
+        not running an event loop
         """
-        if not revisions:
-            return {}
+        loop = asyncio.new_event_loop()
+        results = self.fetch_page_revisions(titles, concurrency, after_revids, content)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(results.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(results.aclose())
+            loop.close()
+
+    @timed()
+    def analyze_revision_content(self, content: str) -> Dict[str, Any]:
+        """
+        Analyze the content structure of a revision.
+
+        Element counts are taken over the whole buffer, and headings and
+        bullet lines come from one compiled scan over line starts, so no
+        per-line strings are built. Only heading lines are sliced out.
+        """
+        return _analysis_from_scan(content, _scan_wikitext(content, 0, len(content)))
+
+    @timed()
+    def analyze_editing_pattern(self, revisions: List[Dict[str, Any]],
+                                previous: Dict[str, Any] = None,
+                                incremental: bool = True) -> Dict[str, Any]:
+        """
+        Analyze the editing pattern from revision history.
+        When `previous` is the pattern already computed for the older part of
+        the history, only the new revisions are analyzed and appended to it.
 
-        pattern = {
-            'total_revisions': len(revisions),
-            'revision_analyses': [],
-            'first_revision': None,
-            'progression': {
-                'sections_added_order': [],
-                'when_infobox_added': None,
-                'when_references_added': None,
-                'when_categories_added': None,
-                'when_images_added': None
+        In incremental mode each revision is analyzed from the lines that
+        changed since the one before it, instead of re-parsing the whole
+        text; the result is identical to a full re-parse.
+        """
+        if not revisions:
+            return previous or {}
+
+        if previous:
+            pattern = previous
+            pattern['total_revisions'] += len(revisions)
+        else:
+            pattern = {
+                'total_revisions': len(revisions),
+                'revision_analyses': [],
+                'first_revision': None,
+                'progression': {
+                    'sections_added_order': [],
+                    'when_infobox_added': None,
+                    'when_references_added': None,
+                    'when_categories_added': None,
+                    'when_images_added': None
+                }
             }
-        }
 
-        for idx, rev in enumerate(revisions):
-            content = rev.get('slots', {}).get('main', {}).get('*', '')
+        previous_content = None
+        previous_scan = None
+
+        for idx, rev in enumerate(revisions, len(pattern['revision_analyses'])):
+            sha1 = rev.get('sha1') if self.memo else None
+            analysis = self.memo.get(sha1) if sha1 else None
+
+            if analysis is not None:
+                # Seen this exact content before; the next revision starts a fresh scan
+                previous_scan = None
+            else:
+                if 'slots' not in rev and self.memo:
+                    # Content was skipped as memoized but has since been evicted
+                    self.fetch_unmemoized_content([rev])
+                content = rev.get('slots', {}).get('main', {}).get('*', '')
+
+                if not incremental:
+                    analysis = self.analyze_revision_content(content)
+                else:
+                    # The incremental counterpart of analyze_revision_content, timed as it
+                    with self.metrics.stage('analyze_revision_content'):
+                        if previous_scan is None:
+                            scan = _scan_wikitext(content, 0, len(content))
+                        else:
+                            scan = _rescan_changed_lines(previous_content, previous_scan, content)
+                        analysis = _analysis_from_scan(content, scan)
+                    previous_content, previous_scan = content, scan
+
+                if sha1:
+                    self.memo.put(sha1, analysis)
 
-            analysis = self.analyze_revision_content(content)
             analysis['revision_number'] = idx + 1
             analysis['timestamp'] = rev.get('timestamp')
             analysis['user'] = rev.get('user')
@@ -272,11 +680,11 @@ class WikipediaAnalyzer:
             if analysis['has_images'] and pattern['progression']['when_images_added'] is None:
                 pattern['progression']['when_images_added'] = idx + 1
 
-            # Track section addition order
+            # Track section addition order (in page order, so output is stable across processes)
             if idx > 0:
                 prev_sections = {s['title'] for s in pattern['revision_analyses'][idx-1]['sections']}
-                curr_sections = {s['title'] for s in analysis['sections']}
-                new_sections = curr_sections - prev_sections
+                curr_sections = dict.fromkeys(s['title'] for s in analysis['sections'])
+                new_sections = [title for title in curr_sections if title not in prev_sections]
 
                 for section in new_sections:
                     pattern['progression']['sections_added_order'].append({
@@ -289,8 +697,381 @@ class WikipediaAnalyzer:
 
         return pattern
 
-def main():
-    analyzer = WikipediaAnalyzer()
+    def analyze_articles(self, articles: Iterable[Tuple[Any, List[Dict[str, Any]], Optional[Dict[str, Any]]]],
+                         workers: int = 0) -> Iterator[Tuple[Any, Dict[str, Any]]]:
+        """
+        Run analyze_editing_pattern over a stream of (key, revisions, previous)
+        jobs and yield (key, editing_pattern) in input order.
+
+        With workers > 0 the analysis runs in a process pool. Each article is
+        sent as one pre-encoded JSON buffer and the pattern comes back the
+        same way, next to the worker's stage timings, so little but bytes is
+        pickled. At most a few articles per worker are in flight, which keeps
+        memory bounded while the input is still being fetched.
+        """
+        if workers <= 0:
+            for key, revisions, previous in articles:
+                yield key, self.analyze_editing_pattern(revisions, previous)
+            return
+
+        memo_path = self.memo.path if self.memo else None
+        window = workers * 2
+        pending = deque()
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_analysis_worker,
+                                 initargs=(self.api_url, memo_path)) as pool:
+            for key, revisions, previous in articles:
+                payload = json.dumps({'revisions': revisions, 'previous': previous},
+                                     ensure_ascii=False).encode('utf-8')
+                pending.append((key, pool.submit(_analyze_encoded_article, payload)))
+
+                while len(pending) >= window:
+                    key, future = pending.popleft()
+                    yield key, self._decode_worker_result(future.result())
+
+            while pending:
+                key, future = pending.popleft()
+                yield key, self._decode_worker_result(future.result())
+
+    def _decode_worker_result(self, result: Tuple[bytes, Dict[str, Any]]) -> Dict[str, Any]:
+        encoded, stages = result
+        # CPU time spent in worker processes counts toward this run's stages
+        self.metrics.merge_stages(stages)
+        return json.loads(encoded)
+
+    @timed()
+    def analyze_milestones(self, revisions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Find when the infobox, references, categories and images were added
+        while downloading content for only O(log n) revisions.
+
+        `revisions` is a metadata-only history (get_page_revisions with
+        content=False). Each milestone is treated as a monotonic "first
+        revision where X appears" question and bisected over the history;
+        every round probes all open milestones in one batched request, and a
+        boundary is accepted only once the revision just before it has been
+        checked as well. Where a revert (a repeated sha1) comes before a
+        boundary, the element may have been added and removed earlier, so
+        every revision up to the boundary is checked instead; removals by
+        hand that restore no earlier text cannot be seen from metadata.
+        Revisions whose sha1 was already analyzed are not
+        downloaded. sections_added_order needs every revision and is not
+        computed in this mode. Raises RuntimeError if a probed revision's
+        content cannot be fetched, rather than bisecting over a missing text.
+        """
+        if not revisions:
+            return {}
+
+        count = len(revisions)
+        analyses = {}
+        by_sha1 = {}
+        fetched = 0
+
+        def probe(indexes):
+            nonlocal fetched
+            wanted = {}
+            for index in indexes:
+                sha1 = revisions[index].get('sha1')
+                if index in analyses:
+                    continue
+                if sha1 and sha1 in by_sha1:
+                    analyses[index] = by_sha1[sha1]
+                    continue
+                memoized = self.memo.get(sha1) if self.memo and sha1 else None
+                if memoized is not None:
+                    analyses[index] = by_sha1[sha1] = memoized
+                    continue
+                wanted[revisions[index]['revid']] = index
+
+            contents = self.get_revision_contents(list(wanted))
+            unfetched = [revid for revid in wanted if revid not in contents]
+            if unfetched:
+                raise RuntimeError(f"content of revisions {unfetched} could not be fetched")
+            fetched += len(wanted)
+            for revid, index in wanted.items():
+                analyses[index] = self.analyze_revision_content(contents[revid])
+                sha1 = revisions[index].get('sha1')
+                if sha1:
+                    by_sha1[sha1] = analyses[index]
+                    if self.memo:
+                        self.memo.put(sha1, analyses[index])
+
+        probe([0, count - 1])
+
+        progression = {'sections_added_order': None}
+        bounds = {}
+        for key, flag in MILESTONES.items():
+            progression[key] = None
+            if analyses[0][flag]:
+                progression[key] = 1
+            elif analyses[count - 1][flag]:
+                # Revision `low` lacks the element and revision `high` has it
+                bounds[key] = (0, count - 1)
+
+        while bounds:
+            for key, (low, high) in list(bounds.items()):
+                if high - low == 1:
+                    progression[key] = high + 1
+                    del bounds[key]
+
+            middles = {key: (low + high) // 2 for key, (low, high) in bounds.items()}
+            probe(middles.values())
+
+            for key, middle in middles.items():
+                low, high = bounds[key]
+                if analyses[middle][MILESTONES[key]]:
+                    bounds[key] = (low, middle)
+                else:
+                    bounds[key] = (middle, high)
+
+        # Bisection assumes an element stays once added. A revert (a revision
+        # whose sha1 repeats an earlier one) can take it away again, so a
+        # boundary with a revert before it is confirmed by scanning every
+        # revision up to it; without a boundary, the whole history is scanned
+        seen = set()
+        first_revert = None
+        for index, rev in enumerate(revisions):
+            sha1 = rev.get('sha1')
+            if sha1 in seen:
+                first_revert = index
+                break
+            if sha1:
+                seen.add(sha1)
+
+        if first_revert is not None:
+            ends = {key: (progression[key] or count + 1) - 1 for key in MILESTONES}
+            unconfirmed = {key: end for key, end in ends.items() if first_revert < end}
+            if unconfirmed:
+                probe(range(max(unconfirmed.values())))
+                for key, end in unconfirmed.items():
+                    flag = MILESTONES[key]
+                    progression[key] = next(
+                        (index + 1 for index in range(end) if analyses[index][flag]), progression[key])
+
+        probed =[_with_revision_metadata(analyses[index], revisions[index], index + 1)
+                  for index in sorted(analyses)]
+
+        return {
+            'total_revisions': count,
+            'revision_analyses': probed,
+            'first_revision': probed[0],
+            'progression': progression,
+            'content_revisions_fetched': fetched
+        }
+
+# Per-process analyzer used by analyze_articles workers
+_worker_analyzer = None
+
+def _init_analysis_worker(api_url: str, memo_path: Optional[str]):
+    global _worker_analyzer
+    _worker_analyzer = WikipediaAnalyzer(api_url=api_url, max_connections=1, memo_path=memo_path)
+
+def _analyze_encoded_article(payload: bytes) -> Tuple[bytes, Dict[str, Any]]:
+    job = json.loads(payload)
+    pattern = _worker_analyzer.analyze_editing_pattern(job['revisions'], job['previous'])
+    return json.dumps(pattern, ensure_ascii=False).encode('utf-8'), _worker_analyzer.metrics.take_stages()
+
+def _is_mobile_ve(page: Dict[str, Any]) -> bool:
+    page_tags = page.get('tags', [])
+    has_mobile = any('mobile' in tag.lower() for tag in page_tags)
+    has_ve = any('visual' in tag.lower() for tag in page_tags)
+    return has_mobile and has_ve
+
+def _with_revision_metadata(analysis: Dict[str, Any], rev: Dict[str, Any], number: int) -> Dict[str, Any]:
+    analysis = dict(analysis)
+    analysis['revision_number'] = number
+    analysis['timestamp'] = rev.get('timestamp')
+    analysis['user'] = rev.get('user')
+    analysis['tags'] = rev.get('tags', [])
+    analysis['comment'] = rev.get('comment', '')
+    return analysis
+
+def _scan_wikitext(content: str, start: int, end: int) -> Dict[str, Any]:
+    """
+    Collect the raw structure counts for content[start:end], which must span
+    whole lines. Every metric is a sum over lines, so scans of disjoint
+    spans can be added and subtracted.
+    """
+    scan = {
+        'newlines': content.count('\n', start, end),
+        'images': content.count('[[File:', start, end) + content.count('[[Image:', start, end),
+        'categories': content.count('[[Category:', start, end),
+        'references': content.count('<ref', start, end),
+        'templates': content.count('{{', start, end),
+        'wikilinks': content.count('[[', start, end),
+        'infoboxes': content.count('{{Infobox', start, end) + content.count('{{infobox', start, end),
+        'external_links': 0,
+        'headings': []  # (line offset, section) pairs
+    }
+
+    first_line = _FIRST_LINE_RE.match(content, start, end)
+    line_matches = chain([first_line] if first_line else [], _LINE_START_RE.finditer(content, start, end))
+
+    for match in line_matches:
+        line_start = start if match is first_line else match.start() + 1
+        line_end = content.find('\n', match.end(), end)
+        if line_end == -1:
+            line_end = end
+
+        if match.group('heading'):
+            line = content[line_start:line_end]
+            # Count the number of '=' to determine level
+            level = len(line) - len(line.lstrip('='))
+            scan['headings'].append((line_start, {
+                'title': line.strip('= \t\n'),
+                'level': level // 2  # Each level uses 2 '='
+            }))
+        elif (content.find('http://', match.end(), line_end) != -1
+              or content.find('https://', match.end(), line_end) != -1):
+            scan['external_links'] += 1
+
+    return scan
+
+def _analysis_from_scan(content: str, scan: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the analyze_revision_content metrics dict from a whole-document scan"""
+    headings = scan['headings']
+
+    # The lead is everything before the first heading line, minus its newline
+    if headings:
+        lead_length = max(headings[0][0] - 1, 0)
+    else:
+        lead_length = len(content)
+
+    return {
+        'total_chars': len(content),
+        'total_lines': scan['newlines'] + 1,
+        'sections': [dict(section) for _, section in headings],
+        'has_infobox': scan['infoboxes'] > 0,
+        'has_references': scan['references'] > 0,
+        'has_categories': scan['categories'] > 0,
+        'has_images': scan['images'] > 0,
+        'reference_count': scan['references'],
+        'category_count': scan['categories'],
+        'image_count': scan['images'],
+        'external_links': scan['external_links'],
+        'template_count': scan['templates'],
+        'lead_length': lead_length,
+        'wikilinks_count': scan['wikilinks']
+    }
+
+def _common_prefix_length(a: str, b: str) -> int:
+    """Length of the common prefix, compared block-wise so the work stays in C"""
+    limit = min(len(a), len(b))
+    matched = 0
+    block = 4096
+    while matched < limit:
+        step = min(block, limit - matched)
+        if a[matched:matched + step] == b[matched:matched + step]:
+            matched += step
+            block *= 2
+            continue
+        # The first difference is inside this block: bisect it
+        low, high = matched, matched + step
+        while high - low > 1:
+            middle = (low + high) // 2
+            if a[low:middle] == b[low:middle]:
+                low = middle
+            else:
+                high = middle
+        return low
+    return matched
+
+def _common_suffix_length(a: str, b: str, limit: int) -> int:
+    """Length of the common suffix, at most `limit` characters"""
+    matched = 0
+    block = 4096
+    len_a, len_b = len(a), len(b)
+    while matched < limit:
+        step = min(block, limit - matched)
+        if a[len_a - matched - step:len_a - matched] == b[len_b - matched - step:len_b - matched]:
+            matched += step
+            block *= 2
+            continue
+        low, high = matched, matched + step
+        while high - low > 1:
+            middle = (low + high) // 2
+            if a[len_a - middle:len_a - low] == b[len_b - middle:len_b - low]:
+                low = middle
+            else:
+                high = middle
+        return low
+    return matched
+
+def _rescan_changed_lines(previous: str, previous_scan: Dict[str, Any], content: str) -> Dict[str, Any]:
+    """
+    Derive the scan of `content` from the scan of the previous revision by
+    rescanning only the lines that differ between the two texts.
+    """
+    prefix = _common_prefix_length(previous, content)
+    suffix = _common_suffix_length(previous, content, min(len(previous), len(content)) - prefix)
+
+    # Widen the changed span to whole lines; text after it is identical in both
+    start = previous.rfind('\n', 0, prefix) + 1
+    previous_end = previous.find('\n', len(previous) - suffix)
+    if previous_end == -1:
+        previous_end = len(previous)
+    shift = len(content) - len(previous)
+    content_end = previous_end + shift
+
+    removed = _scan_wikitext(previous, start, previous_end)
+    added = _scan_wikitext(content, start, content_end)
+
+    scan = {key: previous_scan[key] - removed[key] + added[key]
+            for key in previous_scan if key != 'headings'}
+    scan['headings'] = (
+        [heading for heading in previous_scan['headings'] if heading[0] < start]
+        + added['headings']
+        + [(offset + shift, section) for offset, section in previous_scan['headings'] if offset > previous_end]
+    )
+    return scan
+
+def _drain(pending: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+    """Yield and remove the items of a dict in order, so each is released once consumed"""
+    while pending:
+        key = next(iter(pending))
+        yield key, pending.pop(key)
+
+def _drain_deque(pending: deque) -> Iterator[Any]:
+    while pending:
+        yield pending.popleft()
+
+def _in_order(outcomes: Iterable[Tuple[Any, Optional[Dict[str, Any]]]], keys: List[Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Re-sequence (key, record) pairs arriving in any order into the order of
+    `keys`, holding back only the records that arrived early. A None record
+    marks a key with nothing to write.
+    """
+    position = {key: idx for idx, key in enumerate(keys)}
+    early = {}
+    next_idx = 0
+    for key, record in outcomes:
+        early[position[key]] = record
+        while next_idx in early:
+            record = early.pop(next_idx)
+            next_idx += 1
+            if record is not None:
+                yield record
+
+    # Keys that never produced an outcome leave gaps; flush what is left
+    for idx in sorted(early):
+        if early[idx] is not None:
+            yield early[idx]
+
+def _load_previous(path: str) -> List[Dict[str, Any]]:
+    """Load a JSON output of an earlier run, or an empty list if there is none"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+def main(limit: int = 50, concurrency: int = 1, cache_path: str = None, offline: bool = False,
+         state_path: str = None, lazy_content: bool = False, memo_path: str = None, workers: int = 0,
+         rate_controller: RateController = None, warehouse_path: str = None,
+         metrics_path: str = METRICS_PATH, api_url: str = API_URL):
+    analyzer = WikipediaAnalyzer(api_url=api_url, max_connections=concurrency, cache_path=cache_path,
+                                 offline=offline, memo_path=memo_path, rate_controller=rate_controller)
+    state = CrawlState(state_path) if state_path else None
 
     print("=" * 80)
     print("WIKIPEDIA MOBILE ARTICLE CREATION ANALYSIS")
@@ -301,33 +1082,33 @@ def main():
     all_tags, mobile_ve_tags = analyzer.get_available_tags()
 
     # Step 2: Identify the right tags to use
-    # Common tag names based on research:
-    tags_to_search = [
-        'mobile web edit',
-        'mobile edit',
-        'visualeditor',
-        'visualeditor-wikitext'
-    ]
+    # Only the most selective tag(s) are queried; every result still has to
+    # carry both a mobile and a visual editor tag, checked below
+    tags_to_search = analyzer.plan_tag_query(MOBILE_VE_TAG_PLANS, all_tags)
 
     print(f"\n=== Tag Search Configuration ===")
     print(f"Will search for combinations of: {tags_to_search}")
 
     # Step 3: Fetch new pages with these tags
-    new_pages = analyzer.get_new_pages_with_tags(tags_to_search, days=30)
+    new_pages = analyzer.get_new_pages_with_tags(tags_to_search, days=30, state=state)
 
     # Filter for pages that have BOTH mobile and visual editor tags
-    mobile_ve_pages = []
-    for page in new_pages:
-        page_tags = page.get('tags', [])
-        has_mobile = any('mobile' in tag.lower() for tag in page_tags)
-        has_ve = any('visual' in tag.lower() for tag in page_tags)
-
-        if has_mobile and has_ve:
-            mobile_ve_pages.append(page)
+    mobile_ve_pages = [page for page in new_pages if _is_mobile_ve(page)]
 
     print(f"\n=== Filtered Results ===")
     print(f"Articles with BOTH mobile AND visual editor tags: {len(mobile_ve_pages)}")
 
+    previous_analyses = {}
+    if state:
+        # Incremental run: carry over the articles and analyses of earlier runs
+        found = {page.get('pageid') for page in mobile_ve_pages}
+        previous_pages = [page for page in _load_previous('mobile_ve_articles.json')
+                          if page.get('pageid') not in found]
+        mobile_ve_pages.extend(previous_pages)
+        # Looked up by page_id from disk; only their offsets are held in memory
+        previous_analyses = AnalysisIndex(ANALYSES_PATH)
+        print(f"Articles carried over from earlier runs: {len(previous_pages)}")
+
     # Save initial results
     with open('mobile_ve_articles.json', 'w', encoding='utf-8') as f:
         json.dump(mobile_ve_pages, f, indent=2, ensure_ascii=False)
@@ -339,43 +1120,401 @@ def main():
     print("DETAILED ARTICLE ANALYSIS")
     print(f"{'=' * 80}")
 
-    detailed_analyses = []
-
-    for idx, page in enumerate(mobile_ve_pages[:50], 1):  # Limit to first 50 for now
-        title = page.get('title')
-        print(f"\n[{idx}/{min(len(mobile_ve_pages), 50)}] Analyzing: {title}")
-
-        revisions = analyzer.get_page_revisions(title)
-
-        if revisions:
-            pattern = analyzer.analyze_editing_pattern(revisions)
+    selected_pages = mobile_ve_pages[:limit] if limit else mobile_ve_pages
+    pages_by_title = {page.get('title'): page for page in selected_pages}
+    unchanged = []
+
+    # One batched metadata pass finds every single-revision article and tells
+    # which previously analyzed articles have new revisions. Single-revision
+    # articles get their content 50 revisions per request as they are
+    # analyzed; only the rest are fetched concurrently, and each article is
+    # analyzed as soon as it arrives
+    latest = analyzer.get_revisions_batch([page.get('pageid') for page in selected_pages],
+                                          content=False, full_history=False)
+    complete = {}
+    after_revids = {}
+    for title, page in pages_by_title.items():
+        page_id = page.get('pageid')
+        revisions = latest.pop(page_id, None)
+        last_revid = state.last_revid(page_id) if state and page_id in previous_analyses else None
+
+        if last_revid and revisions and revisions[-1].get('revid') == last_revid:
+            unchanged.append(title)
+        elif last_revid and not lazy_content:
+            after_revids[title] = last_revid
+        elif revisions and revisions[-1].get('parentid', 0) == 0:
+            complete[title] = revisions
+    del latest
+
+    skipped = complete.keys() | set(unchanged)
+    remaining = [title for title in pages_by_title if title not in skipped]
+    if unchanged:
+        print(f"\n{len(unchanged)} articles unchanged since the last run")
+
+    revision_stream = chain(_drain(complete) if lazy_content else analyzer.iter_with_contents(complete),
+                            analyzer.iter_page_revisions(remaining, concurrency=concurrency, after_revids=after_revids,
+                                                         content=not lazy_content))
+    if warehouse_path:
+        # Pandas-backed; only imported when a warehouse is wanted
+        from quarry_warehouse import QuarryWarehouse
+
+        warehouse = QuarryWarehouse(warehouse_path)
+
+        def stored(stream):
+            # Every fetched history also lands in the warehouse for offline querying
+            for title, revisions in stream:
+                warehouse.add_page(pages_by_title[title], revisions, commit=False)
+                yield title, revisions
+
+        revision_stream = stored(revision_stream)
+    total = len(complete) + len(remaining)
+    # Articles that need no analysis; they still take their place in the output
+    # order. Their earlier records are only read from disk when written out
+    passed_through = deque((title, partial(previous_analyses.get, pages_by_title[title].get('pageid')))
+                           for title in unchanged)
+
+    def analysis_jobs():
+        for idx, (title, revisions) in enumerate(revision_stream, 1):
+            page = pages_by_title[title]
+            print(f"\n[{idx}/{total}] Analyzing: {title}")
+
+            previous = previous_analyses.get(page.get('pageid')) if title in after_revids else None
+            if not revisions:
+                # No new revisions, or the fetch failed
+                passed_through.append((title, previous))
+                continue
+
+            if state:
+                state.set_last_revid(page.get('pageid'), revisions[-1].get('revid'))
+            yield title, revisions, previous['editing_pattern'] if previous else None
+
+    def milestone_patterns():
+        for title, revisions, _ in analysis_jobs():
+            try:
+                yield title, analyzer.analyze_milestones(revisions)
+            except RuntimeError as e:
+                # Left without a record, like a failed fetch, so the next run retries it
+                print(f"  Error analyzing milestones of {title}: {e}")
+                passed_through.append((title, None))
+
+    if lazy_content:
+        # Metadata-only history; content is downloaded just for the bisection probes
+        patterns = milestone_patterns()
+    else:
+        patterns = analyzer.analyze_articles(analysis_jobs(), workers=workers)
+
+    def article_records():
+        yield from _drain_deque(passed_through)
+        for title, pattern in patterns:
+            yield from _drain_deque(passed_through)
+            page = pages_by_title[title]
+            print(f"  - Total revisions: {pattern['total_revisions']}")
+            if pattern.get('first_revision'):
+                first = pattern['first_revision']
+                print(f"  - First revision: {first['total_chars']} chars, {len(first['sections'])} sections")
+                print(f"  - Started with: {'Lead section' if first['lead_length'] > 0 else 'No lead'}")
 
-            detailed_analyses.append({
+            yield title, {
                 'title': title,
                 'page_id': page.get('pageid'),
                 'created': page.get('timestamp'),
                 'creator': page.get('user'),
                 'initial_tags': page.get('tags', []),
                 'editing_pattern': pattern
-            })
+            }
+        yield from _drain_deque(passed_through)
+
+    # Each record goes to disk as soon as the articles before it are done,
+    # keeping the output in article-list order regardless of completion order.
+    # An incremental run still reads the earlier output, so it writes next to
+    # it and replaces it once done
+    output_path = ANALYSES_PATH + '.tmp' if state else ANALYSES_PATH
+    with AnalysisWriter(output_path) as writer:
+        for record in _in_order(article_records(), list(pages_by_title)):
+            writer.write(record() if callable(record) else record)
+
+        # Earlier analyses of articles beyond --limit are not refreshed this
+        # run, but stay in the output unchanged
+        selected_ids = {page.get('pageid') for page in selected_pages}
+        for page_id in previous_analyses:
+            if page_id not in selected_ids:
+                writer.write(previous_analyses.get(page_id))
+
+    if state:
+        previous_analyses.close()
+        os.replace(output_path, ANALYSES_PATH)
+
+    # Revision checkpoints are only advanced once the analyses are on disk
+    if state:
+        state.save()
+    if warehouse_path:
+        warehouse.refresh_tag_counts()
+        warehouse.close()
+        print(f"Revision histories stored in: {warehouse_path}")
 
-            print(f"  - Total revisions: {pattern['total_revisions']}")
-            if pattern.get('first_revision'):
-                first = pattern['first_revision']
-                print(f"  - First revision: {first['total_chars']} chars, {len(first['sections'])} sections")
-                print(f"  - Started with: {'Lead section' if first['lead_length'] > 0 else 'No lead'}")
+    print(f"\n{'=' * 80}")
+    print(f"Saved {writer.count} detailed analyses to: {ANALYSES_PATH}")
+    if analyzer.cache:
+        stats = analyzer.cache.stats()
+        print(f"Response cache: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['entries']} entries ({stats['bytes'] / 1024 ** 2:.1f} MB)")
+        analyzer.metrics.set_gauge('response_cache_bytes', stats['bytes'])
+    if analyzer.memo:
+        stats = analyzer.memo.stats()
+        print(f"Analysis memo: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries")
+        analyzer.metrics.set_gauge('analysis_memo_hits', stats['hits'])
+        analyzer.metrics.set_gauge('analysis_memo_misses', stats['misses'])
+        analyzer.memo.close()
+    stats = analyzer.rate_controller.metrics()
+    throttled = ', '.join(f"{count} {reason}" for reason, count in stats['throttled'].items()) or 'none'
+    print(f"API rate: {stats['responses']} responses, throttled: {throttled}, {stats['retries']} retries, "
+          f"{stats['seconds_waited']:.1f}s waited, ending at {stats['current_rate'] or 'unpaced'} req/s")
+    analyzer.metrics.set_gauge('api_throttled_responses', sum(stats['throttled'].values()))
+    analyzer.metrics.set_gauge('api_requests_given_up', stats['gave_up'])
+    analyzer.metrics.set_gauge('api_pacing_wait_seconds', stats['seconds_waited'])
+    analyzer.metrics.set_gauge('articles_found', len(mobile_ve_pages))
+    analyzer.metrics.set_gauge('articles_analyzed', writer.count)
+    _write_run_metrics(analyzer.metrics, metrics_path)
+    print(f"{'=' * 80}")
+
+    return ANALYSES_PATH, mobile_ve_pages
+
+def _write_run_metrics(metrics: RunMetrics, metrics_path: Optional[str]):
+    metrics.print_summary()
+    if metrics_path:
+        json_path, prom_path = metrics.write(metrics_path)
+        print(f"Run metrics saved to: {json_path} and {prom_path}")
+
+def api_endpoint(wiki: str) -> str:
+    """The api.php URL of a wiki given as a URL or a bare host ('fr.wikipedia.org')"""
+    return wiki if '://' in wiki else f"https://{wiki}/w/api.php"
+
+def wiki_key(api_url: str) -> str:
+    """The wiki an endpoint serves, as its host; first half of the (wiki, page_id) key of merged outputs"""
+    return urlparse(api_url).netloc
+
+def _crawl_wiki(api_url: str, directory: str, rate_settings: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    One shard of a multi-wiki crawl, run in its own process: main() in the
+    wiki's directory with its own analyzer (so its own connection pool) and
+    its own RateController, logging to crawl.log there
+    """
+    os.makedirs(directory, exist_ok=True)
+    os.chdir(directory)
+    start = time.perf_counter()
+    with open('crawl.log', 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+        _, pages = main(api_url=api_url, rate_controller=RateController(**rate_settings), **options)
+    return {'articles_found': len(pages), 'seconds': time.perf_counter() - start}
+
+def crawl_wikis(api_urls: List[str], rate_settings: Dict[str, Any] = None, **options) -> Tuple[str, int]:
+    """
+    Crawl several wikis concurrently, one process per wiki. Each wiki is
+    crawled by main() in wikis/<host>/ with an independent connection pool
+    and rate budget, so a slow or throttled wiki never holds up the others
+    and the total wall time is about that of the largest wiki. Relative
+    cache, state, memo, warehouse and metrics paths therefore resolve per
+    wiki. The per-wiki outputs are then streamed one wiki at a time into
+    the usual article list and analysis file, each entry tagged with its
+    wiki so it is keyed by (wiki, page_id). Returns the analysis file and
+    the number of articles found.
+    """
+    rate_settings = rate_settings or {}
+    directories = {}
+    for api_url in api_urls:
+        wiki = wiki_key(api_url)
+        if wiki in directories:
+            raise ValueError(f"{wiki} is listed more than once")
+        directories[wiki] = os.path.abspath(os.path.join(WIKIS_DIR, wiki.replace(':', '_')))
+
+    print("=" * 80)
+    print("WIKIPEDIA MOBILE ARTICLE CREATION ANALYSIS (MULTI-WIKI)")
+    print(f"Crawling {len(api_urls)} wikis concurrently; per-wiki logs in {WIKIS_DIR}/<wiki>/crawl.log")
+    print("=" * 80)
+
+    start = time.perf_counter()
+    results = {}
+    with ProcessPoolExecutor(max_workers=len(api_urls)) as pool:
+        futures = {pool.submit(_crawl_wiki, api_url, directories[wiki_key(api_url)], rate_settings, options):
+                   wiki_key(api_url) for api_url in api_urls}
+        for future in as_completed(futures):
+            wiki = futures[future]
+            try:
+                results[wiki] = future.result()
+            except Exception as e:
+                print(f"  ❌ {wiki}: crawl failed: {e}")
+                continue
+            print(f"  ✅ {wiki}: {results[wiki]['articles_found']} articles in {results[wiki]['seconds']:.1f}s")
+    wall = time.perf_counter() - start
+
+    # Merge in the order the wikis were given, each in its own article order.
+    # page_ids are unique within a wiki, so entries pass straight through and
+    # only one wiki's article list is in memory at a time
+    crawled = [(wiki, directory) for wiki, directory in directories.items() if wiki in results]
+    articles = 0
+    with open('mobile_ve_articles.json', 'w', encoding='utf-8') as f:
+        # The same layout json.dump(pages, f, indent=2) produces
+        f.write('[')
+        for wiki, directory in crawled:
+            for page in _load_previous(os.path.join(directory, 'mobile_ve_articles.json')):
+                entry = json.dumps({'wiki': wiki, **page}, indent=2, ensure_ascii=False)
+                f.write((',\n  ' if articles else '\n  ') + entry.replace('\n', '\n  '))
+                articles += 1
+        f.write('\n]' if articles else ']')
+    with AnalysisWriter(ANALYSES_PATH) as writer:
+        for wiki, directory in crawled:
+            for record in iter_analyses(os.path.join(directory, ANALYSES_PATH)):
+                writer.write({'wiki': wiki, **record})
+
+    print(f"\n{'=' * 80}")
+    print(f"Articles with BOTH mobile AND visual editor tags: {articles} "
+          f"across {len(results)}/{len(directories)} wikis")
+    print(f"Saved article list to: mobile_ve_articles.json")
+    print(f"Saved {writer.count} detailed analyses to: {ANALYSES_PATH}")
+    if results:
+        slowest = max(results, key=lambda wiki: results[wiki]['seconds'])
+        print(f"Wall time {wall:.1f}s; slowest wiki {slowest} {results[slowest]['seconds']:.1f}s, "
+              f"sum of all wikis {sum(result['seconds'] for result in results.values()):.1f}s")
+    print(f"{'=' * 80}")
 
-        time.sleep(0.5)  # Rate limiting
+    return ANALYSES_PATH, articles
 
-    # Save detailed analysis
-    with open('mobile_ve_detailed_analysis.json', 'w', encoding='utf-8') as f:
-        json.dump(detailed_analyses, f, indent=2, ensure_ascii=False)
+def analyze_dump(dump_path: str, change_tag_path: str = None, change_tag_def_path: str = None,
+                 since: str = None, until: str = None, limit: int = 0, memo_path: str = None, workers: int = 0,
+                 metrics_path: str = METRICS_PATH):
+    """
+    Backfill from a pages-meta-history XML dump instead of the live API.
+    Change tags are not part of XML dumps, so they are read from the
+    change_tag / change_tag_def SQL dumps of the same date.
+    """
+    tags_to_search = ['mobile edit', 'mobile web edit', 'visualeditor', 'visualeditor-wikitext']
+    analyzer = WikipediaAnalyzer(memo_path=memo_path)
+
+    print("=" * 80)
+    print("WIKIPEDIA MOBILE ARTICLE CREATION ANALYSIS (XML DUMP)")
+    print(f"Dump: {dump_path}  window: {since or 'start'} to {until or 'end'}")
+    print("=" * 80)
+
+    revision_tags = None
+    if change_tag_path and change_tag_def_path:
+        print("\nLoading change tags...")
+        revision_tags = load_change_tags(change_tag_path, change_tag_def_path, tags_to_search)
+        print(f"  {len(revision_tags)} revisions carry a mobile or visual editor tag")
+    else:
+        print("\nNo change tag dumps given: creations cannot be filtered by tag")
+
+    mobile_ve_pages = []
+
+    def analysis_jobs():
+        for page, revisions in iter_dump_pages(dump_path, start=since, end=until,
+                                               tags=tags_to_search if revision_tags else None,
+                                               revision_tags=revision_tags):
+            if revision_tags and not _is_mobile_ve(page):
+                continue
+            mobile_ve_pages.append(page)
+            print(f"\n[{len(mobile_ve_pages)}] Analyzing: {page['title']}")
+            yield page, revisions, None
+            if limit and len(mobile_ve_pages) >= limit:
+                return
+
+    with AnalysisWriter(ANALYSES_PATH) as writer:
+        for page, pattern in analyzer.analyze_articles(analysis_jobs(), workers=workers):
+            writer.write({
+                'title': page['title'],
+                'page_id': page['pageid'],
+                'created': page['timestamp'],
+                'creator': page['user'],
+                'initial_tags': page['tags'],
+                'editing_pattern': pattern
+            })
+            print(f"  - Total revisions: {pattern['total_revisions']}")
+
+    with open('mobile_ve_articles.json', 'w', encoding='utf-8') as f:
+        json.dump(mobile_ve_pages, f, indent=2, ensure_ascii=False)
 
     print(f"\n{'=' * 80}")
-    print(f"Saved detailed analysis to: mobile_ve_detailed_analysis.json")
+    print(f"Articles with BOTH mobile AND visual editor tags: {len(mobile_ve_pages)}")
+    print(f"Saved article list to: mobile_ve_articles.json")
+    print(f"Saved {writer.count} detailed analyses to: {ANALYSES_PATH}")
+    if analyzer.memo:
+        analyzer.memo.close()
+    analyzer.metrics.set_gauge('articles_found', len(mobile_ve_pages))
+    analyzer.metrics.set_gauge('articles_analyzed', writer.count)
+    _write_run_metrics(analyzer.metrics, metrics_path)
     print(f"{'=' * 80}")
 
-    return detailed_analyses, mobile_ve_pages
+    return ANALYSES_PATH, mobile_ve_pages
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Analyze articles created with the mobile web visual editor')
+    parser.add_argument('--limit', type=int, default=50, help='Articles to analyze in detail (0 for all)')
+    parser.add_argument('--api-url', default=API_URL,
+                        help='api.php endpoint (e.g. a local fake_mediawiki_api.py server)')
+    parser.add_argument('--wikis', nargs='+', metavar='WIKI',
+                        help='Crawl these wikis concurrently instead (api.php URLs or hosts like fr.wikipedia.org), '
+                             'each with its own connection pool and rate budget, and merge the outputs')
+    parser.add_argument('--concurrency', type=int,
+                        help=f"Revision requests kept in flight (default {POLITE_SETTINGS['concurrency']}, "
+                             f"{FAST_SETTINGS['concurrency']} with --fast)")
+    parser.add_argument('--cache', metavar='PATH', help='Cache API responses in this SQLite file')
+    parser.add_argument('--offline', action='store_true', help='Serve only from the response cache')
+    parser.add_argument('--state', metavar='PATH',
+                        help='Checkpoint file for resumable, incremental crawls (e.g. crawl_state.json)')
+    parser.add_argument('--lazy-content', action='store_true',
+                        help='Fetch metadata only and bisect for milestones, downloading O(log n) revisions')
+    parser.add_argument('--memo', metavar='PATH',
+                        help='Memoize revision analyses by sha1 in this SQLite file (e.g. analysis_memo.sqlite)')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Analyze revision contents in this many worker processes (0 to analyze in-process)')
+    parser.add_argument('--dump', metavar='PATH',
+                        help='Read a pages-meta-history XML dump (.xml/.bz2/.gz) instead of the live API')
+    parser.add_argument('--change-tags', metavar='PATH', help='change_tag SQL dump matching --dump')
+    parser.add_argument('--change-tag-def', metavar='PATH', help='change_tag_def SQL dump matching --dump')
+    parser.add_argument('--since', help='With --dump: earliest creation timestamp (e.g. 2025-01-01T00:00:00Z)')
+    parser.add_argument('--until', help='With --dump: creations before this timestamp')
+    parser.add_argument('--rate', type=float,
+                        help='API requests per second to start at; adapts between --min-rate and --max-rate '
+                             f"(0 to only back off when throttled; default {POLITE_SETTINGS['rate']:g}, "
+                             f"{FAST_SETTINGS['rate']:g} with --fast)")
+    parser.add_argument('--min-rate', type=float, default=0.5, help='Lowest API request rate')
+    parser.add_argument('--max-rate', type=float,
+                        help=f"Highest API request rate (default {POLITE_SETTINGS['max_rate']:g}, "
+                             f"{FAST_SETTINGS['max_rate']:g} with --fast)")
+    parser.add_argument('--fast', action='store_true',
+                        help='Opt into faster request settings for local mirrors or accounts allowed higher rates; '
+                             'explicit --rate/--max-rate/--concurrency still win')
+    parser.add_argument('--maxlag', type=int, default=5,
+                        help='Ask the API to refuse requests while replicas lag more than this many seconds')
+    parser.add_argument('--warehouse', metavar='PATH',
+                        help='Also store fetched revision histories in this SQLite warehouse (quarry_warehouse.py)')
+    parser.add_argument('--metrics', metavar='BASE', default=METRICS_PATH,
+                        help='Write run metrics to BASE.json and BASE.prom (Prometheus textfile)')
+    parser.add_argument('--no-metrics', action='store_true', help='Only print the run metrics')
+    parser.add_argument('--profile', metavar='PATH', help='cProfile the main thread and save the stats here')
+    parser.add_argument('--sample-stacks', metavar='PATH',
+                        help='Sample every thread\'s stack and save collapsed stacks here (for flame graphs)')
+    args = parser.parse_args()
+    metrics_path = None if args.no_metrics else args.metrics
+
+    # Settings not given explicitly come from the polite defaults, or --fast
+    for name, value in (FAST_SETTINGS if args.fast else POLITE_SETTINGS).items():
+        if getattr(args, name) is None:
+            setattr(args, name, value)
+
+    with profiled(args.profile), sampled(args.sample_stacks):
+        if args.dump:
+            analyze_dump(args.dump, change_tag_path=args.change_tags, change_tag_def_path=args.change_tag_def,
+                         since=args.since, until=args.until, limit=args.limit, memo_path=args.memo,
+                         workers=args.workers, metrics_path=metrics_path)
+        else:
+            rate_settings = dict(rate=args.rate or None, min_rate=args.min_rate, max_rate=args.max_rate,
+                                 maxlag=args.maxlag)
+            options = dict(limit=args.limit, concurrency=args.concurrency, cache_path=args.cache,
+                           offline=args.offline, state_path=args.state, lazy_content=args.lazy_content,
+                           memo_path=args.memo, workers=args.workers, warehouse_path=args.warehouse,
+                           metrics_path=metrics_path)
+            if args.wikis:
+                crawl_wikis([api_endpoint(wiki) for wiki in args.wikis], rate_settings=rate_settings, **options)
+            else:
+                main(rate_controller=RateController(**rate_settings), api_url=args.api_url, **options)